@@ -0,0 +1,263 @@
+"""Nightly detection of missed classes.
+
+For every closed local day, each schedule slot on that weekday is an
+expected session. One INSERT ... SELECT expands the days (a recursive
+CTE) into sessions, keeps those with no check-in for the class, and
+writes them to the absences table; absence_days records which days
+have been processed and how many absences each had.
+
+A check-in attends its class if it was matched to it on time or late
+(attendance_records.arrival). Check-ins from before arrival was stored
+count if they fall in the class's check-in window, as analytics.py
+does. Archived months are attached and searched too.
+
+find_absences serves readers: recorded absences for processed days,
+and the same query run live for today and any day not processed yet.
+
+Run it with python manage.py detect-absences (from cron, say), or keep
+python manage.py absence-scheduler running to do it every day at
+EDUWATCH_ABSENCE_TIME. serve.py and async_server.py run the same
+schedule in a thread when EDUWATCH_ABSENCE_TIME is set (start_scheduler).
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from attendance import DAY_NAMES, EARLY_WINDOW_MINUTES, LATE, ON_TIME
+from partitions import attach_partition, detach_partition, list_partitions
+
+# Local time of day (HH:MM) at which the scheduler detects the previous
+# day's absences; unset leaves it to manage.py detect-absences
+ABSENCE_TIME = os.environ.get('EDUWATCH_ABSENCE_TIME')
+
+# strftime('%w') counts from Sunday = 0; DAY_NAMES starts on Monday
+WEEKDAY_NAME = 'CASE strftime(\'%w\', days.day) {} END'.format(
+    ' '.join(f"WHEN '{(number + 1) % 7}' THEN '{name}'" for number, name in enumerate(DAY_NAMES))
+)
+
+DAYS = '''
+    WITH RECURSIVE days(day) AS (
+        SELECT DATE(:start_day)
+        UNION ALL
+        SELECT DATE(day, '+1 day') FROM days WHERE day < :end_day
+    )
+'''
+
+# A check-in in {records} that attends session se
+ATTENDED = '''
+    EXISTS (
+        SELECT 1 FROM {records} ar
+        WHERE ar.user_id = se.user_id AND ar.timestamp >= se.day_start AND ar.timestamp < se.day_end
+          AND (ar.schedule_id = se.schedule_id AND ar.arrival IN (:on_time, :late)
+               OR ar.arrival IS NULL
+                  AND CAST(strftime('%H', ar.timestamp, 'localtime') AS INTEGER) * 60
+                      + CAST(strftime('%M', ar.timestamp, 'localtime') AS INTEGER)
+                      BETWEEN se.start_minutes - :early_window AND se.end_minutes)
+    )
+'''
+
+# Sessions expected on each day: schedules created by then, on its
+# weekday, whose subject and user still exist (deleting a subject
+# leaves its schedules behind). day_start/day_end are the day's bounds
+# as UTC timestamp strings (see attendance.day_start_utc). missed keeps
+# those with no check-in; {schedules} and {sessions} add conditions
+# for readers.
+MISSED_SESSIONS = DAYS + f'''
+    , sessions AS (
+        SELECT s.id AS schedule_id, s.user_id, s.subject_id, days.day, s.start_time, s.end_time,
+               CAST(substr(s.start_time, 1, 2) AS INTEGER) * 60 + CAST(substr(s.start_time, 4, 2) AS INTEGER)
+                   AS start_minutes,
+               CAST(substr(s.end_time, 1, 2) AS INTEGER) * 60 + CAST(substr(s.end_time, 4, 2) AS INTEGER)
+                   AS end_minutes,
+               strftime('%Y-%m-%dT%H:%M:%S', days.day, 'utc') AS day_start,
+               strftime('%Y-%m-%dT%H:%M:%S', days.day, '+1 day', 'utc') AS day_end
+        FROM days
+        JOIN schedules s ON s.day_of_week = {WEEKDAY_NAME}
+        JOIN subjects sub ON sub.id = s.subject_id
+        JOIN users u ON u.id = s.user_id
+        WHERE DATE(s.created_at, 'localtime') <= days.day{{schedules}}
+    )
+    , missed AS (
+        SELECT se.day, se.schedule_id, se.user_id, se.subject_id, se.start_time, se.end_time
+        FROM sessions se
+        WHERE {{not_attended}}{{sessions}}
+    )
+'''
+
+DETECT_ABSENCES = MISSED_SESSIONS + '''
+    INSERT INTO absences (day, schedule_id, user_id, subject_id, start_time, end_time)
+    SELECT day, schedule_id, user_id, subject_id, start_time, end_time FROM missed
+'''
+
+# Readers get the user and subject names with each absence
+ABSENCE_COLUMNS = '''
+    SELECT a.day, a.schedule_id, a.user_id, u.full_name AS user_name, u.status AS user_status,
+           a.subject_id, sub.name AS subject_name, a.start_time, a.end_time
+    FROM {source} a
+    LEFT JOIN users u ON a.user_id = u.id
+    LEFT JOIN subjects sub ON a.subject_id = sub.id
+'''
+
+# Days the job has not processed yet are worked out live; on today only
+# classes that have already ended count
+LIVE_SESSIONS = '''
+    AND NOT EXISTS (SELECT 1 FROM absence_days ad WHERE ad.day = se.day)
+    AND (se.day < :today OR se.end_minutes <= :now_minutes)
+'''
+
+
+def last_closed_day(today=None):
+    return (today or date.today()) - timedelta(days=1)
+
+
+def pending_days(conn, today=None):
+    """Return (start_day, end_day) of the closed days not yet processed, or None.
+
+    The first run only looks at yesterday; after that every day since
+    the last one processed is caught up.
+    """
+    end_day = last_closed_day(today)
+    last = conn.execute('SELECT MAX(day) FROM absence_days').fetchone()[0]
+    start_day = date.fromisoformat(last) + timedelta(days=1) if last else end_day
+    if start_day > end_day:
+        return None
+    return start_day, end_day
+
+
+def _session_params(start_day, end_day):
+    return {
+        'start_day': start_day.isoformat(), 'end_day': end_day.isoformat(),
+        'on_time': ON_TIME, 'late': LATE, 'early_window': EARLY_WINDOW_MINUTES,
+    }
+
+
+def _not_attended(schemas):
+    """The condition that no check-in in main or the attached archives attends se."""
+    sources = ['main.attendance_records'] + [f'{schema}.attendance_records' for schema in schemas]
+    return ' AND '.join('NOT ' + ATTENDED.format(records=source) for source in sources)
+
+
+def detect_absences(conn, start_day, end_day):
+    """Record the absences for the closed days start_day..end_day (inclusive).
+
+    Days already processed are detected again from scratch. Commits and
+    returns {day: number of absences}.
+    """
+    if end_day > last_closed_day():
+        raise ValueError('Absences can only be detected for days that are over.')
+    if start_day > end_day:
+        raise ValueError('start_day must not be after end_day.')
+
+    params = _session_params(start_day, end_day)
+    # Archives overlapping the days are attached before the transaction starts
+    partitions = list_partitions(conn, {'start_date': start_day, 'end_date': end_day})
+    schemas = [attach_partition(conn, partition) for partition in partitions]
+    try:
+        conn.execute('DELETE FROM absences WHERE day BETWEEN :start_day AND :end_day', params)
+        conn.execute(DETECT_ABSENCES.format(not_attended=_not_attended(schemas), schedules='', sessions=''), params)
+        conn.execute(DAYS + '''
+            INSERT OR REPLACE INTO absence_days (day, absences)
+            SELECT days.day, (SELECT COUNT(*) FROM absences a WHERE a.day = days.day)
+            FROM days
+        ''', params)
+        counts = {row['day']: row['absences'] for row in conn.execute(
+            'SELECT day, absences FROM absence_days WHERE day BETWEEN :start_day AND :end_day ORDER BY day',
+            params,
+        )}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        for schema in schemas:
+            detach_partition(conn, schema)
+    return counts
+
+
+def find_absences(conn, start_day, end_day, user_id=None, now=None):
+    """Return the classes missed on start_day..end_day, oldest first.
+
+    Days in absence_days are read from the absences table. Today and
+    any day not processed yet are worked out with the job's query,
+    counting only classes that have ended by now. Rows have the
+    absences columns plus user_name, user_status and subject_name.
+    """
+    now = now or datetime.now()
+    end_day = min(end_day, now.date())
+    if start_day > end_day:
+        return []
+
+    params = _session_params(start_day, end_day)
+    params.update(today=now.date().isoformat(), now_minutes=now.hour * 60 + now.minute, user_id=user_id)
+    user_filter = ' AND a.user_id = :user_id' if user_id is not None else ''
+
+    recorded = conn.execute(ABSENCE_COLUMNS.format(source='absences') + f'''
+        WHERE a.day BETWEEN :start_day AND :end_day{user_filter}
+    ''', params).fetchall()
+
+    partitions = list_partitions(conn, {'start_date': start_day, 'end_date': end_day})
+    schemas = [attach_partition(conn, partition) for partition in partitions]
+    try:
+        query = MISSED_SESSIONS.format(
+            not_attended=_not_attended(schemas),
+            schedules=' AND s.user_id = :user_id' if user_id is not None else '',
+            sessions=LIVE_SESSIONS,
+        ) + ABSENCE_COLUMNS.format(source='missed')
+        live = conn.execute(query, params).fetchall()
+    finally:
+        for schema in schemas:
+            detach_partition(conn, schema)
+
+    return sorted(recorded + live, key=lambda row: (row['day'], row['start_time'], row['schedule_id']))
+
+
+def run_pending(conn, today=None):
+    """Detect absences for every closed day not processed yet."""
+    days = pending_days(conn, today)
+    if days is None:
+        return {}
+    return detect_absences(conn, *days)
+
+
+def seconds_until(at, now=None):
+    """Seconds from now until the next local HH:MM."""
+    now = now or datetime.now()
+    hours, minutes = at.split(':')
+    target = now.replace(hour=int(hours), minute=int(minutes), second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def run_daily(connect, at):
+    """Run run_pending every day at local time at; never returns.
+
+    connect() opens a database connection for each run.
+    """
+    while True:
+        time.sleep(seconds_until(at))
+        conn = connect()
+        try:
+            for day, count in run_pending(conn).items():
+                print(f"Absences for {day}: {count}")
+        except Exception as e:
+            print(f"Absence detection error: {e}")
+        finally:
+            conn.close()
+
+
+def start_scheduler(connect, at=ABSENCE_TIME):
+    """Run run_daily in a daemon thread; does nothing if at is unset.
+
+    Only for single-process servers (serve.py, async_server.py). Under
+    gunicorn run python manage.py absence-scheduler or a cron job
+    instead, so the job runs once and outside the workers.
+    """
+    if not at:
+        return None
+    seconds_until(at)  # Fail at startup on a malformed time
+
+    thread = threading.Thread(target=run_daily, args=(connect, at), name='absence-detection', daemon=True)
+    thread.start()
+    return thread
@@ -9,6 +9,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     const searchSubjectsInput = document.getElementById('search-subjects-input');
     
     const clearRecordsBtn = document.getElementById('clear-records-btn');
+    const loadMoreAttendanceBtn = document.getElementById('load-more-attendance-btn');
     const addSubjectBtn = document.getElementById('add-subject-btn');
     
     const attendanceTab = document.getElementById('attendance-tab');
@@ -23,6 +24,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     const reportEndDate = document.getElementById('report-end-date');
     const generateReportBtn = document.getElementById('generate-report-btn');
     const exportReportBtn = document.getElementById('export-report-btn');
+    const exportCsvBtn = document.getElementById('export-csv-btn');
     const analyticsTab = document.getElementById('analytics-tab');
     const analyticsContent = document.getElementById('analytics-content');
     
@@ -37,6 +39,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     const isAdmin = localStorage.getItem('isAdmin');
 
     let allAttendanceRecords = [];
+    let attendanceCursor = null;
     let allUsers = [];
     let allSubjects = [];
     let currentEditingUserId = null;
@@ -165,12 +168,25 @@ document.addEventListener('DOMContentLoaded', async () => {
         });
     };
 
+    // Records are loaded one keyset page at a time; older pages are fetched on demand
+    const ATTENDANCE_PAGE_SIZE = 500;
+    // How often new check-ins are fetched while the live feed is unavailable
+    const ATTENDANCE_POLL_INTERVAL_MS = 30000;
+
+    const fetchAttendancePage = async (cursor = null) => {
+        const params = new URLSearchParams({ limit: String(ATTENDANCE_PAGE_SIZE) });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`http://127.0.0.1:5000/api/dashboard?${params}`);
+        if (!response.ok) throw new Error('Failed to fetch attendance data');
+        const data = await response.json();
+        attendanceCursor = data.next_cursor;
+        loadMoreAttendanceBtn.style.display = attendanceCursor ? 'block' : 'none';
+        return data.attendance;
+    };
+
     const loadAllAttendanceData = async () => {
         try {
-            const attendanceResponse = await fetch('http://127.0.0.1:5000/api/dashboard');
-            if (!attendanceResponse.ok) throw new Error('Failed to fetch attendance data');
-            const attendanceData = await attendanceResponse.json();
-            allAttendanceRecords = attendanceData.attendance;
+            allAttendanceRecords = await fetchAttendancePage();
             renderAttendanceTable(allAttendanceRecords);
             displayMessage('Attendance data loaded successfully!', 'success');
         } catch (error) {
@@ -179,6 +195,63 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     };
 
+    const loadMoreAttendance = async () => {
+        if (!attendanceCursor) return;
+        loadMoreAttendanceBtn.disabled = true;
+        try {
+            allAttendanceRecords.push(...await fetchAttendancePage(attendanceCursor));
+            // Re-apply the current search to the longer list
+            searchAttendanceInput.dispatchEvent(new Event('keyup'));
+        } catch (error) {
+            console.error('Error fetching data:', error);
+            displayMessage('Failed to load more attendance records. Please try again.', 'error');
+        } finally {
+            loadMoreAttendanceBtn.disabled = false;
+        }
+    };
+
+    // Fetch the newest page and add the check-ins not in the table yet; pages loaded
+    // with "Load more" stay as they are
+    const pollNewAttendance = async () => {
+        try {
+            const response = await fetch(`http://127.0.0.1:5000/api/dashboard?limit=${ATTENDANCE_PAGE_SIZE}`);
+            if (!response.ok) throw new Error('Failed to fetch attendance data');
+            const data = await response.json();
+            const lastId = allAttendanceRecords.reduce((max, record) => Math.max(max, record.id), 0);
+            const newRecords = data.attendance.filter(record => record.id > lastId);
+            if (!newRecords.length) return;
+            allAttendanceRecords.unshift(...newRecords);
+            searchAttendanceInput.dispatchEvent(new Event('keyup'));
+        } catch (error) {
+            console.error('Error fetching data:', error);
+        }
+    };
+
+    // New check-ins are pushed by the server instead of re-fetching the whole table.
+    // EventSource reconnects on its own and resumes after the last event id it saw. If the
+    // server turns the feed away (503 when it is busy), poll and try to subscribe again later.
+    const subscribeToAttendance = () => {
+        let lastId = allAttendanceRecords.reduce((max, record) => Math.max(max, record.id), 0);
+        const attendanceStream = new EventSource(`http://127.0.0.1:5000/api/attendance/stream?since_id=${lastId}`);
+
+        attendanceStream.addEventListener('attendance', (event) => {
+            const record = JSON.parse(event.data);
+            if (record.id <= lastId) return;
+            lastId = record.id;
+            allAttendanceRecords.unshift(record);
+            // Re-apply the current search to the updated list
+            searchAttendanceInput.dispatchEvent(new Event('keyup'));
+        });
+
+        attendanceStream.addEventListener('error', () => {
+            if (attendanceStream.readyState !== EventSource.CLOSED) return;
+            setTimeout(async () => {
+                await pollNewAttendance();
+                subscribeToAttendance();
+            }, ATTENDANCE_POLL_INTERVAL_MS);
+        });
+    };
+
     const loadAllUsers = async () => {
         try {
             const response = await fetch('http://127.0.0.1:5000/api/admin/users');
@@ -206,96 +279,39 @@ document.addEventListener('DOMContentLoaded', async () => {
     };
 
     // ANALYTICS FUNCTIONS
+    // On-time/late classification happens server-side in /api/analytics
     const loadAnalytics = async () => {
         try {
-            const attendanceResponse = await fetch('http://127.0.0.1:5000/api/dashboard');
-            const attendanceData = await attendanceResponse.json();
-            
-            const schedulesResponse = await fetch('http://127.0.0.1:5000/api/admin/schedules');
-            const schedulesData = await schedulesResponse.json();
-            
-            if (attendanceData.attendance && schedulesData.schedules) {
-                processAnalyticsData(attendanceData.attendance, schedulesData.schedules);
-            }
+            const response = await fetch('http://127.0.0.1:5000/api/analytics');
+            if (!response.ok) throw new Error('Failed to fetch analytics');
+            const data = await response.json();
+            renderAnalytics(data);
         } catch (error) {
             console.error('Error loading analytics:', error);
             displayMessage('Failed to load analytics data', 'error');
         }
     };
 
-    const processAnalyticsData = (records, schedules) => {
-        const employeeMap = {};
-        let totalOnTime = 0;
-        let totalLate = 0;
-
-        records.forEach(record => {
-            const recordTime = new Date(record.timestamp);
-            const recordDay = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'][recordTime.getDay()];
-            
-            let isLate = false;
-
-            for (const schedule of schedules) {
-                const nameMatch = schedule.user_name.trim().toLowerCase() === record.name.trim().toLowerCase();
-                const dayMatch = schedule.day_of_week === recordDay;
-                
-                if (nameMatch && dayMatch) {
-                    const [schedHours, schedMinutes] = schedule.start_time.split(':').map(Number);
-                    const [schedEndHours, schedEndMinutes] = schedule.end_time.split(':').map(Number);
-                    const actualHours = recordTime.getHours();
-                    const actualMinutes = recordTime.getMinutes();
-                    
-                    const scheduledStartMinutes = schedHours * 60 + schedMinutes;
-                    const scheduledEndMinutes = schedEndHours * 60 + schedEndMinutes;
-                    const actualTimeMinutes = actualHours * 60 + actualMinutes;
-                    
-                    const isWithinTimeRange = actualTimeMinutes >= (scheduledStartMinutes - 120) && 
-                                              actualTimeMinutes <= scheduledEndMinutes;
-                    
-                    if (isWithinTimeRange) {
-                        const minutesDiff = actualTimeMinutes - scheduledStartMinutes;
-                        if (minutesDiff > 5) {
-                            isLate = true;
-                        }
-                        break;
-                    }
-                }
-            }
-
-            if (!employeeMap[record.name]) {
-                employeeMap[record.name] = {
-                    name: record.name,
-                    status: record.user_status || 'Unknown',
-                    total: 0,
-                    onTime: 0,
-                    late: 0
-                };
-            }
-            employeeMap[record.name].total++;
-            
-            if (isLate) {
-                employeeMap[record.name].late++;
-                totalLate++;
-            } else {
-                employeeMap[record.name].onTime++;
-                totalOnTime++;
-            }
-        });
-
-        const employees = Object.values(employeeMap);
-        const totalEmployees = employees.length;
-        const totalAttendance = records.length;
-        const avgAttendance = totalEmployees > 0 ? (totalAttendance / totalEmployees).toFixed(1) : 0;
-        const onTimeRate = totalAttendance > 0 ? ((totalOnTime / totalAttendance) * 100).toFixed(1) : 0;
-
-        document.getElementById('stat-total-employees').textContent = totalEmployees;
-        document.getElementById('stat-total-attendance').textContent = totalAttendance;
+    const renderAnalytics = (data) => {
+        const employees = data.employees
+            .filter(emp => emp.total > 0)
+            .map(emp => ({
+                name: emp.name,
+                status: emp.status,
+                total: emp.total,
+                onTime: emp.on_time,
+                late: emp.late
+            }));
+        const totals = data.totals;
+        const avgAttendance = employees.length > 0 ? (totals.attendance / employees.length).toFixed(1) : 0;
+
+        document.getElementById('stat-total-employees').textContent = employees.length;
+        document.getElementById('stat-total-attendance').textContent = totals.attendance;
         document.getElementById('stat-avg-attendance').textContent = avgAttendance;
-        document.getElementById('stat-ontime-rate').textContent = onTimeRate + '%';
-
-        employees.sort((a, b) => b.total - a.total);
+        document.getElementById('stat-ontime-rate').textContent = totals.on_time_rate + '%';
 
         createEmployeeBarChart(employees.slice(0, 10));
-        createStatusPieChart(totalOnTime, totalLate);
+        createStatusPieChart(totals.on_time, totals.late);
         createAnalyticsTable(employees);
     };
 
@@ -597,108 +613,21 @@ document.addEventListener('DOMContentLoaded', async () => {
         try {
             displayMessage('Generating comprehensive report...', 'info');
             
-            const attendanceResponse = await fetch('http://127.0.0.1:5000/api/dashboard');
-            const attendanceData = await attendanceResponse.json();
-            
-            const schedulesResponse = await fetch('http://127.0.0.1:5000/api/admin/schedules');
-            const schedulesData = await schedulesResponse.json();
-            
-            const start = new Date(startDate + 'T00:00:00');
-            const end = new Date(endDate + 'T23:59:59');
-            
-            const filteredRecords = attendanceData.attendance.filter(record => {
-                const recordDate = new Date(record.timestamp);
-                return recordDate >= start && recordDate <= end;
-            });
-            
-            const reportRecords = [];
-            const attendedSchedules = new Set();
-            
-            filteredRecords.forEach(record => {
-                const recordTime = new Date(record.timestamp);
-                const recordDay = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'][recordTime.getDay()];
-                
-                let matchingSchedule = null;
-                let attendanceStatus = 'Present';
-                let minutesLate = null;
-
-                for (const schedule of schedulesData.schedules) {
-                    const nameMatch = schedule.user_name.trim().toLowerCase() === record.name.trim().toLowerCase();
-                    const dayMatch = schedule.day_of_week === recordDay;
-                    
-                    if (nameMatch && dayMatch) {
-                        const [schedHours, schedMinutes] = schedule.start_time.split(':').map(Number);
-                        const [schedEndHours, schedEndMinutes] = schedule.end_time.split(':').map(Number);
-                        const actualHours = recordTime.getHours();
-                        const actualMinutes = recordTime.getMinutes();
-                        
-                        const scheduledStartMinutes = schedHours * 60 + schedMinutes;
-                        const scheduledEndMinutes = schedEndHours * 60 + schedEndMinutes;
-                        const actualTimeMinutes = actualHours * 60 + actualMinutes;
-                        
-                        const isWithinTimeRange = actualTimeMinutes >= (scheduledStartMinutes - 120) && 
-                                                  actualTimeMinutes <= scheduledEndMinutes;
-                        
-                        if (isWithinTimeRange) {
-                            matchingSchedule = schedule;
-                            const minutesDiff = actualTimeMinutes - scheduledStartMinutes;
-                            
-                            if (minutesDiff > 5) {
-                                attendanceStatus = 'Late';
-                                minutesLate = minutesDiff;
-                            }
-                            
-                            const scheduleKey = `${schedule.user_name}-${recordTime.toISOString().split('T')[0]}-${schedule.day_of_week}-${schedule.start_time}`;
-                            attendedSchedules.add(scheduleKey);
-                            break;
-                        }
-                    }
-                }
-
-                if (matchingSchedule) {
-                    reportRecords.push({
-                        name: record.name,
-                        userStatus: record.user_status || 'Unknown',
-                        subject: `${matchingSchedule.subject_name} - ${recordDay} (${formatTimeTo12Hour(matchingSchedule.start_time)} - ${formatTimeTo12Hour(matchingSchedule.end_time)})`,
-                        date: recordTime.toLocaleDateString(),
-                        timeMarked: recordTime.toLocaleTimeString(),
-                        attendanceStatus: attendanceStatus,
-                        minutesLate: minutesLate
-                    });
-                }
-            });
-
-            // Find absent records
-            const currentDate = new Date(start);
-            while (currentDate <= end) {
-                const dayOfWeek = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'][currentDate.getDay()];
-                
-                schedulesData.schedules.forEach(schedule => {
-                    if (schedule.day_of_week === dayOfWeek) {
-                        const scheduleKey = `${schedule.user_name}-${currentDate.toISOString().split('T')[0]}-${schedule.day_of_week}-${schedule.start_time}`;
-                        
-                        if (!attendedSchedules.has(scheduleKey)) {
-                            reportRecords.push({
-                                name: schedule.user_name,
-                                userStatus: schedule.user_status || 'Unknown',
-                                subject: `${schedule.subject_name} - ${dayOfWeek} (${formatTimeTo12Hour(schedule.start_time)} - ${formatTimeTo12Hour(schedule.end_time)})`,
-                                date: currentDate.toLocaleDateString(),
-                                timeMarked: null,
-                                attendanceStatus: 'Absent',
-                                minutesLate: null
-                            });
-                        }
-                    }
-                });
-                
-                currentDate.setDate(currentDate.getDate() + 1);
-            }
+            const params = new URLSearchParams({ start_date: startDate, end_date: endDate, details: '1' });
+            const response = await fetch(`http://127.0.0.1:5000/api/analytics?${params}`);
+            if (!response.ok) throw new Error('Failed to fetch report data');
+            const data = await response.json();
 
-            reportRecords.sort((a, b) => {
-                const dateCompare = new Date(a.date) - new Date(b.date);
-                if (dateCompare !== 0) return dateCompare;
-                return a.name.localeCompare(b.name);
-            });
+            // Present, late and absent entries are classified server-side
+            const reportRecords = data.records.map(record => ({
+                name: record.name,
+                userStatus: record.user_status || 'Unknown',
+                subject: record.subject,
+                date: new Date(record.date + 'T00:00:00').toLocaleDateString(),
+                timeMarked: record.timestamp ? new Date(record.timestamp).toLocaleTimeString() : null,
+                attendanceStatus: record.attendance_status,
+                minutesLate: record.minutes_late
+            }));
 
             const presentCount = reportRecords.filter(r => r.attendanceStatus === 'Present').length;
             const lateCount = reportRecords.filter(r => r.attendanceStatus === 'Late').length;
@@ -721,6 +650,14 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     });
 
+    // The CSV is streamed by the server, so any date range can be exported
+    exportCsvBtn.addEventListener('click', () => {
+        const params = new URLSearchParams();
+        if (reportStartDate.value) params.set('start_date', reportStartDate.value);
+        if (reportEndDate.value) params.set('end_date', reportEndDate.value);
+        window.location.href = `http://127.0.0.1:5000/api/reports/attendance.csv?${params}`;
+    });
+
     exportReportBtn.addEventListener('click', () => {
         if (currentReportData.length === 0) {
             displayMessage('No report data to export', 'error');
@@ -963,6 +900,8 @@ document.addEventListener('DOMContentLoaded', async () => {
                 const response = await fetch('http://127.0.0.1:5000/api/admin/clear_attendance', { method: 'DELETE' });
                 if (!response.ok) throw new Error('Failed to clear records');
                 allAttendanceRecords = [];
+                attendanceCursor = null;
+                loadMoreAttendanceBtn.style.display = 'none';
                 renderAttendanceTable([]);
                 displayMessage('All records have been cleared!', 'success');
             } catch (error) {
@@ -1001,6 +940,8 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     });
 
+    loadMoreAttendanceBtn.addEventListener('click', loadMoreAttendance);
+
     // Initial data load
-    loadAllAttendanceData();
+    loadAllAttendanceData().then(subscribeToAttendance);
 });
\ No newline at end of file
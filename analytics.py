@@ -0,0 +1,305 @@
+from bisect import bisect_left
+from datetime import date, datetime
+
+from absences import find_absences
+from attendance import (DAY_NAMES, EARLY_WINDOW_MINUTES, LATE, LATE_GRACE_MINUTES, ON_TIME, SUBJECT_LABEL,
+                        UNSCHEDULED, build_attendance_where)
+from partitions import iter_attendance_records
+
+# Upper bounds (inclusive) of the minutes-late histogram buckets
+LATE_BUCKETS = [(10, '6-10'), (15, '11-15'), (30, '16-30'), (60, '31-60'), (None, '60+')]
+
+ANALYTICS_SELECT = f'''
+    SELECT ar.id, ar.user_id, ar.legacy_name, ar.timestamp, ar.schedule_id, ar.arrival, ar.minutes_late,
+           {SUBJECT_LABEL} as subject, u.full_name as user_name, u.status as user_status
+    FROM {{records}} ar
+    LEFT JOIN users u ON ar.user_id = u.id
+    LEFT JOIN subjects sub ON ar.subject_id = sub.id
+    LEFT JOIN schedules sc ON ar.schedule_id = sc.id
+'''
+
+
+def parse_timestamp(value):
+    """Parse a stored timestamp into a naive datetime in server local time."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def to_minutes(hhmm):
+    """Convert an HH:MM schedule time to minutes after midnight."""
+    hours, minutes = hhmm.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_time_12h(hhmm):
+    """Format HH:MM as the 12-hour clock used by the frontend."""
+    hours, minutes = hhmm.split(':')[:2]
+    hour = int(hours)
+    return f"{hour % 12 or 12}:{minutes} {'PM' if hour >= 12 else 'AM'}"
+
+
+def late_bucket(minutes_late):
+    """Return the histogram label for a number of minutes late."""
+    for upper, label in LATE_BUCKETS:
+        if upper is None or minutes_late <= upper:
+            return label
+
+
+class ScheduleIndex:
+    """Schedules grouped by (user_id, day_of_week) for interval lookups.
+
+    Each group is sorted by start time, with a running maximum of end
+    times alongside, so finding the class a check-in belongs to is a
+    binary search followed by (usually) a single comparison.
+    """
+
+    def __init__(self, schedules):
+        groups = {}
+        for schedule in schedules:
+            slot = dict(schedule)
+            slot['start_minutes'] = to_minutes(slot['start_time'])
+            slot['end_minutes'] = to_minutes(slot['end_time'])
+            groups.setdefault((slot['user_id'], slot['day_of_week']), []).append(slot)
+
+        self._groups = {}
+        self._by_id = {}
+        for key, slots in groups.items():
+            slots.sort(key=lambda s: s['start_minutes'])
+            max_ends = []
+            running = -1
+            for slot in slots:
+                running = max(running, slot['end_minutes'])
+                max_ends.append(running)
+                self._by_id[slot['id']] = slot
+            starts = [slot['start_minutes'] for slot in slots]
+            self._groups[key] = (slots, max_ends, starts)
+
+    def get(self, schedule_id):
+        """Return the slot with this schedule id, or None."""
+        return self._by_id.get(schedule_id)
+
+    def find(self, user_id, day_name, minute):
+        """Return the first slot whose check-in window contains minute, or None."""
+        group = self._groups.get((user_id, day_name))
+        if not group:
+            return None
+        slots, max_ends, _ = group
+        # Every slot before this index ends before the check-in
+        for slot in slots[bisect_left(max_ends, minute):]:
+            if slot['start_minutes'] - EARLY_WINDOW_MINUTES > minute:
+                break
+            if slot['end_minutes'] >= minute:
+                return slot
+        return None
+
+    def at(self, user_id, day_name, start_time, subject_id):
+        """Return the user's slot for subject_id starting at start_time (HH:MM), or None."""
+        group = self._groups.get((user_id, day_name))
+        if not group:
+            return None
+        slots, _, starts = group
+        minute = to_minutes(start_time)
+        for slot in slots[bisect_left(starts, minute):]:
+            if slot['start_minutes'] != minute:
+                break
+            if slot['subject_id'] == subject_id:
+                return slot
+        return None
+
+
+def classify_arrival(slot, checked_in):
+    """Return (arrival, minutes_late) for a check-in at local time checked_in.
+
+    slot is the class the check-in was matched to, or None. Outside the
+    class's check-in window (other weekday, too early, or after it
+    ended) the check-in counts as unscheduled.
+    """
+    if slot is None or slot['day_of_week'] != DAY_NAMES[checked_in.weekday()]:
+        return UNSCHEDULED, None
+    minute = checked_in.hour * 60 + checked_in.minute
+    if not slot['start_minutes'] - EARLY_WINDOW_MINUTES <= minute <= slot['end_minutes']:
+        return UNSCHEDULED, None
+    minutes_late = minute - slot['start_minutes']
+    return (LATE if minutes_late > LATE_GRACE_MINUTES else ON_TIME), minutes_late
+
+
+def load_schedule_index(conn, user_id=None):
+    """Build a ScheduleIndex from the schedules table."""
+    where = 's.user_id = ?' if user_id is not None else '1 = 1'
+    params = [user_id] if user_id is not None else []
+    schedules = conn.execute(f'''
+        SELECT s.id, s.user_id, s.day_of_week, s.start_time, s.end_time,
+               sub.name as subject_name, u.full_name as user_name, u.status as user_status
+        FROM schedules s
+        JOIN subjects sub ON s.subject_id = sub.id
+        JOIN users u ON s.user_id = u.id
+        WHERE {where}
+        ORDER BY s.user_id, s.day_of_week, s.start_time
+    ''', params).fetchall()
+    return ScheduleIndex(schedules)
+
+
+def describe_slot(slot):
+    """Format a slot the way the dashboard labels classes."""
+    return (f"{slot['subject_name']} - {slot['day_of_week']} "
+            f"({format_time_12h(slot['start_time'])} - {format_time_12h(slot['end_time'])})")
+
+
+def _new_employee(user_id, name, status):
+    return {
+        'user_id': user_id,
+        'name': name,
+        'status': status or 'Unknown',
+        'total': 0,
+        'on_time': 0,
+        'late': 0,
+        'absent': 0,
+        'unscheduled': 0,
+        'minutes_late': {label: 0 for _, label in LATE_BUCKETS},
+        'avg_minutes_late': 0,
+    }
+
+
+def _record_key(record):
+    return record['timestamp'], record['id']
+
+
+def compute_attendance_analytics(conn, filters, details=False):
+    """Classify check-ins as on time or late and count missed classes.
+
+    Check-ins carry the class and arrival worked out when they were
+    written (see ingest.py); older rows are matched to the user's
+    schedule for that weekday here. A check-in with no matching class
+    counts as on time (and unscheduled).
+    Absences are expected classes in the date range, up to now, with no
+    matching check-in: recorded by the absence job for the days it has
+    processed, worked out live for the rest (see absences.find_absences).
+    With details=True the response also lists every present, late and
+    absent entry for report tables.
+    """
+    index = load_schedule_index(conn, filters.get('user_id'))
+
+    now = datetime.now()
+    today = now.date()
+    end_date = min(filters.get('end_date', today), today)
+    start_date = filters.get('start_date')
+
+    where, params = build_attendance_where(filters)
+    records = iter_attendance_records(conn, ANALYTICS_SELECT, where, params, _record_key, filters, tuples=False)
+
+    employees = {}
+    entries = []
+    late_total = 0
+
+    for record in records:
+        checked_in = parse_timestamp(record['timestamp'])
+        if checked_in is None:
+            continue
+        if start_date is None:
+            start_date = checked_in.date()  # Records come oldest first
+
+        user_id = record['user_id']
+        employee = employees.get(user_id)
+        if employee is None:
+            employee = employees[user_id] = _new_employee(
+                user_id, record['user_name'] or record['legacy_name'], record['user_status'])
+        employee['total'] += 1
+
+        if record['arrival'] is None:
+            # Written before check-ins were matched to their class on insert
+            day_name = DAY_NAMES[checked_in.weekday()]
+            slot = index.find(user_id, day_name, checked_in.hour * 60 + checked_in.minute)
+            arrival, minutes_late = classify_arrival(slot, checked_in)
+        else:
+            slot = index.get(record['schedule_id'])
+            arrival, minutes_late = record['arrival'], record['minutes_late']
+
+        if arrival == UNSCHEDULED:
+            employee['on_time'] += 1
+            employee['unscheduled'] += 1
+            continue
+
+        if arrival == LATE:
+            employee['late'] += 1
+            employee['minutes_late'][late_bucket(minutes_late)] += 1
+            employee['avg_minutes_late'] += minutes_late
+            late_total += minutes_late
+            status = 'Late'
+        else:
+            employee['on_time'] += 1
+            minutes_late = None
+            status = 'Present'
+
+        if details:
+            entries.append({
+                'user_id': user_id,
+                'name': employee['name'],
+                'user_status': employee['status'],
+                # The schedule may have been deleted since
+                'subject': describe_slot(slot) if slot is not None else record['subject'],
+                'date': checked_in.date().isoformat(),
+                'timestamp': record['timestamp'],
+                'attendance_status': status,
+                'minutes_late': minutes_late,
+            })
+
+    # Expected classes with no check-in, from the first day up to now
+    if start_date is None:
+        start_date = today
+    for absence in find_absences(conn, start_date, end_date, filters.get('user_id'), now):
+        user_id = absence['user_id']
+        employee = employees.get(user_id)
+        if employee is None:
+            employee = employees[user_id] = _new_employee(user_id, absence['user_name'], absence['user_status'])
+        employee['absent'] += 1
+        if details:
+            slot = dict(absence, day_of_week=DAY_NAMES[date.fromisoformat(absence['day']).weekday()])
+            entries.append({
+                'user_id': user_id,
+                'name': employee['name'],
+                'user_status': employee['status'],
+                'subject': describe_slot(slot),
+                'date': absence['day'],
+                'timestamp': None,
+                'attendance_status': 'Absent',
+                'minutes_late': None,
+            })
+
+    distribution = {label: 0 for _, label in LATE_BUCKETS}
+    for employee in employees.values():
+        if employee['late']:
+            employee['avg_minutes_late'] = round(employee['avg_minutes_late'] / employee['late'], 1)
+        for label, count in employee['minutes_late'].items():
+            distribution[label] += count
+
+    employee_list = sorted(employees.values(), key=lambda e: e['total'], reverse=True)
+    total = sum(e['total'] for e in employee_list)
+    on_time = sum(e['on_time'] for e in employee_list)
+    late = sum(e['late'] for e in employee_list)
+
+    result = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'totals': {
+            'employees': len(employee_list),
+            'attendance': total,
+            'on_time': on_time,
+            'late': late,
+            'absent': sum(e['absent'] for e in employee_list),
+            'on_time_rate': round(on_time / total * 100, 1) if total else 0,
+            'avg_minutes_late': round(late_total / late, 1) if late else 0,
+        },
+        'minutes_late': distribution,
+        'employees': employee_list,
+    }
+    if details:
+        entries.sort(key=lambda e: (e['date'], e['name'] or ''))
+        result['records'] = entries
+    return result
@@ -0,0 +1,145 @@
+"""Move closed months of attendance_records into per-month archive files.
+
+Each month goes to <archive dir>/attendance_YYYY_MM.db (see
+partitions.py for how readers find it). The copy is committed before
+the rows are deleted from the main database, so an interrupted run
+leaves rows in both places rather than in neither; running the same
+month again finishes the move. The daily summary and the all-time
+counter are left as they are, since the check-ins still exist.
+"""
+import os
+import sqlite3
+from datetime import date, timedelta
+
+from attendance import day_start_utc
+from database import ATTENDANCE_INDEXES
+from partitions import HOT_TABLE, attach_partition, create_partition_catalog, database_dir, detach_partition
+
+# Archive files live here, relative to the main database's directory
+ARCHIVE_DIRNAME = 'archive'
+
+# Months kept in the main database when no cutoff is given
+ARCHIVE_KEEP_MONTHS = 3
+
+# Archives get the same indexes as the hot table
+ARCHIVE_INDEXES = ATTENDANCE_INDEXES
+
+
+def month_start(year, month):
+    """First day of a month, normalizing month overflow (13 -> January next year)."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def default_cutoff(today=None):
+    """First month that stays in the main database by default."""
+    today = today or date.today()
+    return month_start(today.year, today.month - ARCHIVE_KEEP_MONTHS)
+
+
+def _archive_columns(conn, schema):
+    """Create the archive table to match main's attendance_records; return the column list."""
+    columns = conn.execute(f'PRAGMA main.table_info({HOT_TABLE})').fetchall()
+    definitions = []
+    for column in columns:
+        if column['pk']:
+            definitions.append(f"{column['name']} INTEGER PRIMARY KEY")
+        else:
+            definitions.append(f"{column['name']} {column['type']}")
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {schema}.{HOT_TABLE} ({", ".join(definitions)})')
+
+    # Columns added to main after the archive was created
+    existing = {row['name'] for row in conn.execute(f'PRAGMA {schema}.table_info({HOT_TABLE})').fetchall()}
+    for column in columns:
+        if column['name'] not in existing:
+            conn.execute(f"ALTER TABLE {schema}.{HOT_TABLE} ADD COLUMN {column['name']} {column['type']}")
+    return [column['name'] for column in columns]
+
+
+def archive_month(conn, year, month):
+    """Move one local calendar month of check-ins into its archive file.
+
+    Returns the number of rows moved.
+    """
+    first_day = month_start(year, month)
+    next_month = month_start(year, month + 1)
+    start, end = day_start_utc(first_day), day_start_utc(next_month)
+
+    count = conn.execute(
+        f'SELECT COUNT(*) FROM {HOT_TABLE} WHERE timestamp >= ? AND timestamp < ?', (start, end)
+    ).fetchone()[0]
+    if not count:
+        return 0
+
+    name = f'{year:04d}_{month:02d}'
+    relative_path = os.path.join(ARCHIVE_DIRNAME, f'attendance_{name}.db')
+    path = os.path.join(database_dir(conn), relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    schema = attach_partition(conn, {'name': name, 'path': relative_path})
+    try:
+        columns = ', '.join(_archive_columns(conn, schema))
+        conn.execute(f'''
+            INSERT OR IGNORE INTO {schema}.{HOT_TABLE} ({columns})
+            SELECT {columns} FROM main.{HOT_TABLE}
+            WHERE timestamp >= ? AND timestamp < ?
+        ''', (start, end))
+        for index_name, target in ARCHIVE_INDEXES:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.{index_name} ON {target}')
+        conn.commit()
+
+        # Only rows that made it into the archive leave the main database
+        conn.execute(f'''
+            DELETE FROM main.{HOT_TABLE}
+            WHERE timestamp >= ? AND timestamp < ?
+              AND id IN (SELECT id FROM {schema}.{HOT_TABLE} WHERE timestamp >= ? AND timestamp < ?)
+        ''', (start, end, start, end))
+        stats = conn.execute(f'''
+            SELECT COUNT(*) AS row_count, MIN(timestamp) AS first_timestamp, MAX(timestamp) AS last_timestamp
+            FROM {schema}.{HOT_TABLE}
+        ''').fetchone()
+        conn.execute('''
+            INSERT INTO attendance_partitions (name, path, start_day, end_day, first_timestamp,
+                                               last_timestamp, row_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                first_timestamp = excluded.first_timestamp,
+                last_timestamp = excluded.last_timestamp,
+                row_count = excluded.row_count,
+                archived_at = CURRENT_TIMESTAMP
+        ''', (name, relative_path, first_day.isoformat(), (next_month - timedelta(days=1)).isoformat(),
+              stats['first_timestamp'], stats['last_timestamp'], stats['row_count']))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        detach_partition(conn, schema)
+
+    # Archives are written once, so compact them while nothing has them open
+    archive = sqlite3.connect(path)
+    try:
+        archive.execute('VACUUM')
+    finally:
+        archive.close()
+    return count
+
+
+def archive_before(conn, cutoff):
+    """Archive every month before the month of cutoff. Returns {partition name: rows moved}."""
+    create_partition_catalog(conn)
+    first = conn.execute(f'SELECT MIN(timestamp) FROM {HOT_TABLE}').fetchone()[0]
+    if not first:
+        return {}
+
+    # The oldest row's UTC month may be one later than its local month
+    year, month = int(first[:4]), int(first[5:7]) - 1
+    moved = {}
+    while month_start(year, month) < month_start(cutoff.year, cutoff.month):
+        start = month_start(year, month)
+        count = archive_month(conn, start.year, start.month)
+        if count:
+            moved[f'{start.year:04d}_{start.month:02d}'] = count
+        month += 1
+    return moved
@@ -0,0 +1,340 @@
+"""Asyncio variant of the EduWatch API, served by aiohttp.
+
+Check-ins and logins wait on the group-commit writer (ingest.py) and the
+password pool (passwords.py) as coroutines rather than parked threads,
+so a spike of thousands of concurrent clients costs a few threads, not
+thousands. /api/attendance, /api/login, /api/dashboard, /api/health and
+the /api/attendance/stream live feed are native handlers. Every other
+route runs the Flask app from server.py on the same small database
+executor, so both variants serve the same API.
+
+Usage: pip install aiohttp && python async_server.py
+       (EDUWATCH_BIND, EDUWATCH_DB_THREADS)
+"""
+import asyncio
+import io
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from absences import start_scheduler
+from attendance import (ATTENDANCE_LAYOUT, FilterError, parse_attendance_filters, parse_page_size,
+                        fetch_attendance_page, fetch_records_after)
+from cache import version_etag
+from database import get_db_connection, init_database, pool
+from directory import user_directory
+from feed import STREAM_BATCH_SIZE, STREAM_HEARTBEAT, STREAM_RETRY_MS, format_event, latest_record_id, stats_payload
+from ingest import MAX_BULK_SIZE, commits, validate_check_in, writer as attendance_writer
+from passwords import PasswordBusy, hasher as password_hasher
+from serializers import dumps
+from server import ATTENDANCE_TABLES, PASSWORD_TIMEOUT, WRITE_TIMEOUT, create_app
+
+# Threads for SQLite work and for the Flask fallback
+DB_THREADS = int(os.environ.get('EDUWATCH_DB_THREADS', 4))
+
+# Large enough for a full bulk check-in upload
+MAX_REQUEST_BYTES = MAX_BULK_SIZE * 1024
+
+# Flask-CORS adds this to every Flask response; native handlers match it
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+
+DB_EXECUTOR = web.AppKey('db_executor', ThreadPoolExecutor)
+FLASK_APP = web.AppKey('flask_app', object)
+
+
+def json_response(request, payload, status=200, etag=None):
+    """Serialize payload; etag (from cache.version_etag) is sent as in server.py."""
+    headers = dict(CORS_HEADERS)
+    if etag is not None:
+        headers.update({'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+    return web.Response(body=dumps(payload), status=status, content_type='application/json', headers=headers)
+
+
+def not_modified(request, etag):
+    """Return a 304 if the client's If-None-Match already holds etag, else None."""
+    if etag is not None and f'"{etag}"' in request.headers.get('If-None-Match', ''):
+        return web.Response(status=304, headers={**CORS_HEADERS, 'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+    return None
+
+
+def error_response(request, message, status, **extra):
+    return json_response(request, {'success': False, 'message': message, **extra}, status)
+
+
+async def read_json(request):
+    """Return the parsed JSON body, or None if it is missing or invalid."""
+    try:
+        return await request.json()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def with_connection(fn, *args):
+    """Run fn(conn, *args) on a pooled connection; called on the DB executor."""
+    conn = pool.acquire()
+    try:
+        return fn(conn, *args)
+    finally:
+        pool.release(conn)
+
+
+async def run_db(request, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[DB_EXECUTOR], with_connection, fn, *args)
+
+
+async def wait_future(future, timeout):
+    """Await a concurrent.futures.Future from the writer or password pool."""
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+
+# --- Native handlers ---
+
+async def mark_attendance(request):
+    """Async /api/attendance: queue the check-in and await the group commit."""
+    check_in, error = validate_check_in(await read_json(request))
+    if error:
+        return error_response(request, error['message'], error['code'])
+
+    try:
+        outcome = await wait_future(attendance_writer.submit(check_in), WRITE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return error_response(request, 'Attendance service is busy. Please try again.', 503)
+
+    return json_response(request, {'success': outcome['success'], 'message': outcome['message']},
+                         outcome['code'])
+
+
+def _find_user(conn, username):
+    return user_directory.by_username(conn, username)
+
+
+def _replace_password(conn, user_id, old_hash, new_hash):
+    conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                 (new_hash, user_id, old_hash))
+    conn.commit()
+    user_directory.invalidate()
+
+
+async def login(request):
+    """Async /api/login: the KDF runs on the password pool."""
+    data = await read_json(request) or {}
+    username = data.get('username')
+    password = data.get('password')
+
+    if not username or not password:
+        return error_response(request, 'Username and password are required.', 400)
+
+    try:
+        user = await run_db(request, _find_user, username)
+    except sqlite3.Error as e:
+        print(f"Login error: {e}")
+        return error_response(request, 'Database error occurred.', 500)
+
+    # Unknown usernames are checked against a dummy hash so they take as long
+    try:
+        stored = user['password'] if user else None
+        valid, new_hash = await wait_future(password_hasher.verify(password, stored), PASSWORD_TIMEOUT)
+    except (PasswordBusy, asyncio.TimeoutError):
+        return error_response(request, 'Server is busy. Please try again.', 503)
+
+    if not user or not valid:
+        return error_response(request, 'Invalid username or password.', 401)
+
+    if new_hash:
+        try:
+            await run_db(request, _replace_password, user['id'], user['password'], new_hash)
+        except sqlite3.Error as e:
+            print(f"Password rehash error: {e}")
+
+    return json_response(request, {
+        'success': True,
+        'message': 'Login successful!',
+        'user': {
+            'id': user['id'],
+            'username': user['username'],
+            'full_name': user['full_name'],
+            'is_admin': bool(user['is_admin'])
+        }
+    })
+
+
+async def get_dashboard_data(request):
+    """Async /api/dashboard with the same filters, paging and ETag as server.py."""
+    try:
+        filters = parse_attendance_filters(request.query)
+        limit = parse_page_size(request.query.get('limit'))
+        cursor = request.query.get('cursor')
+        # Known before the query runs, so a current client costs one lookup
+        etag = await run_db(request, version_etag, ATTENDANCE_TABLES, request.path, request.query_string)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        records, next_cursor = await run_db(request, fetch_attendance_page, filters, limit, cursor)
+    except FilterError as e:
+        return error_response(request, str(e), 400, attendance=[])
+    except sqlite3.Error as e:
+        print(f"Dashboard error: {e}")
+        return error_response(request, 'Database error occurred.', 500, attendance=[])
+
+    return json_response(request, {'attendance': ATTENDANCE_LAYOUT.dicts(records), 'next_cursor': next_cursor},
+                         etag=etag)
+
+
+async def stream_attendance(request):
+    """Async /api/attendance/stream: same events as feed.py, without holding a thread.
+
+    The writer's commit notifications wake the coroutine through
+    call_soon_threadsafe; the queries themselves run on the DB executor.
+    """
+    try:
+        since_id = request.headers.get('Last-Event-ID') or request.query.get('since_id')
+        last_id = int(since_id) if since_id else None
+        user_id = int(request.query['user_id']) if request.query.get('user_id') else None
+    except ValueError:
+        return error_response(request, 'since_id and user_id must be integers.', 400)
+
+    response = web.StreamResponse(headers={
+        **CORS_HEADERS, 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+    })
+    await response.prepare(request)
+
+    loop = asyncio.get_running_loop()
+    committed = asyncio.Event()
+
+    def listener():
+        loop.call_soon_threadsafe(committed.set)
+
+    commits.subscribe(listener)
+    try:
+        if last_id is None:
+            last_id = await run_db(request, latest_record_id)
+        await response.write(f'retry: {STREAM_RETRY_MS}\n\n'.encode())
+        await response.write(format_event('stats', await run_db(request, stats_payload)).encode())
+
+        while True:
+            committed.clear()
+            records = await run_db(request, fetch_records_after, last_id, user_id, STREAM_BATCH_SIZE)
+            for record in records:
+                payload = ATTENDANCE_LAYOUT.to_dict(record)
+                last_id = payload['id']
+                await response.write(format_event('attendance', payload, last_id).encode())
+            if records:
+                await response.write(format_event('stats', await run_db(request, stats_payload)).encode())
+                if len(records) == STREAM_BATCH_SIZE:
+                    continue
+
+            try:
+                await asyncio.wait_for(committed.wait(), STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                await response.write(b': keepalive\n\n')
+    except (ConnectionResetError, sqlite3.Error) as e:
+        print(f"Attendance stream closed: {e}")
+    finally:
+        commits.unsubscribe(listener)
+    return response
+
+
+async def health_check(request):
+    return json_response(request, {'status': 'healthy', 'message': 'EduWatch API is running'})
+
+
+# --- Flask fallback ---
+
+def build_environ(request, body):
+    """Translate an aiohttp request into a WSGI environ."""
+    host, _, port = request.host.partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host or 'localhost',
+        'SERVER_PORT': port or ('443' if request.secure else '80'),
+        'SERVER_PROTOCOL': f'HTTP/{request.version.major}.{request.version.minor}',
+        'REMOTE_ADDR': request.remote or '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def wsgi_fallback(request):
+    """Serve any other route through the Flask app on the DB executor.
+
+    Streamed responses (CSV/NDJSON exports) are pulled one chunk at a
+    time, so they are not buffered in memory.
+    """
+    loop = asyncio.get_running_loop()
+    executor = request.app[DB_EXECUTOR]
+    environ = build_environ(request, await request.read())
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = status
+        started['headers'] = headers
+
+    iterable = await loop.run_in_executor(executor, request.app[FLASK_APP], environ, start_response)
+    try:
+        code, _, reason = started['status'].partition(' ')
+        response = web.StreamResponse(status=int(code), reason=reason)
+        for name, value in started['headers']:
+            response.headers.add(name, value)
+        await response.prepare(request)
+
+        chunks = iter(iterable)
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await response.write(chunk)
+        await response.write_eof()
+        return response
+    finally:
+        if hasattr(iterable, 'close'):
+            await loop.run_in_executor(executor, iterable.close)
+
+
+def create_async_app(flask_app=None):
+    """Build the aiohttp application. Does not touch the database schema."""
+    app = web.Application(client_max_size=MAX_REQUEST_BYTES)
+    app[DB_EXECUTOR] = ThreadPoolExecutor(DB_THREADS, thread_name_prefix='async-db')
+    app[FLASK_APP] = flask_app or create_app()
+
+    app.router.add_post('/api/attendance', mark_attendance)
+    app.router.add_post('/api/login', login)
+    app.router.add_get('/api/dashboard', get_dashboard_data)
+    app.router.add_get('/api/attendance/stream', stream_attendance)
+    app.router.add_get('/api/health', health_check)
+    app.router.add_route('*', '/{tail:.*}', wsgi_fallback)
+
+    async def shutdown_executor(app):
+        app[DB_EXECUTOR].shutdown(wait=False)
+
+    app.on_cleanup.append(shutdown_executor)
+    return app
+
+
+def main():
+    init_database()
+    start_scheduler(get_db_connection)
+    host, _, port = os.environ.get('EDUWATCH_BIND', '0.0.0.0:5000').rpartition(':')
+    web.run_app(create_async_app(), host=host, port=int(port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+import base64
+import json
+import re
+from itertools import islice
+from datetime import datetime, time, timedelta, timezone
+
+from partitions import attach_partition, detach_partition, hot, iter_attendance_records, list_partitions
+from serializers import RowLayout, tuple_cursor
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# A check-in counts for a class from this many minutes before it starts
+EARLY_WINDOW_MINUTES = 120
+# Check-ins more than this many minutes after the start are late
+LATE_GRACE_MINUTES = 5
+
+# Values of attendance_records.arrival, set when a check-in is written
+ON_TIME = 'On Time'
+LATE = 'Late'
+UNSCHEDULED = 'Unscheduled'
+
+# The class slot part of a subject label: "Monday (7:30 AM - 12:30 PM)"
+SLOT_LABEL = re.compile(r'^(?P<day>\w+) \((?P<hour>\d{1,2}):(?P<minute>\d{2}) (?P<meridiem>AM|PM) - ')
+
+
+def _time_12h(column):
+    """SQL for an HH:MM column as "7:30 AM", like formatTimeTo12Hour() in the frontend."""
+    hour = f'CAST(substr({column}, 1, 2) AS INTEGER)'
+    return (f"printf('%d:%s %s', ({hour} + 11) % 12 + 1, substr({column}, 4, 2), "
+            f"CASE WHEN {hour} < 12 THEN 'AM' ELSE 'PM' END)")
+
+
+# The label shown for a check-in: "Web Development - Monday (7:30 AM -
+# 12:30 PM)" from its schedule, else the text kept from before ids (or
+# frozen when the class was deleted), else the subject name
+SUBJECT_LABEL = f"""COALESCE(
+    sub.name || ' - ' || sc.day_of_week || ' (' || {_time_12h('sc.start_time')} || ' - '
+        || {_time_12h('sc.end_time')} || ')',
+    ar.legacy_subject, sub.name, '')"""
+
+# Dashboard rows are selected in exactly the shape the frontend expects;
+# records have no department column, so it is always 'N/A'. {records} is
+# the hot table or an archive partition (see partitions.py).
+ATTENDANCE_SELECT = f'''
+    SELECT ar.id, COALESCE(u.full_name, ar.legacy_name) AS name, 'N/A' AS department,
+           {SUBJECT_LABEL} AS subject, ar.status, u.status AS user_status, ar.timestamp, u.username
+    FROM {{records}} ar
+    LEFT JOIN users u ON ar.user_id = u.id
+    LEFT JOIN subjects sub ON ar.subject_id = sub.id
+    LEFT JOIN schedules sc ON ar.schedule_id = sc.id
+'''
+ATTENDANCE_LAYOUT = RowLayout(['id', 'name', 'department', 'subject', 'status', 'user_status',
+                               'timestamp', 'username'])
+_ID = ATTENDANCE_LAYOUT.index['id']
+_TIMESTAMP = ATTENDANCE_LAYOUT.index['timestamp']
+
+
+class FilterError(ValueError):
+    """Raised when a query string filter cannot be parsed."""
+
+
+def _parse_date(value, name):
+    """Parse a YYYY-MM-DD query parameter."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise FilterError(f'{name} must be a date in YYYY-MM-DD format.')
+
+
+def day_start_utc(day):
+    """Return local midnight of a date as a UTC timestamp string.
+
+    Check-ins are stored as UTC ISO strings (toISOString() in the
+    browser), so a local calendar day maps to a half-open range of
+    those strings.
+    """
+    start = datetime.combine(day, time()).astimezone(timezone.utc)
+    return start.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def parse_subject_label(label, subject_ids):
+    """Resolve a subject label to (subject_id, day_of_week, start_time).
+
+    Labels are a subject name, optionally followed by the class slot as
+    in "Web Development - Monday (7:30 AM - 12:30 PM)"; subject_ids maps
+    subject names to ids. Parts that cannot be resolved are None.
+    """
+    if not label:
+        return None, None, None
+
+    # Subject names may contain " - " themselves, so try the longest first
+    parts = label.split(' - ')
+    for count in range(len(parts), 0, -1):
+        subject_id = subject_ids.get(' - '.join(parts[:count]))
+        if subject_id is not None:
+            break
+    else:
+        return None, None, None
+
+    match = SLOT_LABEL.match(' - '.join(parts[count:]))
+    if not match:
+        return subject_id, None, None
+    hour = int(match['hour']) % 12 + (12 if match['meridiem'] == 'PM' else 0)
+    return subject_id, match['day'], f"{hour:02d}:{match['minute']}"
+
+
+def freeze_subject_labels(conn, column, value):
+    """Copy the current label into legacy_subject for check-ins whose
+    subject or schedule (column = 'subject_id' / 'schedule_id') is about
+    to be deleted, in the hot table and every archive.
+
+    Runs its own transactions, so call it before the request writes
+    anything else.
+    """
+    statement = f'''
+        UPDATE {{records}} AS ar
+        SET legacy_subject = (
+            SELECT {SUBJECT_LABEL}
+            FROM subjects sub
+            LEFT JOIN schedules sc ON sc.id = ar.schedule_id
+            WHERE sub.id = ar.subject_id
+        )
+        WHERE ar.{column} = ? AND ar.legacy_subject IS NULL
+    '''
+    conn.execute(hot(statement), (value,))
+    conn.commit()
+    for partition in list_partitions(conn):
+        schema = attach_partition(conn, partition)
+        try:
+            conn.execute(statement.replace('{records}', f'{schema}.attendance_records'), (value,))
+            conn.commit()
+        finally:
+            detach_partition(conn, schema)
+
+
+def encode_cursor(timestamp, record_id):
+    """Encode the (timestamp, id) of the last row on a page into an opaque cursor."""
+    raw = json.dumps([timestamp, record_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        timestamp, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(record_id)
+    except (ValueError, TypeError):
+        raise FilterError('Invalid cursor.')
+
+
+def parse_attendance_filters(args):
+    """Turn request query arguments into a filter dict.
+
+    Supported arguments: start_date, end_date (inclusive, YYYY-MM-DD),
+    today (shortcut for start_date = end_date = today), user_id, subject
+    and status.
+    """
+    filters = {}
+
+    if args.get('today') in ('1', 'true', 'yes'):
+        today = datetime.now().date()
+        filters['start_date'] = today
+        filters['end_date'] = today
+    else:
+        if args.get('start_date'):
+            filters['start_date'] = _parse_date(args['start_date'], 'start_date')
+        if args.get('end_date'):
+            filters['end_date'] = _parse_date(args['end_date'], 'end_date')
+
+    if 'start_date' in filters and 'end_date' in filters and filters['start_date'] > filters['end_date']:
+        raise FilterError('start_date must not be after end_date.')
+
+    if args.get('user_id'):
+        try:
+            filters['user_id'] = int(args['user_id'])
+        except ValueError:
+            raise FilterError('user_id must be an integer.')
+
+    if args.get('subject'):
+        filters['subject'] = args['subject']
+
+    if args.get('status'):
+        filters['status'] = args['status']
+
+    return filters
+
+
+def build_attendance_where(filters, alias='ar'):
+    """Build a WHERE clause and its parameters from a filter dict.
+
+    Dates are local calendar days, turned into half-open ranges on the
+    raw timestamp string so that SQLite can answer them from an index
+    on timestamp.
+    """
+    clauses = []
+    params = []
+
+    if 'start_date' in filters:
+        clauses.append(f'{alias}.timestamp >= ?')
+        params.append(day_start_utc(filters['start_date']))
+    if 'end_date' in filters:
+        clauses.append(f'{alias}.timestamp < ?')
+        params.append(day_start_utc(filters['end_date'] + timedelta(days=1)))
+    if 'user_id' in filters:
+        clauses.append(f'{alias}.user_id = ?')
+        params.append(filters['user_id'])
+    if 'subject' in filters:
+        # Older rows that kept their text label look like "Web Development -
+        # Monday (7:30 AM - 12:30 PM)", so a subject name matches every slot
+        # that starts with it.
+        clauses.append(f"({alias}.subject_id IN (SELECT id FROM subjects WHERE name = ?)"
+                       f" OR {alias}.legacy_subject = ? OR {alias}.legacy_subject LIKE ? ESCAPE '\\')")
+        escaped = filters['subject'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.extend([filters['subject'], filters['subject'], escaped + ' - %'])
+    if 'status' in filters:
+        clauses.append(f'{alias}.status = ?')
+        params.append(filters['status'])
+
+    where = ' AND '.join(clauses) if clauses else '1 = 1'
+    return where, params
+
+
+def parse_page_size(value):
+    """Parse the limit query argument, clamped to MAX_PAGE_SIZE."""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise FilterError('limit must be an integer.')
+    if limit < 1:
+        raise FilterError('limit must be positive.')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _record_key(row):
+    return row[_TIMESTAMP], row[_ID]
+
+
+def fetch_attendance_page(conn, filters, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Return one page of attendance rows (newest first) and the next cursor.
+
+    Rows are tuples in ATTENDANCE_LAYOUT order.
+
+    Pagination is keyset based on (timestamp, id): the cursor holds the
+    last row of the previous page, so each page is an index range scan
+    instead of an OFFSET that re-reads every earlier row. Archived months
+    are only read when the date filters reach them.
+    """
+    where, params = build_attendance_where(filters)
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = iter_attendance_records(conn, ATTENDANCE_SELECT, where, params, _record_key, filters,
+                                   descending=True, after=after, batch_size=limit + 1)
+    try:
+        records = list(islice(rows, limit + 1))
+    finally:
+        rows.close()
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(*_record_key(records[-1]))
+
+    return records, next_cursor
+
+
+def today_counts(conn):
+    """Return (check-ins today, breakdown by user status) from the summary table."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    status_stats = conn.execute('''
+        SELECT user_status, SUM(count) as count
+        FROM daily_attendance_summary
+        WHERE day = ?
+        GROUP BY user_status
+    ''', (today,)).fetchall()
+
+    status_breakdown = {}
+    today_attendance = 0
+    for stat in status_stats:
+        status_breakdown[stat['user_status'] or None] = stat['count']
+        today_attendance += stat['count']
+    return today_attendance, status_breakdown
+
+
+def fetch_records_after(conn, last_id, user_id=None, limit=DEFAULT_PAGE_SIZE):
+    """Return up to limit records with an id above last_id, oldest first.
+
+    Rows are tuples in ATTENDANCE_LAYOUT order.
+    """
+    where = 'ar.id > ?'
+    params = [last_id]
+    if user_id is not None:
+        where += ' AND ar.user_id = ?'
+        params.append(user_id)
+    return tuple_cursor(conn).execute(f'''
+        {hot(ATTENDANCE_SELECT)}
+        WHERE {where}
+        ORDER BY ar.id
+        LIMIT ?
+    ''', params + [limit]).fetchall()
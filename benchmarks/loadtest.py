@@ -0,0 +1,287 @@
+"""Load test for the EduWatch API at several attendance table sizes.
+
+Seeds a scratch database (never eduwatch.db itself unless --db points
+there) with synthetic users, schedules and attendance rows, starts a
+server on it, and drives each endpoint with concurrent keep-alive
+clients. The table is grown between rounds, so one run measures how
+latency changes with data size. Results are JSON, suitable for keeping
+as a baseline and diffing against a later run with --compare.
+
+Usage:
+    python benchmarks/loadtest.py --sizes 10000,100000,1000000 --output baseline.json
+    python benchmarks/loadtest.py --sizes 10000,100000,1000000 --compare baseline.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import passwords
+from serving import PORT, SERVERS, wait_for_port
+
+SEED_USERS = 200
+SEED_DAYS = 180
+SEED_BATCH = 10000
+PASSWORD = 'loadtest'
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def endpoints(users):
+    """(name, method, path factory, body factory) for every measured endpoint."""
+    week_end = datetime.now().date()
+    week_start = week_end - timedelta(days=6)
+    week = f'start_date={week_start}&end_date={week_end}'
+
+    def check_in():
+        return {'full_name': f'Load User {random.choice(users)[1]}', 'subject': 'Load Subject',
+                'status': 'Present', 'timestamp': utc_now()}
+
+    return [
+        ('attendance', 'POST', lambda: '/api/attendance', check_in),
+        ('login', 'POST', lambda: '/api/login',
+         lambda: {'username': f'load{random.choice(users)[1]}', 'password': PASSWORD}),
+        ('dashboard_page', 'GET', lambda: '/api/dashboard?limit=500', None),
+        ('dashboard_today_user', 'GET',
+         lambda: f'/api/dashboard?today=1&user_id={random.choice(users)[0]}', None),
+        ('dashboard_week', 'GET', lambda: f'/api/dashboard?{week}&limit=500', None),
+        ('stats', 'GET', lambda: '/api/stats', None),
+        ('analytics_week', 'GET', lambda: f'/api/analytics?{week}', None),
+    ]
+
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+# --- Seeding ---
+
+def seed_users(db_path):
+    """Create the synthetic users and their weekly schedules.
+
+    Returns (user id, number) pairs; user number n is username loadN,
+    full name 'Load User N'.
+    """
+    conn = sqlite3.connect(db_path)
+    hashed = passwords.hash_password(PASSWORD)
+    subject_ids = [row[0] for row in conn.execute('SELECT id FROM subjects')]
+
+    conn.executemany('''
+        INSERT OR IGNORE INTO users (username, password, full_name, email, contact_number, address, status, is_admin)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+    ''', [(f'load{i}', hashed, f'Load User {i}', f'load{i}@example.com', '000', 'Load Street',
+           random.choice(['Full Time', 'Part Time'])) for i in range(SEED_USERS)])
+    conn.commit()
+
+    users = conn.execute("SELECT id, username FROM users WHERE username LIKE 'load%'").fetchall()
+    conn.execute('DELETE FROM schedules WHERE user_id IN (SELECT id FROM users WHERE username LIKE \'load%\')')
+    schedules = []
+    for user_id, _ in users:
+        for day in random.sample(DAY_NAMES[:6], 3):
+            start = random.choice([7, 9, 13, 15])
+            schedules.append((user_id, random.choice(subject_ids), day, f'{start:02d}:30', f'{start + 2:02d}:00'))
+    conn.executemany('''
+        INSERT INTO schedules (user_id, subject_id, day_of_week, start_time, end_time)
+        VALUES (?, ?, ?, ?, ?)
+    ''', schedules)
+    conn.commit()
+    conn.close()
+    return [(user_id, int(username[4:])) for user_id, username in users]
+
+
+def grow_attendance(db_path, target_rows):
+    """Add synthetic check-ins until attendance_records holds target_rows."""
+    conn = sqlite3.connect(db_path)
+    users = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'load%'")]
+    subject_ids = [row[0] for row in conn.execute('SELECT id FROM subjects')]
+    current = conn.execute('SELECT COUNT(*) FROM attendance_records').fetchone()[0]
+    now = datetime.now(timezone.utc)
+
+    while current < target_rows:
+        count = min(SEED_BATCH, target_rows - current)
+        rows = []
+        for _ in range(count):
+            when = now - timedelta(seconds=random.randint(0, SEED_DAYS * 86400))
+            rows.append((random.choice(users), random.choice(subject_ids), 'Present',
+                         when.strftime('%Y-%m-%dT%H:%M:%S.000Z')))
+        conn.executemany('''
+            INSERT INTO attendance_records (user_id, subject_id, status, timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        current += count
+    conn.close()
+    return current
+
+
+# --- Load generation ---
+
+def client(stop, method, path_for, body_for, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+    while not stop.is_set():
+        body = json.dumps(body_for()) if body_for else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        started = time.perf_counter()
+        try:
+            conn.request(method, path_for(), body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def measure(method, path_for, body_for, clients, seconds):
+    """Run clients against one endpoint for seconds; return the latency summary."""
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(stop, method, path_for, body_for, latencies, errors))
+               for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def compare(results, baseline_path):
+    """Print the change in throughput and p95 against a previous run."""
+    with open(baseline_path) as f:
+        baseline = {(r['rows'], r['endpoint']): r for r in json.load(f)['results']}
+    print(f'{"rows":>9}  {"endpoint":<22} {"req/s":>16} {"p95 ms":>18}', file=sys.stderr)
+    for result in results:
+        old = baseline.get((result['rows'], result['endpoint']))
+        if not old:
+            continue
+
+        def delta(key):
+            if not old[key] or result[key] is None:
+                return 'n/a'
+            return f"{result[key]:.1f} ({(result[key] - old[key]) / old[key] * 100:+.0f}%)"
+
+        print(f"{result['rows']:>9}  {result['endpoint']:<22} {delta('requests_per_sec'):>16} "
+              f"{delta('p95_ms'):>18}", file=sys.stderr)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='comma separated attendance row counts, measured in increasing order')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10, help='duration per endpoint and size')
+    parser.add_argument('--server', default='gunicorn', choices=sorted(SERVERS))
+    parser.add_argument('--endpoints', help='comma separated subset of endpoint names')
+    parser.add_argument('--db', help='database file to seed (default: a temporary file)')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='previous JSON results to diff against')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.abspath(args.db or os.path.join(tmp, 'loadtest.db'))
+        env = dict(os.environ, EDUWATCH_DB=db_path, EDUWATCH_BIND=f'127.0.0.1:{PORT}',
+                   EDUWATCH_ACCESS_LOG='/dev/null')
+        subprocess.run([sys.executable, 'manage.py', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        users = seed_users(db_path)
+
+        selected = endpoints(users)
+        if args.endpoints:
+            wanted = set(args.endpoints.split(','))
+            selected = [endpoint for endpoint in selected if endpoint[0] in wanted]
+
+        results = []
+        for size in sizes:
+            seeding = time.perf_counter()
+            rows = grow_attendance(db_path, size)
+            print(f'{rows} rows seeded in {time.perf_counter() - seeding:.1f}s', file=sys.stderr)
+
+            process = subprocess.Popen(SERVERS[args.server], cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not wait_for_port():
+                    raise SystemExit(f'{args.server} did not start')
+                for name, method, path_for, body_for in selected:
+                    measure(method, path_for, body_for, args.clients, 1)  # warm up
+                    summary = measure(method, path_for, body_for, args.clients, args.seconds)
+                    results.append({'rows': rows, 'endpoint': name, **summary})
+                    print(f'{rows:>9} {name:<22} {summary["requests_per_sec"]:>8} req/s  '
+                          f'p95 {summary["p95_ms"]} ms', file=sys.stderr)
+            finally:
+                process.terminate()
+                process.wait()
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'cpus': os.cpu_count(),
+            'server': args.server,
+            'clients': args.clients,
+            'seconds': args.seconds,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
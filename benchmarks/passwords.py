@@ -0,0 +1,82 @@
+"""Login throughput at different password hashing costs.
+
+For each cost setting, hashes one password and then verifies it
+repeatedly through the bounded hashing pool, the way /api/login does.
+Reports cold verifications (full KDF) and memoized repeats separately.
+
+Usage: python benchmarks/passwords.py [--logins 200] [--workers N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords
+
+SETTINGS = [
+    # Every login of a legacy hash also pays for the upgrade to scrypt
+    ('legacy sha256 + rehash', {'PASSWORD_SCHEME': 'scrypt', 'SCRYPT_N': 2 ** 14}),
+    ('pbkdf2_sha256 i=200000', {'PASSWORD_SCHEME': 'pbkdf2_sha256', 'PBKDF2_ITERATIONS': 200000}),
+    ('pbkdf2_sha256 i=600000', {'PASSWORD_SCHEME': 'pbkdf2_sha256', 'PBKDF2_ITERATIONS': 600000}),
+    ('scrypt n=2^13', {'PASSWORD_SCHEME': 'scrypt', 'SCRYPT_N': 2 ** 13}),
+    ('scrypt n=2^14', {'PASSWORD_SCHEME': 'scrypt', 'SCRYPT_N': 2 ** 14}),
+    ('scrypt n=2^15', {'PASSWORD_SCHEME': 'scrypt', 'SCRYPT_N': 2 ** 15}),
+]
+
+
+def run_logins(hasher, stored, count):
+    """Submit count verifications at once and time each of them."""
+    latencies = []
+    started = time.perf_counter()
+    futures = []
+    for _ in range(count):
+        submitted = time.perf_counter()
+        future = hasher.verify('correct horse', stored)
+        future.add_done_callback(lambda _, t=submitted: latencies.append(time.perf_counter() - t))
+        futures.append(future)
+    for future in futures:
+        assert future.result()[0]
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'logins_per_sec': round(count / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=passwords.VERIFY_WORKERS)
+    args = parser.parse_args()
+
+    results = []
+    for label, overrides in SETTINGS:
+        for name, value in overrides.items():
+            setattr(passwords, name, value)
+        if label.startswith('legacy'):
+            stored = passwords.hashlib.sha256(b'correct horse').hexdigest()
+        else:
+            stored = passwords.hash_password('correct horse')
+
+        # Cold: a fresh memo every time, so each login pays the full KDF
+        hasher = passwords.PasswordHasher(args.workers, max_pending=args.logins)
+        hasher.memo.max_entries = 0
+        cold = run_logins(hasher, stored, args.logins)
+
+        hasher = passwords.PasswordHasher(args.workers, max_pending=args.logins)
+        hasher.verify('correct horse', stored).result()
+        warm = run_logins(hasher, stored, args.logins)
+
+        results.append({'setting': label, 'workers': args.workers, 'cold': cold, 'memoized': warm})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""CPU cost of serializing /api/dashboard rows, old path versus new.
+
+Builds an in-memory copy of the attendance tables with --rows rows and
+measures CPU time (time.process_time) per 10k rows for:
+- rows_dict_jsonify: sqlite3.Row, dict(record) plus .get() per field,
+  and json.dumps with jsonify's settings (the path before serializers.py)
+- tuples_layout_stdlib: tuple rows through ATTENDANCE_LAYOUT, stdlib json
+- tuples_layout_orjson: the same with orjson, if it is installed
+
+Usage: python benchmarks/serialization.py [--rows 10000] [--repeat 7]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializers
+from attendance import ATTENDANCE_LAYOUT, ATTENDANCE_SELECT, SUBJECT_LABEL
+from partitions import hot
+
+
+def build_db(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, full_name TEXT, status TEXT);
+        CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE schedules (id INTEGER PRIMARY KEY, user_id INTEGER, subject_id INTEGER, day_of_week TEXT,
+            start_time TEXT, end_time TEXT);
+        CREATE TABLE attendance_records (id INTEGER PRIMARY KEY, user_id INTEGER, subject_id INTEGER,
+            schedule_id INTEGER, status TEXT, timestamp TEXT, created_at TEXT, legacy_name TEXT,
+            legacy_subject TEXT);
+        INSERT INTO subjects VALUES (1, 'Web Development');
+    ''')
+    conn.executemany('INSERT INTO users VALUES (?, ?, ?, ?)',
+                     [(i, f'user{i}', f'User Number {i}', random.choice(['Full Time', 'Part Time']))
+                      for i in range(200)])
+    conn.executemany('INSERT INTO schedules VALUES (?, ?, 1, ?, ?, ?)',
+                     [(i, i, 'Monday', '07:30', '12:30') for i in range(200)])
+    conn.executemany('INSERT INTO attendance_records (user_id, subject_id, schedule_id, status, timestamp) '
+                     'VALUES (?, 1, ?, ?, ?)',
+                     [(i % 200, i % 200, 'Present', f'2025-01-{i % 28 + 1:02d}T08:{i % 60:02d}:00.000Z')
+                      for i in range(rows)])
+    return conn
+
+
+def rows_dict_jsonify(conn):
+    conn.row_factory = sqlite3.Row
+    records = conn.execute(f'''
+        SELECT ar.*, u.full_name, u.username, u.status as user_status, {SUBJECT_LABEL} as subject
+        FROM attendance_records ar LEFT JOIN users u ON ar.user_id = u.id
+        LEFT JOIN subjects sub ON ar.subject_id = sub.id
+        LEFT JOIN schedules sc ON ar.schedule_id = sc.id
+    ''').fetchall()
+    conn.row_factory = None
+    attendance_list = []
+    for record in records:
+        record_dict = dict(record)
+        attendance_list.append({
+            'id': record_dict.get('id'),
+            'name': record_dict.get('full_name'),
+            'department': record_dict.get('department', 'N/A'),
+            'subject': record_dict.get('subject', record_dict.get('department', 'N/A')),
+            'status': record_dict.get('status', 'Present'),
+            'user_status': record_dict.get('user_status', 'Unknown'),
+            'timestamp': record_dict.get('timestamp'),
+            'username': record_dict.get('username')
+        })
+    # Flask's DefaultJSONProvider outside debug mode
+    return json.dumps({'attendance': attendance_list}, sort_keys=True, separators=(',', ':')).encode()
+
+
+def tuples_layout(conn):
+    records = serializers.tuple_cursor(conn).execute(hot(ATTENDANCE_SELECT)).fetchall()
+    return serializers.dumps({'attendance': ATTENDANCE_LAYOUT.dicts(records)})
+
+
+def measure(fn, conn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(conn)
+        samples.append(time.process_time() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    conn = build_db(args.rows)
+    orjson = serializers.orjson
+
+    variants = [('rows_dict_jsonify', rows_dict_jsonify)]
+    serializers.orjson = None
+    variants.append(('tuples_layout_stdlib', tuples_layout))
+    results = {}
+    for name, fn in variants:
+        results[name] = measure(fn, conn, args.repeat)
+    if orjson is not None:
+        serializers.orjson = orjson
+        results['tuples_layout_orjson'] = measure(tuples_layout, conn, args.repeat)
+
+    baseline = results['rows_dict_jsonify']
+    report = {
+        'rows': args.rows,
+        'orjson': orjson is not None,
+        'cpu_ms_per_10k_rows': {name: round(seconds / args.rows * 10000 * 1000, 2)
+                                for name, seconds in results.items()},
+        'speedup': {name: round(baseline / seconds, 2) for name, seconds in results.items()},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
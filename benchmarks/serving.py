@@ -0,0 +1,132 @@
+"""Request throughput of the dev server versus the production servers.
+
+Starts each server on a scratch copy of the database (EDUWATCH_DB),
+drives it with concurrent keep-alive clients for a fixed time, and
+prints requests per second and latency percentiles as JSON. Servers
+that are not installed are skipped.
+
+Usage: python benchmarks/serving.py [--seconds 10] [--clients 16]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5055
+
+# Paths are requested round-robin by every client
+PATHS = ['/api/health', '/api/stats', '/api/subjects', '/api/dashboard?limit=50']
+
+SERVERS = {
+    'flask-dev': [sys.executable, '-c',
+                  'from server import create_app; '
+                  f'create_app().run(host="127.0.0.1", port={PORT}, debug=True, use_reloader=False)'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                 '--bind', f'127.0.0.1:{PORT}', '--access-logfile', '/dev/null', 'wsgi:app'],
+    'waitress': [sys.executable, 'serve.py'],
+    'aiohttp': [sys.executable, 'async_server.py'],
+}
+
+
+def wait_for_port(timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', PORT), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def client(stop, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+    i = 0
+    while not stop.is_set():
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def run_load(seconds, clients):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(stop, latencies, errors)) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, EDUWATCH_DB=os.path.join(tmp, 'bench.db'),
+                   EDUWATCH_BIND=f'127.0.0.1:{PORT}')
+        source = os.path.join(ROOT, 'eduwatch.db')
+        if os.path.exists(source):
+            shutil.copy(source, env['EDUWATCH_DB'])
+        subprocess.run([sys.executable, 'manage.py', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+
+        for name in args.servers.split(','):
+            process = subprocess.Popen(SERVERS[name], cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not wait_for_port():
+                    results.append({'server': name, 'skipped': 'did not start (not installed?)'})
+                    continue
+                run_load(1, args.clients)  # warm up
+                results.append({'server': name, 'clients': args.clients, **run_load(args.seconds, args.clients)})
+            finally:
+                process.terminate()
+                process.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
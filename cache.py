@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Most cached responses are per-user schedule lists, so a few hundred
+# entries covers a busy admin session.
+CACHE_MAX_ENTRIES = 256
+# Entries are keyed by version ETag and never go stale; the TTL only
+# frees the ones no longer asked for
+CACHE_TTL = 60  # seconds
+
+# strftime formats of the clock part of a version ETag: responses about
+# "today" change at midnight, live analytics as each class ends
+DAY = '%Y-%m-%d'
+MINUTE = '%Y-%m-%dT%H:%M'
+
+
+class ResponseCache:
+    """Bounded LRU cache of serialized JSON responses.
+
+    Keys are version ETags (see version_etag), so a write anywhere makes
+    the old entries unreachable. Each entry is tagged with the tables it
+    was built from, and write handlers call invalidate() with the tables
+    they change to free them early. Entries also expire after a TTL.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached body for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['body']
+
+    def set(self, key, tables, body):
+        """Store a body, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = {
+                'tables': frozenset(tables),
+                'body': body,
+                'expires': time.monotonic() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tables):
+        """Drop every entry built from any of the given tables."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry['tables'] & set(tables)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def version_etag(conn, tables, path, query_string, clock=DAY):
+    """Return the ETag of a GET response built from tables, before building it.
+
+    It hashes the tables' version stamps (bumped by triggers on every
+    write, see database.create_table_versions), the path and query
+    string, and the local time formatted with clock. Every worker
+    computes the same tag. Returns None if a table has no stamp.
+    """
+    placeholders = ', '.join('?' * len(tables))
+    versions = dict(conn.execute(
+        f'SELECT name, version FROM table_versions WHERE name IN ({placeholders})', tables
+    ).fetchall())
+    if len(versions) < len(set(tables)):
+        return None
+    stamps = ','.join(f'{table}:{versions[table]}' for table in sorted(set(tables)))
+    key = f'{stamps}|{datetime.now().strftime(clock)}|{path}?{query_string}'
+    return hashlib.sha1(key.encode()).hexdigest()
@@ -0,0 +1,285 @@
+"""Query plan regression check for the EduWatch API.
+
+Drives every route in server.py against a scratch copy of the schema,
+captures each SQL statement the handlers execute, and runs
+EXPLAIN QUERY PLAN on it. Exits with status 1 if any statement falls
+back to a full table scan or any scenario gets a 5xx response.
+
+Usage: python check_query_plans.py [-v]
+"""
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+
+import absences
+import archive
+import database
+import feed
+
+# Scans that are the whole point of the statement rather than a missing index.
+ALLOWED_SCANS = [
+    # clear_all_attendance deliberately deletes every row
+    re.compile(r'^DELETE FROM attendance_records$'),
+    # ...and drops every archive partition listed in the catalog
+    re.compile(r'^SELECT path FROM attendance_partitions$'),
+    re.compile(r'^DELETE FROM attendance_partitions$'),
+    # The user directory loads the whole users table when it changes...
+    re.compile(r'^SELECT \* FROM users ORDER BY id$'),
+    # ...and the schedule index the whole schedules table
+    re.compile(r'^SELECT id, user_id, subject_id, day_of_week, start_time, end_time FROM schedules$'),
+]
+
+# A plan line such as "SCAN attendance_records" (no index) is a full scan.
+# "SCAN users USING INDEX ..." and "... USING COVERING INDEX ..." walk an
+# index in order and are fine. The schema catalog is exempt: it is tiny
+# and not part of the data model. So is the calendar the absence job
+# generates (the days CTE in absences.py).
+FULL_SCAN = re.compile(r'^SCAN (?!(?:sqlite_master|days)\b)(\w+)(?: AS \w+)?$')
+
+# Every route is exercised once with representative arguments. New routes
+# must be added here, otherwise the check fails.
+SCENARIOS = [
+    ('GET', '/api/health', None),
+    ('GET', '/api/admin/cache', None),
+    ('GET', '/api/metrics', None),
+    ('POST', '/api/register', {
+        'username': 'planuser', 'password': 'secret', 'fullName': 'Plan User',
+        'email': 'plan@example.com', 'contact': '123', 'address': 'Somewhere', 'status': 'Full Time',
+    }),
+    ('POST', '/api/login', {'username': 'planuser', 'password': 'secret'}),
+    ('POST', '/api/attendance', {
+        'full_name': 'Plan User', 'subject': 'Web Development - Monday (7:30 AM - 12:30 PM)',
+        'department': 'Web Development', 'status': 'Present', 'timestamp': '2024-01-01T08:00:00.000Z',
+        'idempotency_key': 'plan-check-1',
+    }),
+    ('POST', '/api/attendance/bulk', [
+        {'full_name': 'Plan User', 'subject': 'Web Development', 'timestamp': '2024-01-02T08:00:00.000Z',
+         'idempotency_key': 'plan-check-2'},
+        {'full_name': 'Nobody', 'subject': 'Web Development', 'timestamp': '2024-01-02T08:00:00.000Z'},
+    ]),
+    # Not a route: moves January 2024 into an archive partition, so the
+    # date-filtered reads below also query the archive
+    ('ARCHIVE', '2024-01', None),
+    ('GET', '/api/dashboard', None),
+    ('GET', '/api/attendance/stream?since_id=0', None),
+    ('GET', '/api/attendance/stream?user_id={user_id}', None),
+    ('GET', '/api/dashboard?today=1&user_id={user_id}', None),
+    ('GET', '/api/dashboard?start_date=2024-01-01&end_date=2024-01-31', None),
+    ('GET', '/api/dashboard?subject=Web%20Development&status=Present&limit=1', None),
+    ('GET', '/api/stats', None),
+    ('GET', '/api/analytics', None),
+    ('GET', '/api/reports/attendance.csv?start_date=2024-01-01&end_date=2024-01-31', None),
+    ('GET', '/api/reports/attendance.ndjson?user_id={user_id}', None),
+    ('GET', '/api/analytics?start_date=2024-01-01&end_date=2024-01-07&user_id={user_id}&details=1', None),
+    # Not a route: the absence job over the first week, now archived
+    ('ABSENCES', '2024-01-01/2024-01-07', None),
+    ('GET', '/api/admin/absences?start_date=2024-01-01&end_date=2024-01-07', None),
+    ('GET', '/api/admin/absences?user_id={user_id}', None),
+    ('GET', '/api/subjects', None),
+    ('POST', '/api/subjects', {'name': 'Plan Subject', 'description': 'For the plan check'}),
+    ('POST', '/api/admin/import/subjects', 'name,description\nImported Subject,From CSV\n'),
+    ('POST', '/api/admin/import/users',
+     'username,password,full_name,email,contact_number,address,status\n'
+     'importeduser,secret,Imported User,imp@example.com,123,Somewhere,Part Time\n'),
+    ('POST', '/api/admin/import/schedules',
+     'username,subject,day_of_week,start_time,end_time\nimporteduser,Imported Subject,Tuesday,09:00,10:30\n'),
+    ('GET', '/api/admin/users', None),
+    ('PUT', '/api/admin/users/{user_id}', {
+        'full_name': 'Plan User', 'email': 'plan@example.com', 'contact_number': '123',
+        'address': 'Somewhere', 'status': 'Part Time',
+    }),
+    ('GET', '/api/admin/users/{user_id}/subjects', None),
+    ('PUT', '/api/admin/users/{user_id}/subjects', {'subject_ids': [1, 2]}),
+    ('PUT', '/api/admin/users/subjects', {'assignments': [
+        {'user_id': 1, 'subject_ids': [1]}, {'user_id': 2, 'subject_ids': [2, 3]},
+    ]}),
+    ('PUT', '/api/admin/users/subjects', {'assignments': [{'user_id': 2, 'subject_ids': [3]}]}),
+    ('GET', '/api/users/{user_id}/subjects', None),
+    ('POST', '/api/admin/users/{user_id}/schedules', {
+        'subject_id': 1, 'day_of_week': 'Monday', 'start_time': '07:30', 'end_time': '12:30',
+    }),
+    ('GET', '/api/admin/users/{user_id}/schedules', None),
+    ('GET', '/api/admin/schedules', None),
+    ('DELETE', '/api/admin/schedules/{schedule_id}', None),
+    ('GET', '/api/profile/planuser', None),
+    ('PUT', '/api/profile/update', {
+        'currentUsername': 'planuser', 'newUsername': 'planuser', 'fullName': 'Plan User Renamed',
+        'email': 'plan@example.com', 'contact': '123', 'address': 'Somewhere', 'status': 'Full Time',
+    }),
+    ('DELETE', '/api/subjects/{subject_id}', None),
+    ('DELETE', '/api/admin/clear_attendance', None),
+]
+
+# Handlers leave schema changes and catalog lookups to the migrations
+# (database.MIGRATIONS) and the snapshot read at startup
+SCHEMA_WORK = re.compile(r'^\s*(CREATE|ALTER|DROP)\b|\bsqlite_master\b|\btable_info\b', re.IGNORECASE)
+
+PARTITION_SCHEMA = re.compile(r'\b(part_\w+)\.')
+
+DML = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+
+
+def normalize(sql):
+    """Collapse whitespace so the same statement is only checked once."""
+    return ' '.join(sql.split())
+
+
+def lookup_ids(conn):
+    """Find the ids of the rows the scenarios created so far."""
+    queries = {
+        'user_id': "SELECT id FROM users WHERE username = 'planuser'",
+        'schedule_id': 'SELECT MAX(id) FROM schedules',
+        'subject_id': "SELECT id FROM subjects WHERE name = 'Plan Subject'",
+    }
+    ids = {}
+    for key, sql in queries.items():
+        row = conn.execute(sql).fetchone()
+        ids[key] = row[0] if row and row[0] is not None else 0
+    return ids
+
+
+def read_one_poll(response):
+    """Consume a live feed until its first keep-alive, then disconnect."""
+    try:
+        for chunk in response.response:
+            if chunk.startswith(b': keepalive'):
+                break
+    finally:
+        response.close()
+
+
+def run_scenarios(app, statements, schema_work, server_errors):
+    """Call every scenario through the Flask test client, recording SQL.
+
+    Schema statements issued while a request is handled go to
+    schema_work, and scenarios answered with a 5xx to server_errors.
+    """
+    original = database.get_db_connection
+
+    def traced_connection():
+        conn = original()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    # Live feeds would otherwise wait for a commit before polling again
+    feed.STREAM_HEARTBEAT = 0
+    # The pool opens its connections through database.get_db_connection
+    database.pool.close_all()
+    database.get_db_connection = traced_connection
+    client = app.test_client()
+    adapter = app.url_map.bind('localhost')
+    ids = {}
+    covered = set()
+
+    try:
+        for method, url, body in SCENARIOS:
+            if method == 'ARCHIVE':
+                conn = traced_connection()
+                archive.archive_month(conn, *map(int, url.split('-')))
+                conn.close()
+                continue
+            if method == 'ABSENCES':
+                conn = traced_connection()
+                absences.detect_absences(conn, *map(date.fromisoformat, url.split('/')))
+                conn.close()
+                continue
+            if '{' in url:
+                conn = original()
+                ids = lookup_ids(conn)
+                conn.close()
+            path = url.format(**ids)
+            first = len(statements)
+            if isinstance(body, str):
+                response = client.open(path, method=method, data=body, content_type='text/csv')
+            else:
+                response = client.open(path, method=method, json=body)
+            if response.mimetype == 'text/event-stream':
+                read_one_poll(response)
+            schema_work.extend((method, url, normalize(sql)) for sql in statements[first:]
+                               if SCHEMA_WORK.search(sql))
+            rule, _ = adapter.match(path.split('?')[0], method=method, return_rule=True)
+            covered.add(rule.rule)
+            if response.status_code >= 500:
+                server_errors.append((method, url, response.status_code))
+    finally:
+        database.pool.close_all()
+        database.get_db_connection = original
+
+    return covered
+
+
+def attach_partition_schemas(conn, statements):
+    """Attach an empty archive for every partition schema the statements use.
+
+    The scenarios have deleted the real archive files by now; the
+    tables and indexes are what matter for the plans.
+    """
+    for schema in sorted({m for s in statements for m in PARTITION_SCHEMA.findall(s)}):
+        conn.execute(f"ATTACH DATABASE '' AS {schema}")
+        archive._archive_columns(conn, schema)
+        for index_name, target in archive.ARCHIVE_INDEXES:
+            conn.execute(f'CREATE INDEX {schema}.{index_name} ON {target}')
+
+
+def find_full_scans(conn, statements, verbose=False):
+    """EXPLAIN every captured statement and return the ones that scan a table."""
+    failures = []
+    for sql in sorted(set(normalize(s) for s in statements)):
+        if sql.startswith('--') or not DML.match(sql):
+            continue
+        if any(pattern.match(sql) for pattern in ALLOWED_SCANS):
+            continue
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        scans = [line for line in plan if FULL_SCAN.match(line)]
+        if verbose:
+            print(sql)
+            for line in plan:
+                print('    ' + line)
+        if scans:
+            failures.append((sql, scans))
+    return failures
+
+
+def main():
+    verbose = '-v' in sys.argv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_NAME = os.path.join(tmp, 'plan_check.db')
+        import server
+        database.init_database()
+        app = server.create_app()
+
+        statements = []
+        schema_work = []
+        server_errors = []
+        covered = run_scenarios(app, statements, schema_work, server_errors)
+
+        routes = {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+        missing = sorted(routes - covered)
+
+        conn = sqlite3.connect(database.DATABASE_NAME)
+        conn.row_factory = sqlite3.Row
+        attach_partition_schemas(conn, statements)
+        failures = find_full_scans(conn, statements, verbose)
+        conn.close()
+
+    for sql, scans in failures:
+        print(f'FULL SCAN ({", ".join(scans)}): {sql}')
+    for rule in missing:
+        print(f'NOT EXERCISED: {rule} (add it to SCENARIOS)')
+    for method, url, sql in schema_work:
+        print(f'SCHEMA WORK IN HANDLER ({method} {url}): {sql}')
+    for method, url, status in server_errors:
+        print(f'SERVER ERROR ({method} {url}): {status}')
+
+    if failures or missing or schema_work or server_errors:
+        return 1
+    print(f'OK: {len(set(map(normalize, statements)))} statements checked, no full table scans.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
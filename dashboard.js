@@ -145,42 +145,45 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     };
 
-    const loadAttendanceData = async () => {
-        try {
-            const response = await fetch('http://127.0.0.1:5000/api/dashboard');
-            const data = await response.json();
-            const attendanceRecords = data.attendance;
+    let todayAttendance = [];
+    let attendanceStream = null;
 
-            const todayDate = new Date().toLocaleDateString();
-            const todayAttendance = attendanceRecords.filter(record => {
-                const recordDate = new Date(record.timestamp).toLocaleDateString();
-                return recordDate === todayDate;
-            });
+    const renderTodayAttendance = () => {
+        attendanceTodayMetric.textContent = todayAttendance.length;
+        attendanceTableBody.innerHTML = '';
 
-            attendanceTodayMetric.textContent = todayAttendance.length;
-            attendanceTableBody.innerHTML = '';
+        if (todayAttendance.length === 0) {
+            const noRecordsRow = document.createElement('tr');
+            noRecordsRow.innerHTML = `<td colspan="4" style="text-align: center; color: #a7a7a7;">No attendance records for today.</td>`;
+            attendanceTableBody.appendChild(noRecordsRow);
+            return;
+        }
 
-            if (todayAttendance.length === 0) {
-                const noRecordsRow = document.createElement('tr');
-                noRecordsRow.innerHTML = `<td colspan="4" style="text-align: center; color: #a7a7a7;">No attendance records for today.</td>`;
-                attendanceTableBody.appendChild(noRecordsRow);
-                return;
-            }
+        todayAttendance.forEach(record => {
+            const newRow = document.createElement('tr');
+            const timeIn = new Date(record.timestamp).toLocaleString('en-US');
+            const userStatus = record.user_status || 'Unknown';
+            const subject = record.subject || record.department || 'Not specified';
+            
+            newRow.innerHTML = `
+                <td>${record.name}</td>
+                <td>${userStatus}</td>
+                <td>${subject}</td>
+                <td>${timeIn}</td>
+            `;
+            attendanceTableBody.appendChild(newRow);
+        });
+    };
 
-            todayAttendance.forEach(record => {
-                const newRow = document.createElement('tr');
-                const timeIn = new Date(record.timestamp).toLocaleString('en-US');
-                const userStatus = record.user_status || 'Unknown';
-                const subject = record.subject || record.department || 'Not specified';
-                
-                newRow.innerHTML = `
-                    <td>${record.name}</td>
-                    <td>${userStatus}</td>
-                    <td>${subject}</td>
-                    <td>${timeIn}</td>
-                `;
-                attendanceTableBody.appendChild(newRow);
-            });
+    const loadAttendanceData = async () => {
+        try {
+            // Only today's rows for this teacher are sent by the server
+            const params = new URLSearchParams({ today: '1' });
+            if (currentUserId) params.set('user_id', currentUserId);
+            const response = await fetch(`http://127.0.0.1:5000/api/dashboard?${params}`);
+            const data = await response.json();
+            todayAttendance = data.attendance;
+            renderTodayAttendance();
         } catch (error) {
             console.error('Error fetching dashboard data:', error);
             attendanceTableBody.innerHTML = `
@@ -193,6 +196,39 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     };
 
+    // How often the table is re-fetched while the server has no live feed to spare
+    const POLL_INTERVAL_MS = 30000;
+
+    // New check-ins are pushed by the server, so the table stays current without re-fetching it.
+    // EventSource reconnects on its own and resumes after the last event id it saw. If the
+    // server turns the feed away (503 when it is busy), poll and try to subscribe again later.
+    const subscribeToAttendance = () => {
+        const lastId = todayAttendance.reduce((max, record) => Math.max(max, record.id), 0);
+        const params = new URLSearchParams({ since_id: lastId });
+        if (currentUserId) params.set('user_id', currentUserId);
+        attendanceStream = new EventSource(`http://127.0.0.1:5000/api/attendance/stream?${params}`);
+
+        attendanceStream.addEventListener('attendance', (event) => {
+            const record = JSON.parse(event.data);
+            const isToday = new Date(record.timestamp).toDateString() === new Date().toDateString();
+            if (!isToday || todayAttendance.some(existing => existing.id === record.id)) return;
+            todayAttendance.unshift(record);
+            renderTodayAttendance();
+        });
+
+        attendanceStream.addEventListener('error', () => {
+            if (attendanceStream.readyState !== EventSource.CLOSED) return;
+            setTimeout(async () => {
+                await loadAttendanceData();
+                subscribeToAttendance();
+            }, POLL_INTERVAL_MS);
+        });
+    };
+
+    // A check-in that has not succeeded yet; submitting the same class again resends
+    // it with the same key and time, so the server can tell it is a retry
+    let pendingCheckIn = null;
+
     // Handle form submission
     attendanceForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -210,22 +246,36 @@ document.addEventListener('DOMContentLoaded', async () => {
             const endTime = formatTimeTo12Hour(scheduleData.end_time);
             const displayText = `${scheduleData.subject_name} - ${scheduleData.day} (${startTime} - ${endTime})`;
 
+            if (!pendingCheckIn || pendingCheckIn.scheduleId !== scheduleData.schedule_id) {
+                pendingCheckIn = {
+                    scheduleId: scheduleData.schedule_id,
+                    key: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
+                    timestamp: new Date().toISOString()
+                };
+            }
+
             const response = await fetch('http://127.0.0.1:5000/api/attendance', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     full_name: userFullName,
+                    schedule_id: scheduleData.schedule_id,
                     subject: displayText,
                     department: scheduleData.subject_name,
                     status: 'Present',
-                    timestamp: new Date().toISOString()
+                    timestamp: pendingCheckIn.timestamp,
+                    idempotency_key: pendingCheckIn.key
                 })
             });
 
             const data = await response.json();
             if (data.success) {
+                pendingCheckIn = null;
                 subjectSelect.value = '';
-                await loadAttendanceData();
+                // The live feed delivers the new row; only re-fetch if it is not connected
+                if (!attendanceStream || attendanceStream.readyState !== EventSource.OPEN) {
+                    await loadAttendanceData();
+                }
                 alert(`✅ Attendance marked successfully!\n\n${displayText}`);
             } else {
                 alert('❌ Failed to mark attendance: ' + data.message);
@@ -239,4 +289,5 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Initial data load
     await loadUserSchedules();
     await loadAttendanceData();
+    subscribeToAttendance();
 });
\ No newline at end of file
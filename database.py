@@ -1,94 +1,641 @@
 import sqlite3
 from datetime import datetime
-import hashlib
+import os
+import queue
 
-DATABASE_NAME = 'eduwatch.db'
+from attendance import parse_subject_label
+from metrics import connection_factory
+from partitions import attach_partition, create_partition_catalog, detach_partition, list_partitions
+from passwords import hash_password
+
+DATABASE_NAME = os.environ.get('EDUWATCH_DB', 'eduwatch.db')
+
+# Per-connection tuning. WAL itself is persistent and is switched on
+# once by init_database().
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',      # fsync on checkpoint only; safe with WAL
+    'cache_size': -16000,         # 16 MB page cache per connection
+    'mmap_size': 128 * 1024 * 1024,
+    'busy_timeout': 5000,         # wait up to 5 s for a writer instead of "database is locked"
+}
+
+# Idle connections kept per worker process
+POOL_SIZE = 8
+
+# Check-ins reference the user, subject and schedule by id; names and
+# labels are joined in when read. legacy_name/legacy_subject keep the
+# original text of rows whose user or class could not be resolved (or
+# whose subject or schedule was deleted later). arrival ('On Time',
+# 'Late' or 'Unscheduled') and minutes_late are worked out against the
+# schedule when the check-in is written; rows from before that have NULL.
+# idempotency_key marks a check-in that must only be written once (see
+# ingest.idempotency_key).
+ATTENDANCE_RECORDS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        subject_id INTEGER,
+        schedule_id INTEGER,
+        status TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        legacy_name TEXT,
+        legacy_subject TEXT,
+        minutes_late INTEGER,
+        arrival TEXT,
+        idempotency_key TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (subject_id) REFERENCES subjects (id),
+        FOREIGN KEY (schedule_id) REFERENCES schedules (id)
+    )
+'''
 
 def get_db_connection():
     """Create and return a database connection."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = sqlite3.connect(DATABASE_NAME, check_same_thread=False, factory=connection_factory())
     conn.row_factory = sqlite3.Row  # This allows us to access columns by name
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
     return conn
 
+class ConnectionPool:
+    """Reusable SQLite connections for one worker process.
+
+    A connection is used by one thread at a time: acquire() hands out an
+    idle connection (or opens a new one) and release() puts it back, so
+    requests keep a warm page cache instead of reconnecting every time.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._pid = os.getpid()
+
+    def acquire(self):
+        """Take an idle connection from the pool, or open a new one."""
+        if self._pid != os.getpid():
+            # Connections must not be shared with a forked parent
+            self._idle = queue.LifoQueue(maxsize=self.size)
+            self._pid = os.getpid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return get_db_connection()
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+pool = ConnectionPool()
+
 def init_database():
-    """Initialize the database with required tables."""
+    """Bring the schema up to date and create the default data.
+
+    Runs once per deploy (manage.py init-db, the gunicorn master or
+    serve.py); request handlers never change the schema.
+    """
     conn = get_db_connection()
     
     try:
-        # Create users table with status field
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                email TEXT,
-                contact_number TEXT,
-                address TEXT,
-                status TEXT,
-                is_admin BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # Write-ahead logging lets readers run alongside the writer
+        conn.execute('PRAGMA journal_mode = WAL')
         
-        # Create attendance_records table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS attendance_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                full_name TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                status TEXT NOT NULL,
-                timestamp TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        migrate(conn)
         
-        # Create subjects table WITHOUT time fields
+        # Insert default admin and test user if they don't exist
+        create_default_users(conn)
+        create_default_subjects(conn)
+        
+        print("Database initialized successfully!")
+        
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+# --- Migrations ---
+
+def create_tables(conn):
+    """Create any missing table in its current form."""
+    # Create users table with status field
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            email TEXT,
+            contact_number TEXT,
+            address TEXT,
+            status TEXT,
+            is_admin BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create attendance_records table
+    conn.execute(ATTENDANCE_RECORDS_TABLE.format(name='attendance_records'))
+    
+    # Create subjects table WITHOUT time fields
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS subjects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create schedules table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schedules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        subject_id INTEGER NOT NULL,
+        day_of_week TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (subject_id) REFERENCES subjects (id) ON DELETE CASCADE,
+        UNIQUE(user_id, subject_id, day_of_week, start_time)
+        )
+    ''')
+    
+    # Create user_subjects table (subject assignments per user)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_subjects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            subject_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (subject_id) REFERENCES subjects (id),
+            UNIQUE(user_id, subject_id)
+        )
+    ''')
+    
+    conn.commit()
+
+def upgrade_legacy_columns(conn):
+    """Bring tables created by early versions up to the current columns."""
+    users = {row['name'] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'status' not in users:
+        conn.execute('ALTER TABLE users ADD COLUMN status TEXT')
+    
+    # Check-ins from before subjects were called departments
+    records = {row['name'] for row in conn.execute('PRAGMA table_info(attendance_records)')}
+    if 'department' in records:
+        if 'subject' not in records:
+            conn.execute('ALTER TABLE attendance_records ADD COLUMN subject TEXT')
+        conn.execute('UPDATE attendance_records SET subject = COALESCE(subject, department)')
+    
+    # Class times moved from subjects to schedules
+    subjects = {row['name'] for row in conn.execute('PRAGMA table_info(subjects)')}
+    if 'start_time' in subjects or 'end_time' in subjects:
         conn.execute('''
-            CREATE TABLE IF NOT EXISTS subjects (
+            CREATE TABLE subjects_new (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT UNIQUE NOT NULL,
                 description TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-
-# Create schedules table
         conn.execute('''
-            CREATE TABLE IF NOT EXISTS schedules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            INSERT INTO subjects_new (id, name, description, created_at)
+            SELECT id, name, description, created_at FROM subjects
+        ''')
+        conn.execute('DROP TABLE subjects')
+        conn.execute('ALTER TABLE subjects_new RENAME TO subjects')
+    conn.commit()
+
+def _base_schema(conn):
+    create_tables(conn)
+    upgrade_legacy_columns(conn)
+    create_indexes(conn, INDEXES)
+
+def _attendance_ids(conn):
+    # Catalog of archived months (see partitions.py), read by the normalization
+    create_partition_catalog(conn)
+    normalize_attendance_records(conn)
+    create_indexes(conn, ID_INDEXES)
+
+def _attendance_summary(conn):
+    # Summaries kept by older versions were keyed by the full subject
+    # label and their trigger read text columns; start again from scratch
+    conn.execute('DROP TRIGGER IF EXISTS trg_attendance_summary_insert')
+    conn.execute('DROP TABLE IF EXISTS daily_attendance_summary')
+    conn.execute('DROP TABLE IF EXISTS attendance_counters')
+    create_attendance_summary(conn)
+
+def _table_versions(conn):
+    create_table_versions(conn, ['users'])
+
+def _add_arrival_columns(conn, schema):
+    columns = {row['name'] for row in conn.execute(f'PRAGMA {schema}.table_info(attendance_records)')}
+    for column, definition in [('minutes_late', 'INTEGER'), ('arrival', 'TEXT')]:
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {schema}.attendance_records ADD COLUMN {column} {definition}')
+    conn.commit()
+
+def _check_in_arrival(conn):
+    # Archived months get the columns too, so they can be read alongside
+    _add_arrival_columns(conn, 'main')
+    for partition in list_partitions(conn):
+        schema = attach_partition(conn, partition)
+        try:
+            _add_arrival_columns(conn, schema)
+        finally:
+            detach_partition(conn, schema)
+    create_table_versions(conn, ['schedules'])
+
+def _absences(conn):
+    create_absence_tables(conn)
+    create_indexes(conn, ABSENCE_INDEXES)
+
+def _idempotency_keys(conn):
+    # Archives get the column when a month is next archived into them
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(attendance_records)')}
+    if 'idempotency_key' not in columns:
+        conn.execute('ALTER TABLE attendance_records ADD COLUMN idempotency_key TEXT')
+    # Existing check-ins keep NULL, so duplicates already stored do not block the index
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_idempotency_key
+        ON attendance_records (idempotency_key) WHERE idempotency_key IS NOT NULL
+    ''')
+    conn.commit()
+
+# Tables GET responses are built from. Each has a version stamp, so a
+# response's ETag is known before it is built (see cache.version_etag).
+RESPONSE_TABLES = ['users', 'subjects', 'user_subjects', 'schedules', 'attendance_records',
+                   'attendance_partitions', 'absences', 'absence_days']
+
+def _response_version_stamps(conn):
+    create_table_versions(conn, RESPONSE_TABLES)
+
+# Schema versions, stored in PRAGMA user_version. Every step must be
+# safe to run again: one that fails part way is retried in full by the
+# next init_database(). Never change a released step; append a new one.
+MIGRATIONS = [
+    (1, 'tables and secondary indexes', _base_schema),
+    (2, 'check-ins by user, subject and schedule id', _attendance_ids),
+    (3, 'daily attendance summary', _attendance_summary),
+    (4, 'table version stamps', _table_versions),
+    (5, 'check-in arrival and schedule version stamps', _check_in_arrival),
+    (6, 'detected absences', _absences),
+    (7, 'check-in idempotency keys', _idempotency_keys),
+    (8, 'version stamps for every table served', _response_version_stamps),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn):
+    """Apply every migration newer than the database; return the versions applied."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        step(conn)
+        conn.execute(f'PRAGMA user_version = {number}')
+        conn.commit()
+        print(f"Migration {number} applied: {description}")
+        applied.append(number)
+    return applied
+
+def check_schema_version():
+    """Refuse to run against a database older than SCHEMA_VERSION."""
+    conn = get_db_connection()
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema is at version {version}, this code needs "
+                           f"{SCHEMA_VERSION}: run python manage.py init-db")
+
+# Secondary indexes. Existing databases only get them through a
+# migration, so adding one here also needs a new step in MIGRATIONS.
+INDEXES = [
+    # Dashboard/report date ranges and keyset pagination on (timestamp, id)
+    ('idx_attendance_timestamp', 'attendance_records (timestamp)'),
+    # Per-user history ("today" on the teacher dashboard)
+    ('idx_attendance_user_timestamp', 'attendance_records (user_id, timestamp)'),
+    # mark_attendance resolves users by full name
+    ('idx_users_full_name', 'users (full_name)'),
+    # Admin user list is ordered by creation time
+    ('idx_users_created_at', 'users (created_at)'),
+    # Per-user, per-day schedule lookups
+    ('idx_schedules_user_day', 'schedules (user_id, day_of_week, start_time)'),
+    # delete_subject removes assignments by subject
+    ('idx_user_subjects_subject', 'user_subjects (subject_id)'),
+]
+
+# Created once check-ins carry subject and schedule ids (migration 2):
+# deleting a subject or schedule freezes the labels of its check-ins
+ID_INDEXES = [
+    ('idx_attendance_subject', 'attendance_records (subject_id)'),
+    ('idx_attendance_schedule', 'attendance_records (schedule_id)'),
+]
+
+# Created with the absences tables (migration 6)
+ABSENCE_INDEXES = [
+    # Absence detection expands each day into that weekday's classes
+    ('idx_schedules_day', 'schedules (day_of_week)'),
+    # Absences of one user over a date range
+    ('idx_absences_user_day', 'absences (user_id, day)'),
+]
+
+# The attendance_records indexes, also created in archive partitions
+ATTENDANCE_INDEXES = [(name, target) for name, target in INDEXES + ID_INDEXES
+                      if target.startswith('attendance_records ')]
+
+def create_indexes(conn, indexes):
+    """Create the given (name, target) indexes if they are missing."""
+    for name, target in indexes:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+    conn.commit()
+
+def create_attendance_summary(conn):
+    """Create the daily attendance summary behind /api/stats.
+
+    daily_attendance_summary holds check-in counts per local day, user
+    status (as of check-in), subject and attendance status, and
+    attendance_counters holds the all-time total. An INSERT trigger on
+    attendance_records keeps both current; bulk deletes must reset or
+    rebuild them (see clear_attendance_summary and
+    rebuild_attendance_summary).
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_attendance_summary (
+            day TEXT NOT NULL,
+            user_status TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, user_status, subject, status)
+        ) WITHOUT ROWID
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_insert
+        AFTER INSERT ON attendance_records
+        BEGIN
+            INSERT INTO daily_attendance_summary (day, user_status, subject, status, count)
+            VALUES (
+                DATE(NEW.timestamp, 'localtime'),
+                COALESCE((SELECT status FROM users WHERE id = NEW.user_id), ''),
+                COALESCE((SELECT name FROM subjects WHERE id = NEW.subject_id), NEW.legacy_subject, ''),
+                NEW.status,
+                1
+            )
+            ON CONFLICT (day, user_status, subject, status) DO UPDATE SET count = count + 1;
+            
+            UPDATE attendance_counters SET value = value + 1 WHERE name = 'total';
+        END
+    ''')
+    
+    # Existing databases get their summary filled in once
+    initialized = conn.execute(
+        "SELECT 1 FROM attendance_counters WHERE name = 'total'"
+    ).fetchone()
+    if not initialized:
+        rebuild_attendance_summary(conn)
+    
+    conn.commit()
+
+def create_table_versions(conn, tables):
+    """Create table_versions and the triggers that bump it for tables.
+
+    Every INSERT, UPDATE or DELETE on one of the tables adds one to its
+    version, whichever process or tool makes it, so a worker can tell
+    its in-memory copy (see directory.py) is stale with one lookup.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    for table in tables:
+        conn.execute('INSERT OR IGNORE INTO table_versions (name) VALUES (?)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            ''')
+    
+    conn.commit()
+
+def create_absence_tables(conn):
+    """Create the tables written by absences.detect_absences.
+
+    absences holds one row per class that had no check-in on a closed
+    day; the class's subject and times are copied so the row still
+    reads the same after the schedule changes. absence_days lists the
+    days processed so far.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS absences (
+            day TEXT NOT NULL,
+            schedule_id INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
             subject_id INTEGER NOT NULL,
-            day_of_week TEXT NOT NULL,
             start_time TEXT NOT NULL,
             end_time TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (subject_id) REFERENCES subjects (id) ON DELETE CASCADE,
-            UNIQUE(user_id, subject_id, day_of_week, start_time)
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (day, schedule_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS absence_days (
+            day TEXT PRIMARY KEY,
+            absences INTEGER NOT NULL,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    conn.commit()
+
+# Summary rows grouped from one attendance table ({records})
+SUMMARY_GROUPS = '''
+    SELECT DATE(ar.timestamp, 'localtime'), COALESCE(u.status, ''), COALESCE(sub.name, ar.legacy_subject, ''),
+           ar.status, COUNT(*)
+    FROM {records} ar
+    LEFT JOIN users u ON ar.user_id = u.id
+    LEFT JOIN subjects sub ON ar.subject_id = sub.id
+    GROUP BY 1, 2, 3, 4
+'''
+
+def rebuild_attendance_summary(conn):
+    """Recompute the attendance summary and counters from attendance_records
+    and its archive partitions."""
+    # Archives are attached and read before the rebuild's transaction starts
+    archived = []
+    for partition in list_partitions(conn):
+        schema = attach_partition(conn, partition)
+        try:
+            rows = conn.execute(SUMMARY_GROUPS.format(records=f'{schema}.attendance_records')).fetchall()
+            archived.extend(tuple(row) for row in rows)
+        finally:
+            detach_partition(conn, schema)
+    
+    conn.execute('DELETE FROM daily_attendance_summary')
+    conn.execute(f'''
+        INSERT INTO daily_attendance_summary (day, user_status, subject, status, count)
+        {SUMMARY_GROUPS.format(records='attendance_records')}
+    ''')
+    conn.executemany('''
+        INSERT INTO daily_attendance_summary (day, user_status, subject, status, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day, user_status, subject, status) DO UPDATE SET count = count + excluded.count
+    ''', archived)
+    conn.execute('''
+        INSERT OR REPLACE INTO attendance_counters (name, value)
+        VALUES ('total', (SELECT COUNT(*) FROM attendance_records) + ?)
+    ''', (sum(row[4] for row in archived),))
+    conn.commit()
+    print("Attendance summary rebuilt!")
+
+def clear_attendance_summary(conn):
+    """Reset the summary after every attendance record has been deleted.
+
+    The caller owns the transaction and must commit.
+    """
+    conn.execute('DELETE FROM daily_attendance_summary')
+    conn.execute("UPDATE attendance_counters SET value = 0 WHERE name = 'total'")
+
+# --- Attendance normalization ---
+
+def normalize_attendance_records(conn):
+    """Convert attendance_records from full_name/subject text to ids.
+
+    Older databases stored the user's name and a subject label such as
+    "Web Development - Monday (7:30 AM - 12:30 PM)" on every check-in.
+    The labels are resolved to subject_id and schedule_id, missing
+    user_ids are looked up by name, and the table is rebuilt without
+    the text columns. Archived months are converted too. Returns a
+    {schema: (rows, without user, without subject, without schedule)}
+    report, empty if there was nothing to convert.
+    """
+    report = {}
+    for partition in list_partitions(conn):
+        schema = attach_partition(conn, partition)
+        try:
+            if _has_text_columns(conn, schema):
+                report[schema] = _normalize_table(conn, schema)
+        finally:
+            detach_partition(conn, schema)
+
+    if _has_text_columns(conn, 'main'):
+        report['main'] = _normalize_table(conn, 'main')
+        print("Attendance records normalized!")
+    return report
+
+def _has_text_columns(conn, schema):
+    columns = conn.execute(f'PRAGMA {schema}.table_info(attendance_records)').fetchall()
+    return any(column['name'] == 'full_name' for column in columns)
+
+def _normalize_table(conn, schema):
+    subject_ids = {row['name']: row['id'] for row in conn.execute('SELECT id, name FROM main.subjects')}
+    labels = conn.execute(f'SELECT DISTINCT subject FROM {schema}.attendance_records').fetchall()
+
+    conn.execute('BEGIN')
+    try:
+        conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS subject_labels (
+                label TEXT PRIMARY KEY,
+                subject_id INTEGER,
+                day_of_week TEXT,
+                start_time TEXT
             )
         ''')
-        
+        conn.execute('DELETE FROM temp.subject_labels')
+        conn.executemany(
+            'INSERT OR IGNORE INTO temp.subject_labels (label, subject_id, day_of_week, start_time) VALUES (?, ?, ?, ?)',
+            [(row[0], *parse_subject_label(row[0], subject_ids)) for row in labels if row[0] is not None]
+        )
+
+        sequence = None
+        if schema == 'main':
+            sequence = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'attendance_records'"
+            ).fetchone()
+
+        conn.execute(ATTENDANCE_RECORDS_TABLE.format(name=f'{schema}.attendance_records_normalized'))
+        conn.execute(f'''
+            INSERT INTO {schema}.attendance_records_normalized
+                (id, user_id, subject_id, schedule_id, status, timestamp, created_at, legacy_name, legacy_subject)
+            WITH resolved AS (
+                SELECT ar.id, ar.full_name, ar.subject, ar.status, ar.timestamp, ar.created_at,
+                       COALESCE(ar.user_id, (SELECT MIN(u.id) FROM main.users u WHERE u.full_name = ar.full_name))
+                           AS user_id,
+                       l.subject_id, l.day_of_week, l.start_time
+                FROM {schema}.attendance_records ar
+                LEFT JOIN temp.subject_labels l ON l.label = ar.subject
+            ), matched AS (
+                SELECT r.*, (
+                    SELECT MIN(sc.id) FROM main.schedules sc
+                    WHERE sc.user_id = r.user_id AND sc.day_of_week = r.day_of_week
+                      AND sc.start_time = r.start_time AND sc.subject_id = r.subject_id
+                ) AS schedule_id
+                FROM resolved r
+            )
+            SELECT id, user_id, subject_id, schedule_id, status, timestamp, created_at,
+                   CASE WHEN user_id IS NULL THEN full_name END,
+                   -- Keep the label if the class it names is not on the schedule
+                   CASE WHEN subject_id IS NULL OR (schedule_id IS NULL AND day_of_week IS NOT NULL)
+                        THEN subject END
+            FROM matched
+            ORDER BY id
+        ''')
+        conn.execute(f'DROP TABLE {schema}.attendance_records')
+        conn.execute(f'ALTER TABLE {schema}.attendance_records_normalized RENAME TO attendance_records')
+        for name, target in ATTENDANCE_INDEXES:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.{name} ON {target}')
+        if sequence:
+            # Deleted ids are not handed out again
+            conn.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'attendance_records'",
+                (sequence[0],)
+            )
+        conn.execute('DROP TABLE temp.subject_labels')
+
+        report = conn.execute(f'''
+            SELECT COUNT(*), COUNT(*) - COUNT(user_id), COUNT(*) - COUNT(subject_id), COUNT(*) - COUNT(schedule_id)
+            FROM {schema}.attendance_records
+        ''').fetchone()
         conn.commit()
-        
-        # Insert default admin and test user if they don't exist
-        create_default_users(conn)
-        create_default_subjects(conn)
-        
-        print("Database initialized successfully!")
-        
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
+    except sqlite3.Error:
         conn.rollback()
-    finally:
-        conn.close()
-
-def hash_password(password):
-    """Hash password using SHA-256 (in production, use bcrypt or similar)."""
-    return hashlib.sha256(password.encode()).hexdigest()
+        raise
+    return tuple(report)
 
 def create_default_users(conn):
     """Create default users if they don't exist."""
@@ -166,116 +713,5 @@ def create_default_subjects(conn):
     except sqlite3.Error as e:
         print(f"Error creating IT/CS subjects: {e}")
 
-def add_subject_column_to_existing_db():
-    """Add subject column to existing attendance_records table if it doesn't exist."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("PRAGMA table_info(attendance_records)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'subject' not in columns and 'department' in columns:
-            print("Migrating department column to subject column...")
-            conn.execute('ALTER TABLE attendance_records ADD COLUMN subject TEXT')
-            conn.execute('UPDATE attendance_records SET subject = department WHERE subject IS NULL')
-            conn.commit()
-            print("Subject column added and data migrated successfully!")
-            
-        elif 'subject' not in columns and 'department' not in columns:
-            print("Adding subject column to attendance_records table...")
-            conn.execute('ALTER TABLE attendance_records ADD COLUMN subject TEXT')
-            conn.commit()
-            print("Subject column added successfully!")
-        else:
-            print("Subject column already exists in attendance_records.")
-            
-        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='subjects';")
-        if not cursor.fetchone():
-            print("Creating subjects table...")
-            conn.execute('''
-                CREATE TABLE subjects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-            create_default_subjects(conn)
-            print("Subjects table created successfully!")
-        else:
-            print("Subjects table already exists.")
-            
-    except sqlite3.Error as e:
-        print(f"Error adding subject column: {e}")
-    finally:
-        conn.close()
-
-def clean_duplicate_columns():
-    """Remove duplicate department column if both department and subject exist."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("PRAGMA table_info(attendance_records)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'department' in columns and 'subject' in columns:
-            print("Found both department and subject columns. Cleaning up...")
-            
-            conn.execute('''
-                CREATE TABLE attendance_records_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    full_name TEXT NOT NULL,
-                    subject TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    timestamp TIMESTAMP NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            conn.execute('''
-                INSERT INTO attendance_records_new (id, user_id, full_name, subject, status, timestamp, created_at)
-                SELECT id, user_id, full_name, 
-                       COALESCE(subject, department) as subject, 
-                       status, timestamp, created_at
-                FROM attendance_records
-            ''')
-            
-            conn.execute('DROP TABLE attendance_records')
-            conn.execute('ALTER TABLE attendance_records_new RENAME TO attendance_records')
-            
-            conn.commit()
-            print("Successfully removed duplicate department column!")
-        else:
-            print("No duplicate columns found.")
-            
-    except sqlite3.Error as e:
-        print(f"Error cleaning duplicate columns: {e}")
-    finally:
-        conn.close()
-
-def add_status_column_to_existing_db():
-    """Add status column to existing users table if it doesn't exist."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("PRAGMA table_info(users)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'status' not in columns:
-            print("Adding status column to users table...")
-            conn.execute('ALTER TABLE users ADD COLUMN status TEXT DEFAULT "Full Time"')
-            conn.commit()
-            print("Status column added successfully!")
-        else:
-            print("Status column already exists.")
-            
-    except sqlite3.Error as e:
-        print(f"Error adding status column: {e}")
-    finally:
-        conn.close()
-
 if __name__ == "__main__":
-    init_database()
-    add_status_column_to_existing_db()
-    add_subject_column_to_existing_db()
-    clean_duplicate_columns()
\ No newline at end of file
+    init_database()
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""In-memory directory of users for login and check-in lookups.
+
+Every worker keeps a copy of the users table indexed by id, username
+and full name, so lookups are dictionary reads instead of queries. The
+copy is tagged with the users version from table_versions (bumped by
+triggers, see database.create_table_versions). At most once every
+VERSION_CHECK_INTERVAL seconds a lookup compares it with the database
+and reloads the whole table if another process changed it. Write
+handlers in this process call invalidate() after they commit so their
+own change is seen at once, and a lookup that misses checks straight
+away, so a user registered through another worker is found too.
+
+VersionedCopy is the same mechanism for any table with a version
+stamp (see schedule_index.py).
+"""
+import threading
+import time
+from collections import namedtuple
+
+# Seconds between version checks against the database
+VERSION_CHECK_INTERVAL = 1.0
+
+UserSnapshot = namedtuple('UserSnapshot', ['by_id', 'by_username', 'by_full_name'])
+
+
+def _load(conn):
+    by_id = {}
+    by_username = {}
+    by_full_name = {}
+    for row in conn.execute('SELECT * FROM users ORDER BY id'):
+        user = dict(row)
+        by_id[user['id']] = user
+        by_username[user['username']] = user
+        # Check-ins name the user; the oldest account wins a shared name
+        by_full_name.setdefault(user['full_name'], user)
+    return UserSnapshot(by_id, by_username, by_full_name)
+
+
+class VersionedCopy:
+    """Process-wide in-memory copy of one table, reloaded when its version changes.
+
+    Subclasses set table (a name in table_versions) and implement
+    load(conn), which returns the copy. Copies are shared between
+    threads; callers must not modify them.
+    """
+
+    table = None
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._version = None
+        self._value = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, conn):
+        raise NotImplementedError
+
+    def snapshot(self, conn, recheck=False):
+        """Return the current copy.
+
+        conn is only used when the version is due for a check (or
+        recheck is set) and to reload after a change.
+        """
+        value = self._value
+        if value is not None and not recheck and time.monotonic() - self._checked < self.check_interval:
+            return value
+
+        with self._lock:
+            # Another thread may have checked while this one waited
+            if self._value is None or recheck or time.monotonic() - self._checked >= self.check_interval:
+                version = conn.execute(
+                    'SELECT version FROM table_versions WHERE name = ?', (self.table,)
+                ).fetchone()[0]
+                if self._value is None or version != self._version:
+                    # Read the version first: a write in between only causes another reload
+                    self._value = self.load(conn)
+                    self._version = version
+                    self.reloads += 1
+                self._checked = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        """Check the version on the next lookup; call after committing a change to the table."""
+        self._checked = 0.0
+
+
+class UserDirectory(VersionedCopy):
+    """The users table indexed by id, username and full name."""
+
+    table = 'users'
+
+    def load(self, conn):
+        return _load(conn)
+
+    def _find(self, conn, index, key):
+        user = getattr(self.snapshot(conn), index).get(key)
+        if user is None:
+            user = getattr(self.snapshot(conn, recheck=True), index).get(key)
+        return user
+
+    def by_id(self, conn, user_id):
+        return self._find(conn, 'by_id', user_id)
+
+    def by_username(self, conn, username):
+        return self._find(conn, 'by_username', username)
+
+    def by_full_name(self, conn, full_name):
+        return self._find(conn, 'by_full_name', full_name)
+
+
+user_directory = UserDirectory()
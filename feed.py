@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+
+from attendance import ATTENDANCE_LAYOUT, fetch_records_after, today_counts
+from database import pool
+from ingest import commits
+
+# Seconds between keep-alive comments; also how often writes made by
+# other worker processes are noticed
+STREAM_HEARTBEAT = 15
+# Reconnect delay sent to EventSource clients, in milliseconds
+STREAM_RETRY_MS = 3000
+STREAM_BATCH_SIZE = 500
+# Live feeds one worker process serves at once. On the threaded servers
+# each open feed holds a request thread, so by default half of
+# EDUWATCH_THREADS (8 under gunicorn.conf.py and serve.py) may stream and
+# the rest serve other requests; dashboards turned away fall back to polling.
+MAX_STREAMS = int(os.environ.get('EDUWATCH_MAX_STREAMS', max(1, int(os.environ.get('EDUWATCH_THREADS', 8)) // 2)))
+
+
+class StreamSlots:
+    """Counts the live feeds open in this process against a limit."""
+
+    def __init__(self, limit=MAX_STREAMS):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot; return False if all are in use."""
+        with self._lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+stream_slots = StreamSlots()
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def latest_record_id(conn):
+    return conn.execute('SELECT MAX(id) as id FROM attendance_records').fetchone()['id'] or 0
+
+
+def stats_payload(conn):
+    today_attendance, status_breakdown = today_counts(conn)
+    return {'today_attendance': today_attendance, 'status_breakdown': status_breakdown}
+
+
+def iter_attendance_events(last_id=None, user_id=None):
+    """Yield SSE messages for check-ins committed after last_id.
+
+    Each record is an 'attendance' event whose id is the record id, so an
+    EventSource that reconnects resumes from Last-Event-ID. A 'stats'
+    event with today's counters follows each batch. With no last_id
+    the feed starts at the newest record. Runs on its own pooled
+    connection because the body is produced after the handler returns.
+    """
+    conn = pool.acquire()
+    try:
+        if last_id is None:
+            last_id = latest_record_id(conn)
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        yield format_event('stats', stats_payload(conn))
+
+        while True:
+            # Read seq before querying so a commit in between is not missed
+            seq = commits.seq
+            records = fetch_records_after(conn, last_id, user_id, STREAM_BATCH_SIZE)
+            for record in records:
+                payload = ATTENDANCE_LAYOUT.to_dict(record)
+                last_id = payload['id']
+                yield format_event('attendance', payload, last_id)
+            if records:
+                yield format_event('stats', stats_payload(conn))
+                if len(records) == STREAM_BATCH_SIZE:
+                    continue
+
+            if commits.wait(seq, STREAM_HEARTBEAT) == seq:
+                # Also lets the server notice a client that has gone away
+                yield ': keepalive\n\n'
+    finally:
+        pool.release(conn)
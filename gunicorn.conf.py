@@ -0,0 +1,31 @@
+"""gunicorn settings for EduWatch: gunicorn -c gunicorn.conf.py wsgi:app"""
+import multiprocessing
+import os
+
+from database import init_database
+
+bind = os.environ.get('EDUWATCH_BIND', '0.0.0.0:5000')
+
+# SQLite has one writer at a time, so a few processes with several
+# threads each go further than many single-threaded workers. Half the
+# threads may be held by live feeds (see feed.MAX_STREAMS).
+workers = int(os.environ.get('EDUWATCH_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('EDUWATCH_THREADS', 8))
+worker_class = 'gthread'
+
+timeout = 30
+graceful_timeout = 30
+# Recycle workers now and then to cap any slow memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = os.environ.get('EDUWATCH_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    """Create or upgrade the schema once, in the master, before any worker forks.
+
+    The absence job is not run here: use python manage.py
+    absence-scheduler or a cron job for manage.py detect-absences.
+    """
+    init_database()
@@ -0,0 +1,200 @@
+"""Bulk import of users, subjects and schedules from CSV.
+
+Rows are read from the CSV one batch at a time and checked against
+in-memory sets of the usernames, subject names and schedule slots that
+already exist (plus the ones seen earlier in the file), so validation
+costs no query per row. Valid rows are then written with executemany
+in a single transaction; the report lists every rejected row with its
+line number.
+
+Expected columns (extra columns are ignored):
+    users:     username, password, full_name, email, contact_number, address, status[, is_admin]
+    subjects:  name[, description]
+    schedules: username, subject, day_of_week, start_time, end_time  (times as HH:MM)
+"""
+import csv
+import re
+from itertools import islice
+
+from analytics import DAY_NAMES
+from passwords import hasher
+
+# Rows validated per batch while the CSV is read
+IMPORT_BATCH_SIZE = 500
+
+TIME_FORMAT = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+
+
+class ImportFormatError(ValueError):
+    """Raised when a CSV cannot be imported at all (unknown kind, missing columns)."""
+
+
+class ImportTooLarge(ImportFormatError):
+    """Raised when a CSV has more user rows than the caller allows."""
+
+
+def _required(record, columns):
+    missing = [column for column in columns if not (record.get(column) or '').strip()]
+    if missing:
+        return f"Missing {', '.join(missing)}."
+    return None
+
+
+# --- Users ---
+
+def _load_users(conn):
+    return {'usernames': {row['username'] for row in conn.execute('SELECT username FROM users')}}
+
+
+def _validate_user(record, state):
+    error = _required(record, USER_COLUMNS)
+    if error:
+        return None, error
+    username = record['username'].strip()
+    if username in state['usernames']:
+        return None, f'Username {username} already exists.'
+    state['usernames'].add(username)
+    is_admin = (record.get('is_admin') or '').strip().lower() in ('1', 'true', 'yes')
+    return (username, record['password'], record['full_name'].strip(), record['email'].strip(),
+            record['contact_number'].strip(), record['address'].strip(), record['status'].strip(), is_admin), None
+
+
+def _insert_users(conn, rows):
+    conn.executemany('''
+        INSERT INTO users (username, password, full_name, email, contact_number, address, status, is_admin)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def _hash_passwords(rows):
+    """Replace each row's plain password with its hash, on the shared hashing pool."""
+    hashes = hasher.hash_all([row[1] for row in rows])
+    return [(row[0], hashed, *row[2:]) for row, hashed in zip(rows, hashes)]
+
+
+# --- Subjects ---
+
+def _load_subjects(conn):
+    return {'names': {row['name'] for row in conn.execute('SELECT name FROM subjects ORDER BY name')}}
+
+
+def _validate_subject(record, state):
+    error = _required(record, SUBJECT_COLUMNS)
+    if error:
+        return None, error
+    name = record['name'].strip()
+    if name in state['names']:
+        return None, f'Subject {name} already exists.'
+    state['names'].add(name)
+    return (name, (record.get('description') or '').strip()), None
+
+
+def _insert_subjects(conn, rows):
+    conn.executemany('INSERT INTO subjects (name, description) VALUES (?, ?)', rows)
+
+
+# --- Schedules ---
+
+def _load_schedules(conn):
+    return {
+        'users': {row['username']: row['id'] for row in conn.execute('SELECT id, username FROM users')},
+        'subjects': {row['name']: row['id'] for row in conn.execute('SELECT id, name FROM subjects ORDER BY name')},
+        'slots': {tuple(row) for row in conn.execute(
+            'SELECT user_id, subject_id, day_of_week, start_time FROM schedules')},
+    }
+
+
+def _validate_schedule(record, state):
+    error = _required(record, SCHEDULE_COLUMNS)
+    if error:
+        return None, error
+    username = record['username'].strip()
+    subject = record['subject'].strip()
+    day = record['day_of_week'].strip().capitalize()
+    start_time = record['start_time'].strip()
+    end_time = record['end_time'].strip()
+
+    user_id = state['users'].get(username)
+    if user_id is None:
+        return None, f'User {username} not found.'
+    subject_id = state['subjects'].get(subject)
+    if subject_id is None:
+        return None, f'Subject {subject} not found.'
+    if day not in DAY_NAMES:
+        return None, f'Unknown day_of_week {day}.'
+    if not TIME_FORMAT.match(start_time) or not TIME_FORMAT.match(end_time):
+        return None, 'Times must be HH:MM (24-hour).'
+    if start_time >= end_time:
+        return None, 'start_time must be before end_time.'
+
+    slot = (user_id, subject_id, day, start_time)
+    if slot in state['slots']:
+        return None, 'This schedule already exists.'
+    state['slots'].add(slot)
+    return (*slot, end_time), None
+
+
+def _insert_schedules(conn, rows):
+    conn.executemany('''
+        INSERT INTO schedules (user_id, subject_id, day_of_week, start_time, end_time)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+
+
+USER_COLUMNS = ['username', 'password', 'full_name', 'email', 'contact_number', 'address', 'status']
+SUBJECT_COLUMNS = ['name']
+SCHEDULE_COLUMNS = ['username', 'subject', 'day_of_week', 'start_time', 'end_time']
+
+# kind (also the table written) -> (required columns, load state, validate row, insert rows)
+IMPORTERS = {
+    'users': (USER_COLUMNS, _load_users, _validate_user, _insert_users),
+    'subjects': (SUBJECT_COLUMNS, _load_subjects, _validate_subject, _insert_subjects),
+    'schedules': (SCHEDULE_COLUMNS, _load_schedules, _validate_schedule, _insert_schedules),
+}
+
+
+def import_csv(conn, kind, lines, dry_run=False, max_users=None):
+    """Validate and insert the rows of a CSV; return the import report.
+
+    lines is any iterable of text lines (a file, or a decoded request
+    body). Writes are left uncommitted for the caller. With dry_run
+    nothing is written, but the report is the same. More than max_users
+    valid user rows raises ImportTooLarge before any password is hashed.
+    """
+    if kind not in IMPORTERS:
+        raise ImportFormatError(f"Unknown import kind {kind}; expected one of {', '.join(IMPORTERS)}.")
+    columns, load, validate, insert = IMPORTERS[kind]
+
+    reader = csv.DictReader(lines)
+    missing = [column for column in columns if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ImportFormatError(f"CSV is missing columns: {', '.join(missing)}.")
+
+    state = load(conn)
+    rows = []
+    errors = []
+    total = 0
+    while True:
+        batch = list(islice(((reader.line_num, record) for record in reader), IMPORT_BATCH_SIZE))
+        if not batch:
+            break
+        total += len(batch)
+        for line, record in batch:
+            row, error = validate(record, state)
+            if error:
+                errors.append({'line': line, 'message': error})
+            else:
+                rows.append(row)
+
+    if kind == 'users' and max_users is not None and len(rows) > max_users:
+        raise ImportTooLarge(f'At most {max_users} users per upload; import larger files with '
+                             f'python manage.py import users.')
+
+    if rows and not dry_run:
+        # Hash before the write transaction starts, so it stays short
+        if kind == 'users':
+            rows = _hash_passwords(rows)
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            insert(conn, rows[start:start + IMPORT_BATCH_SIZE])
+
+    return {'total': total, 'imported': len(rows), 'errors': errors}
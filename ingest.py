@@ -0,0 +1,412 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from analytics import DAY_NAMES, LATE, ON_TIME, classify_arrival, parse_timestamp
+from attendance import parse_subject_label
+from database import pool
+from directory import user_directory
+from schedule_index import schedule_index
+
+# How long the writer waits for more check-ins before committing a batch
+GROUP_COMMIT_WINDOW = 0.005  # seconds
+MAX_BATCH_SIZE = 500
+# Largest array accepted by the bulk endpoint
+MAX_BULK_SIZE = 5000
+# Longest idempotency_key a client may send
+MAX_IDEMPOTENCY_KEY_LENGTH = 200
+# Seconds a written idempotency key is remembered in memory; retries
+# within it are answered without touching the database
+RECENT_KEY_TTL = 300
+# Keys looked up per query when checking for earlier writes
+KEY_LOOKUP_CHUNK = 500
+
+
+def result(success, code, message):
+    """Build the per-check-in outcome returned to callers."""
+    return {'success': success, 'code': code, 'message': message}
+
+
+def validate_check_in(data):
+    """Normalize one check-in payload, or return an error result.
+
+    Returns (check_in, None) on success and (None, error_result) if
+    required fields are missing or of the wrong type. A check-in that
+    passes can be written without failing the batch it shares.
+    """
+    if not isinstance(data, dict):
+        return None, result(False, 400, 'Check-in must be an object.')
+
+    full_name = data.get('full_name')
+    timestamp = data.get('timestamp')
+    if not all([full_name, timestamp]):
+        return None, result(False, 400, 'Missing data for attendance record.')
+    if not isinstance(full_name, str) or not isinstance(timestamp, str):
+        return None, result(False, 400, 'full_name and timestamp must be strings.')
+
+    status = data.get('status', 'Present')  # Default to Present
+    if not isinstance(status, str) or not status:
+        return None, result(False, 400, 'status must be a non-empty string.')
+
+    for field in ('subject', 'department'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return None, result(False, 400, f'{field} must be a string.')
+
+    schedule_id = data.get('schedule_id')
+    if schedule_id is not None and (not isinstance(schedule_id, int) or isinstance(schedule_id, bool)):
+        return None, result(False, 400, 'schedule_id must be an integer.')
+
+    key = data.get('idempotency_key')
+    if key is not None and (not isinstance(key, str) or not 0 < len(key) <= MAX_IDEMPOTENCY_KEY_LENGTH):
+        return None, result(False, 400, f'idempotency_key must be a string of 1 to '
+                                        f'{MAX_IDEMPOTENCY_KEY_LENGTH} characters.')
+
+    return {
+        'full_name': full_name,
+        'status': status,
+        # Use subject if provided, otherwise use department
+        'subject': data.get('subject') or data.get('department'),
+        'schedule_id': schedule_id,
+        'timestamp': timestamp,
+        'idempotency_key': key,
+    }, None
+
+
+def lookup_user_ids(conn, full_names):
+    """Map full names to user ids through the in-memory user directory."""
+    names = set(full_names)
+    users = user_directory.snapshot(conn).by_full_name
+    if not names <= users.keys():
+        # The user may have just been added through another worker
+        users = user_directory.snapshot(conn, recheck=True).by_full_name
+    return {name: users[name]['id'] for name in names if name in users}
+
+
+def resolve_class(check_in, user_id, schedules, subject_ids, checked_in):
+    """Return (subject_id, slot, legacy_subject) for a check-in.
+
+    The dashboard sends the schedule_id it checked in for. Other clients
+    send a subject label, which is matched against the subject names and
+    the user's schedule; a label that matches no subject is kept as
+    text. A check-in that names no class (only a subject, or text) is
+    matched to the class on the user's schedule at check-in time.
+    """
+    slot = schedules.get(check_in['schedule_id'])
+    if slot is not None and slot['user_id'] == user_id:
+        return slot['subject_id'], slot, None
+
+    label = check_in['subject']
+    subject_id, day_of_week, start_time = parse_subject_label(label, subject_ids)
+    if day_of_week is not None:
+        slot = schedules.at(user_id, day_of_week, start_time, subject_id)
+        if slot is None:
+            return subject_id, None, label  # A slot that is not on the schedule
+        return subject_id, slot, None
+
+    # No class named: the one on the user's schedule at check-in time
+    slot = None
+    if checked_in is not None:
+        slot = schedules.find(user_id, DAY_NAMES[checked_in.weekday()], checked_in.hour * 60 + checked_in.minute)
+    if label and subject_id is None:
+        return None, slot, label  # Text that names no subject is kept as it is
+    if slot is not None and subject_id in (None, slot['subject_id']):
+        return slot['subject_id'], slot, None
+    return subject_id, None, None
+
+
+def idempotency_key(check_in, slot, arrival, checked_in):
+    """Return the key that makes a repeated check-in a duplicate, or None.
+
+    Attending a class counts once per day, whatever the client sends.
+    Other check-ins are only deduplicated by the key the client chose.
+    """
+    if arrival in (ON_TIME, LATE):
+        return f"schedule:{slot['id']}:{checked_in.date().isoformat()}"
+    if check_in['idempotency_key'] is not None:
+        return 'client:' + check_in['idempotency_key']
+    return None
+
+
+class RecentKeys:
+    """Idempotency keys written by this process in the last ttl seconds.
+
+    A burst of retries is answered from here without a query or a write
+    transaction. The unique index on attendance_records.idempotency_key
+    still catches retries that reach another worker or come later.
+    """
+
+    def __init__(self, ttl=RECENT_KEY_TTL):
+        self.ttl = ttl
+        self._expires = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._expires and next(iter(self._expires.values())) <= now:
+            self._expires.popitem(last=False)
+
+    def seen(self, keys):
+        """Return the subset of keys written recently."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return {key for key in keys if key in self._expires}
+
+    def add(self, keys):
+        """Remember keys; call after the check-ins they belong to are committed."""
+        with self._lock:
+            expires = time.monotonic() + self.ttl
+            for key in keys:
+                self._expires.pop(key, None)
+                self._expires[key] = expires
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+
+
+recent_keys = RecentKeys()
+
+
+def find_written_keys(conn, keys):
+    """Return the subset of keys already stored on a check-in."""
+    keys = list(keys)
+    found = set()
+    for start in range(0, len(keys), KEY_LOOKUP_CHUNK):
+        chunk = keys[start:start + KEY_LOOKUP_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(row[0] for row in conn.execute(
+            f'SELECT idempotency_key FROM attendance_records WHERE idempotency_key IN ({placeholders})', chunk
+        ))
+    return found
+
+
+def insert_check_ins(conn, check_ins):
+    """Insert validated check-ins with a single executemany.
+
+    Each check-in is matched to its class and marked on time, late or
+    unscheduled here, so readers never have to work it out again.
+    Repeats of a check-in already written (see idempotency_key) are
+    skipped and reported as already marked. The caller owns the
+    transaction and must commit, then pass the returned keys to
+    recent_keys.add(). Returns (one result per check-in in order, keys
+    written).
+    """
+    user_ids = lookup_user_ids(conn, [c['full_name'] for c in check_ins])
+    schedules = schedule_index.snapshot(conn)
+    if any(c['schedule_id'] is not None and schedules.get(c['schedule_id']) is None for c in check_ins):
+        # The schedule may have just been added through another worker
+        schedules = schedule_index.snapshot(conn, recheck=True)
+    subject_ids = {row['name']: row['id'] for row in conn.execute('SELECT id, name FROM subjects ORDER BY name')}
+
+    rows = []
+    results = []
+    for check_in in check_ins:
+        user_id = user_ids.get(check_in['full_name'])
+        if user_id is None:
+            rows.append(None)
+            results.append(result(False, 404, 'User not found.'))
+            continue
+        checked_in = parse_timestamp(check_in['timestamp'])
+        subject_id, slot, legacy_subject = resolve_class(check_in, user_id, schedules, subject_ids, checked_in)
+        arrival, minutes_late = classify_arrival(slot, checked_in) if checked_in else (None, None)
+        rows.append((user_id, subject_id, slot['id'] if slot else None, check_in['status'],
+                     check_in['timestamp'], legacy_subject, arrival, minutes_late,
+                     idempotency_key(check_in, slot, arrival, checked_in)))
+        results.append(result(True, 201, 'Attendance marked successfully!'))
+
+    # Retries of check-ins written before, here or in another worker
+    keys = {row[-1] for row in rows if row is not None and row[-1] is not None}
+    written = recent_keys.seen(keys)
+    written |= find_written_keys(conn, keys - written)
+
+    new_rows = []
+    new_keys = set()
+    for index, row in enumerate(rows):
+        if row is None:
+            continue
+        key = row[-1]
+        if key in written or key in new_keys:
+            results[index] = result(True, 200, 'Attendance already marked.')
+            continue
+        if key is not None:
+            new_keys.add(key)
+        new_rows.append(row)
+
+    if new_rows:
+        # DO NOTHING covers a retry committed by another worker since the lookup
+        conn.executemany('''
+            INSERT INTO attendance_records (user_id, subject_id, schedule_id, status, timestamp, legacy_subject,
+                                            arrival, minutes_late, idempotency_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+        ''', new_rows)
+
+    return results, new_keys
+
+
+def write_check_ins(conn, check_ins):
+    """Insert and commit validated check-ins, isolating any that fail.
+
+    The check-ins are written in one transaction. If that fails, each is
+    retried in a transaction of its own, so a check-in the database
+    rejects gets a 500 result and the others are still written. Returns
+    (results, keys written) like insert_check_ins; the caller passes
+    the keys to recent_keys.add().
+    """
+    if len(check_ins) > 1:
+        try:
+            results, keys = insert_check_ins(conn, check_ins)
+            conn.commit()
+            return results, keys
+        except Exception as e:
+            conn.rollback()
+            print(f"Attendance batch error, writing check-ins one at a time: {e}")
+
+    results = []
+    written = set()
+    for check_in in check_ins:
+        try:
+            (outcome,), keys = insert_check_ins(conn, [check_in])
+            conn.commit()
+            written |= keys
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Attendance error: {e}")
+            outcome = result(False, 500, f'Database error: {str(e)}')
+        except Exception as e:
+            conn.rollback()
+            print(f"Attendance error: {e}")
+            outcome = result(False, 500, 'Internal server error')
+        results.append(outcome)
+    return results, written
+
+
+class CommitNotifier:
+    """Wakes live-feed readers when check-ins are committed in this process.
+
+    Readers remember seq, query for new rows, then wait() until seq
+    moves on. Writes made by other worker processes are picked up when
+    the wait times out, so a missed wake-up only delays an event.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._cond = threading.Condition()
+        self._listeners = set()
+
+    def notify(self):
+        with self._cond:
+            self.seq += 1
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def wait(self, seq, timeout):
+        """Block until seq changes or timeout passes; return the current seq."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq
+
+    def subscribe(self, listener):
+        """Call listener() from the committing thread after every commit."""
+        with self._cond:
+            self._listeners.add(listener)
+
+    def unsubscribe(self, listener):
+        with self._cond:
+            self._listeners.discard(listener)
+
+
+commits = CommitNotifier()
+
+
+class AttendanceWriter:
+    """Background writer that group-commits single check-ins.
+
+    Request threads submit() a check-in and wait on the returned Future.
+    The writer thread collects everything that arrives within
+    GROUP_COMMIT_WINDOW and writes it in one transaction, so a burst of
+    check-ins shares one commit instead of paying one each.
+    """
+
+    def __init__(self, window=GROUP_COMMIT_WINDOW, max_batch=MAX_BATCH_SIZE):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, check_in):
+        """Queue a validated check-in; the Future resolves to its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((check_in, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            # A forked worker does not inherit the parent's thread
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = None
+            # Restart a writer that died; its queue keeps what it left behind
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='attendance-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Skip check-ins whose caller cancelled (e.g. an async client timed out)
+            batch = [(check_in, future) for check_in, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        # Every failure, including an empty pool, resolves the batch's
+        # Futures; a request thread must never wait on one forever. A
+        # check-in the database rejects only fails its own Future.
+        conn = None
+        committed = False
+        try:
+            conn = pool.acquire()
+            results, keys = write_check_ins(conn, [check_in for check_in, _ in batch])
+            committed = any(outcome['success'] for outcome in results)
+            recent_keys.add(keys)
+        except sqlite3.Error as e:
+            print(f"Attendance batch error: {e}")
+            results = [result(False, 500, f'Database error: {str(e)}')] * len(batch)
+        except Exception as e:
+            print(f"Attendance batch error: {e}")
+            results = [result(False, 500, 'Internal server error')] * len(batch)
+        finally:
+            if conn is not None:
+                pool.release(conn)
+
+        for (_, future), outcome in zip(batch, results):
+            future.set_result(outcome)
+
+        if committed:
+            try:
+                commits.notify()
+            except Exception as e:
+                # The check-ins are stored; live feeds catch up on their next poll
+                print(f"Commit notification error: {e}")
+
+
+writer = AttendanceWriter()
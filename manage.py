@@ -0,0 +1,165 @@
+"""Command line maintenance tasks for EduWatch.
+
+Usage:
+    python manage.py init-db
+    python manage.py rebuild-summary
+    python manage.py normalize-attendance
+    python manage.py archive [--before YYYY-MM] [--vacuum]
+    python manage.py import {users,subjects,schedules} FILE.csv [--dry-run]
+    python manage.py detect-absences [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+    python manage.py absence-scheduler [--at HH:MM]
+"""
+import argparse
+from datetime import date, datetime
+
+from absences import ABSENCE_TIME, detect_absences, last_closed_day, pending_days, run_daily, seconds_until
+from archive import ARCHIVE_KEEP_MONTHS, archive_before, default_cutoff
+from database import get_db_connection, init_database, normalize_attendance_records, rebuild_attendance_summary
+from importer import IMPORTERS, ImportFormatError, import_csv
+from partitions import create_partition_catalog
+
+
+def cmd_init_db(args):
+    """Apply pending schema migrations and create default data."""
+    init_database()
+
+
+def cmd_rebuild_summary(args):
+    """Recompute the /api/stats summary from attendance_records."""
+    conn = get_db_connection()
+    try:
+        rebuild_attendance_summary(conn)
+    finally:
+        conn.close()
+
+
+def cmd_normalize_attendance(args):
+    """Resolve old name/subject text on check-ins to user, subject and schedule ids."""
+    conn = get_db_connection()
+    try:
+        create_partition_catalog(conn)
+        report = normalize_attendance_records(conn)
+        if report:
+            rebuild_attendance_summary(conn)
+    finally:
+        conn.close()
+
+    if not report:
+        print("Attendance records already use ids")
+    for schema, (rows, without_user, without_subject, without_schedule) in report.items():
+        print(f"{schema}: {rows} records, {without_user} without a user, "
+              f"{without_subject} without a subject, {without_schedule} without a schedule")
+
+
+def cmd_archive(args):
+    """Move check-ins from closed months into per-month archive files."""
+    cutoff = datetime.strptime(args.before, '%Y-%m').date() if args.before else default_cutoff()
+    conn = get_db_connection()
+    try:
+        moved = archive_before(conn, cutoff)
+        for name, count in moved.items():
+            print(f"Archived {count} records from {name}")
+        if not moved:
+            print(f"Nothing to archive before {cutoff:%Y-%m}")
+        if args.vacuum and moved:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+
+def cmd_import(args):
+    """Bulk import users, subjects or schedules from a CSV file."""
+    conn = get_db_connection()
+    try:
+        with open(args.file, encoding='utf-8-sig', newline='') as f:
+            report = import_csv(conn, args.kind, f, args.dry_run)
+        if not args.dry_run:
+            conn.commit()
+    except ImportFormatError as e:
+        raise SystemExit(str(e))
+    finally:
+        conn.close()
+
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['message']}")
+    verb = 'would be imported' if args.dry_run else 'imported'
+    print(f"{report['imported']} of {report['total']} {args.kind} {verb}")
+
+
+def cmd_detect_absences(args):
+    """Record the classes nobody checked in for on closed days."""
+    conn = get_db_connection()
+    try:
+        if args.start or args.end:
+            end_day = date.fromisoformat(args.end) if args.end else last_closed_day()
+            start_day = date.fromisoformat(args.start) if args.start else end_day
+        else:
+            days = pending_days(conn)
+            if days is None:
+                print("Absences are up to date")
+                return
+            start_day, end_day = days
+        counts = detect_absences(conn, start_day, end_day)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        conn.close()
+
+    for day, count in counts.items():
+        print(f"{day}: {count} absences")
+
+
+def cmd_absence_scheduler(args):
+    """Keep running and detect the previous day's absences every day."""
+    if not args.at:
+        raise SystemExit('Set EDUWATCH_ABSENCE_TIME or pass --at HH:MM')
+    try:
+        seconds_until(args.at)
+    except ValueError:
+        raise SystemExit(f'Invalid time {args.at!r}, expected HH:MM')
+    print(f"Detecting absences every day at {args.at}")
+    try:
+        run_daily(get_db_connection, args.at)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EduWatch maintenance tasks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('init-db', help=cmd_init_db.__doc__).set_defaults(func=cmd_init_db)
+    commands.add_parser('rebuild-summary', help=cmd_rebuild_summary.__doc__).set_defaults(func=cmd_rebuild_summary)
+
+    commands.add_parser('normalize-attendance', help=cmd_normalize_attendance.__doc__).set_defaults(
+        func=cmd_normalize_attendance)
+
+    archive = commands.add_parser('archive', help=cmd_archive.__doc__)
+    archive.add_argument('--before', metavar='YYYY-MM',
+                         help=f'archive months before this one (default: keep {ARCHIVE_KEEP_MONTHS} months)')
+    archive.add_argument('--vacuum', action='store_true', help='compact the main database afterwards')
+    archive.set_defaults(func=cmd_archive)
+
+    importing = commands.add_parser('import', help=cmd_import.__doc__)
+    importing.add_argument('kind', choices=list(IMPORTERS))
+    importing.add_argument('file')
+    importing.add_argument('--dry-run', action='store_true', help='validate the rows without writing them')
+    importing.set_defaults(func=cmd_import)
+
+    absences = commands.add_parser('detect-absences', help=cmd_detect_absences.__doc__)
+    absences.add_argument('--start', metavar='YYYY-MM-DD',
+                          help='first day to check (default: the day after the last one checked, or yesterday)')
+    absences.add_argument('--end', metavar='YYYY-MM-DD', help='last day to check (default: yesterday)')
+    absences.set_defaults(func=cmd_detect_absences)
+
+    scheduler = commands.add_parser('absence-scheduler', help=cmd_absence_scheduler.__doc__)
+    scheduler.add_argument('--at', metavar='HH:MM', default=ABSENCE_TIME,
+                           help='local time to run at (default: EDUWATCH_ABSENCE_TIME)')
+    scheduler.set_defaults(func=cmd_absence_scheduler)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
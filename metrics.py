@@ -0,0 +1,277 @@
+"""Opt-in request and SQL instrumentation, exported in Prometheus format.
+
+Set EDUWATCH_METRICS=1 to record:
+- per-route latency histograms, split into time spent in SQLite, in
+  JSON encoding, and the rest of the handler (row conversion etc.)
+- per-statement call counts, cumulative seconds and rows returned
+
+GET /api/metrics serves them. With EDUWATCH_SERVER_TIMING=1 every
+response also carries a Server-Timing header with the same breakdown
+for that request, which the browser dev tools show next to each call.
+Either flag works on its own.
+
+Counters live in the worker process. Under gunicorn each scrape sees
+the worker that answered it.
+"""
+import contextvars
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+ENABLED = os.environ.get('EDUWATCH_METRICS', '').lower() in ('1', 'true', 'yes')
+SERVER_TIMING = os.environ.get('EDUWATCH_SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# Requests and SQL are timed if either output is wanted
+TIMED = ENABLED or SERVER_TIMING
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statement labels are truncated so one huge query cannot bloat a scrape
+MAX_STATEMENT_LABEL = 300
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+# Timings for the request being handled on this thread
+_current = contextvars.ContextVar('eduwatch_request_timing', default=None)
+
+
+def statement_label(sql):
+    """Collapse whitespace and IN (?, ?, ...) lists so similar statements share a label."""
+    label = _IN_LIST.sub('(?...)', ' '.join(sql.split()))
+    return label[:MAX_STATEMENT_LABEL]
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+
+
+class Registry:
+    """All metrics for this process, guarded by one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}    # (route, method, status) -> Histogram
+        self.phases = {}      # (route, method, phase) -> seconds
+        self.request_rows = {}  # (route, method) -> rows
+        self.statements = {}  # label -> [calls, seconds, rows]
+
+    def observe_statement(self, label, seconds, rows=0, call=False):
+        if ENABLED:
+            with self._lock:
+                stats = self.statements.setdefault(label, [0, 0.0, 0])
+                if call:
+                    stats[0] += 1
+                stats[1] += seconds
+                stats[2] += rows
+        timing = _current.get()
+        if timing is not None:
+            timing['sql'] += seconds
+            timing['rows'] += rows
+
+    def observe_request(self, route, method, status, timing, total):
+        app_seconds = max(total - timing['sql'] - timing['json'], 0.0)
+        with self._lock:
+            self.requests.setdefault((route, method, status), Histogram()).observe(total)
+            for phase, seconds in (('sql', timing['sql']), ('json', timing['json']), ('app', app_seconds)):
+                key = (route, method, phase)
+                self.phases[key] = self.phases.get(key, 0.0) + seconds
+            self.request_rows[(route, method)] = self.request_rows.get((route, method), 0) + timing['rows']
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append('# HELP eduwatch_request_duration_seconds Request latency by route.')
+            lines.append('# TYPE eduwatch_request_duration_seconds histogram')
+            for (route, method, status), histogram in sorted(self.requests.items()):
+                labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                cumulative = 0
+                for upper, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'eduwatch_request_duration_seconds_bucket{{{labels},le="{upper}"}} {cumulative}')
+                lines.append(f'eduwatch_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'eduwatch_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'eduwatch_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+            lines.append('# HELP eduwatch_request_phase_seconds_total Request time spent in SQLite (sql), '
+                         'JSON encoding (json) and everything else (app).')
+            lines.append('# TYPE eduwatch_request_phase_seconds_total counter')
+            for (route, method, phase), seconds in sorted(self.phases.items()):
+                lines.append(f'eduwatch_request_phase_seconds_total{{route="{_escape(route)}",'
+                             f'method="{method}",phase="{phase}"}} {seconds:.6f}')
+
+            lines.append('# HELP eduwatch_request_rows_total Rows fetched from SQLite by route.')
+            lines.append('# TYPE eduwatch_request_rows_total counter')
+            for (route, method), rows in sorted(self.request_rows.items()):
+                lines.append(f'eduwatch_request_rows_total{{route="{_escape(route)}",method="{method}"}} {rows}')
+
+            for name, index, kind, help_text in (
+                ('eduwatch_sql_calls_total', 0, 'counter', 'Executions per SQL statement.'),
+                ('eduwatch_sql_seconds_total', 1, 'counter', 'Time in execute and fetch per SQL statement.'),
+                ('eduwatch_sql_rows_total', 2, 'counter', 'Rows returned per SQL statement.'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for label, stats in sorted(self.statements.items()):
+                    value = f'{stats[index]:.6f}' if index == 1 else stats[index]
+                    lines.append(f'{name}{{statement="{_escape(label)}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+# --- SQLite instrumentation ---
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports execute and fetch time and rows per statement.
+
+    sqlite3's trace callback only reports the SQL text, not how long it
+    ran, so timing wraps the calls themselves. For a SELECT, most of
+    the work happens while rows are fetched, so fetch time is added to
+    the statement that produced the rows.
+    """
+
+    _label = None
+
+    def execute(self, sql, parameters=()):
+        self._label = statement_label(sql)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            registry.observe_statement(self._label, time.perf_counter() - started, call=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._label = statement_label(sql)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            registry.observe_statement(self._label, time.perf_counter() - started, call=True)
+
+    def _fetched(self, started, rows):
+        if self._label is not None:
+            registry.observe_statement(self._label, time.perf_counter() - started, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(started, 1)
+        return row
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including execute() shortcuts, are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts create plain cursors without going through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """sqlite3.connect() factory: timed connections when metrics or Server-Timing are on."""
+    return TimedConnection if TIMED else sqlite3.Connection
+
+
+# --- Flask integration ---
+
+def add_json_time(seconds):
+    """Count time spent encoding JSON towards the current request, if timed."""
+    timing = _current.get()
+    if timing is not None:
+        timing['json'] += seconds
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Adds the time spent encoding jsonify() bodies to the request's timings."""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_json_time(time.perf_counter() - started)
+
+
+def start_request():
+    _current.set({'started': time.perf_counter(), 'sql': 0.0, 'json': 0.0, 'rows': 0})
+
+
+def finish_request(response):
+    timing = _current.get()
+    if timing is None:
+        return response
+    _current.set(None)
+
+    total = time.perf_counter() - timing['started']
+    if ENABLED:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe_request(route, request.method, response.status_code, timing, total)
+
+    if SERVER_TIMING:
+        app_seconds = max(total - timing['sql'] - timing['json'], 0.0)
+        response.headers['Server-Timing'] = ', '.join([
+            f'sql;dur={timing["sql"] * 1000:.2f}',
+            f'json;dur={timing["json"] * 1000:.2f}',
+            f'app;dur={app_seconds * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        # The frontend is served from another origin
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+def init_app(app):
+    """Install the request hooks. Call before registering blueprints so
+    finish_request runs after their after_request handlers."""
+    app.json = TimedJSONProvider(app)
+    app.before_request(start_request)
+    app.after_request(finish_request)
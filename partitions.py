@@ -0,0 +1,177 @@
+"""Monthly archive partitions of attendance_records.
+
+Recent check-ins live in the main database. Closed months can be moved
+into one SQLite file per month (see archive.py); the
+attendance_partitions catalog in the main database records which local
+days each file covers. Readers call iter_attendance_records, which
+attaches only the archives that overlap the requested date range and
+merges their rows with the hot table's in (timestamp, id) order.
+
+Archives are attached one at a time, so any number of them stays under
+SQLite's limit of ten attached databases per connection.
+"""
+import heapq
+import os
+import sqlite3
+
+from serializers import tuple_cursor
+
+HOT_TABLE = 'attendance_records'
+
+# Rows read per keyset query from each source while merging
+MERGE_BATCH_SIZE = 500
+
+
+def create_partition_catalog(conn):
+    """Create the attendance_partitions catalog if it does not exist."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_partitions (
+            name TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            start_day TEXT NOT NULL,
+            end_day TEXT NOT NULL,
+            first_timestamp TEXT,
+            last_timestamp TEXT,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_partitions_start_day ON attendance_partitions (start_day)')
+
+
+def hot(sql):
+    """Point a {records} query at the main database's attendance_records."""
+    return sql.replace('{records}', HOT_TABLE)
+
+
+def database_dir(conn):
+    """Directory of the connection's main database file; archive paths are relative to it."""
+    for row in conn.execute('PRAGMA database_list').fetchall():
+        if row[1] == 'main':
+            return os.path.dirname(row[2])
+    return ''
+
+
+def list_partitions(conn, filters=None):
+    """Return catalog rows, oldest first, for archives overlapping the filters' dates."""
+    clauses = []
+    params = []
+    if filters and 'start_date' in filters:
+        clauses.append('end_day >= ?')
+        params.append(filters['start_date'].isoformat())
+    if filters and 'end_date' in filters:
+        clauses.append('start_day <= ?')
+        params.append(filters['end_date'].isoformat())
+    where = ' AND '.join(clauses) if clauses else '1 = 1'
+    return conn.execute(f'''
+        SELECT name, path, start_day, end_day, row_count
+        FROM attendance_partitions
+        WHERE {where}
+        ORDER BY start_day
+    ''', params).fetchall()
+
+
+def schema_name(partition_name):
+    return f'part_{partition_name}'
+
+
+def attach_partition(conn, partition):
+    """Attach an archive file under schema_name(name) and return the schema.
+
+    ATTACH cannot run inside a transaction, so callers attach before
+    writing anything.
+    """
+    schema = schema_name(partition['name'])
+    attached = {row[1] for row in conn.execute('PRAGMA database_list').fetchall()}
+    if schema not in attached:
+        path = os.path.join(database_dir(conn), partition['path'])
+        conn.execute(f'ATTACH DATABASE ? AS {schema}', (path,))
+    return schema
+
+
+def detach_partition(conn, schema):
+    try:
+        conn.execute(f'DETACH DATABASE {schema}')
+    except sqlite3.Error as e:
+        print(f"Detach {schema} error: {e}")
+
+
+def iter_attendance_records(conn, select, where, params, key, filters=None, descending=False,
+                            after=None, tuples=True, batch_size=MERGE_BATCH_SIZE):
+    """Yield attendance rows from the hot table and the overlapping archives.
+
+    select is a SELECT ... FROM {records} ar [JOIN ...] head; where and
+    params filter it, and key(row) must return the row's (timestamp, id).
+    Rows come out ordered by (timestamp, id), newest first if descending,
+    starting after the (timestamp, id) in after.
+
+    Each source is read in keyset batches, so no statement is left open
+    between rows and an archive can be detached as soon as it is done.
+    """
+    sources = [_keyset_batches(conn, hot(select), where, params, key, descending, after, tuples, batch_size)]
+    partitions = list_partitions(conn, filters)
+    if partitions:
+        ordered = partitions[::-1] if descending else partitions
+        sources.append(_archived_records(conn, ordered, select, where, params, key, descending, after,
+                                         tuples, batch_size))
+    try:
+        if len(sources) == 1:
+            yield from sources[0]
+        else:
+            yield from heapq.merge(*sources, key=key, reverse=descending)
+    finally:
+        for source in sources:
+            source.close()
+
+
+def _keyset_batches(conn, select, where, params, key, descending, after, tuples, batch_size):
+    op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+    last = after
+    while True:
+        clause = where
+        batch_params = list(params)
+        if last is not None:
+            clause += f' AND (ar.timestamp {op} ? OR (ar.timestamp = ? AND ar.id {op} ?))'
+            batch_params.extend([last[0], last[0], last[1]])
+        cursor = tuple_cursor(conn) if tuples else conn.cursor()
+        rows = cursor.execute(f'''
+            {select}
+            WHERE {clause}
+            ORDER BY ar.timestamp {direction}, ar.id {direction}
+            LIMIT ?
+        ''', batch_params + [batch_size]).fetchall()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = key(rows[-1])
+
+
+def _archived_records(conn, partitions, select, where, params, key, descending, after, tuples, batch_size):
+    # Months do not overlap, so the archives can simply be chained
+    for partition in partitions:
+        schema = attach_partition(conn, partition)
+        try:
+            yield from _keyset_batches(conn, select.replace('{records}', f'{schema}.{HOT_TABLE}'), where,
+                                       params, key, descending, after, tuples, batch_size)
+        finally:
+            detach_partition(conn, schema)
+
+
+def drop_partitions(conn):
+    """Remove every catalog entry and return the archive paths to delete.
+
+    The caller commits, then passes the paths to remove_archive_files.
+    """
+    base = database_dir(conn)
+    paths = [os.path.join(base, row['path'])
+             for row in conn.execute('SELECT path FROM attendance_partitions').fetchall()]
+    conn.execute('DELETE FROM attendance_partitions')
+    return paths
+
+
+def remove_archive_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Archive removal error: {e}")
@@ -0,0 +1,245 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Scheme used for new hashes: 'scrypt' or 'pbkdf2_sha256'
+PASSWORD_SCHEME = os.environ.get('EDUWATCH_PASSWORD_SCHEME', 'scrypt')
+
+# scrypt cost: memory is 128 * N * r bytes (16 MB with the defaults)
+SCRYPT_N = int(os.environ.get('EDUWATCH_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('EDUWATCH_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('EDUWATCH_SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('EDUWATCH_PBKDF2_ITERATIONS', 600000))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# hashlib releases the GIL while hashing, so these threads run in parallel
+VERIFY_WORKERS = int(os.environ.get('EDUWATCH_PASSWORD_WORKERS', os.cpu_count() or 2))
+# Hash jobs allowed to queue before callers are turned away
+MAX_PENDING = VERIFY_WORKERS * 8
+# Hash jobs one bulk caller (a CSV import) keeps in the pool at once, so
+# logins still find free workers
+BULK_HASH_JOBS = max(1, VERIFY_WORKERS // 2)
+
+# Successful verifications remembered so repeat logins skip the KDF
+VERIFY_MEMO_TTL = 300  # seconds
+VERIFY_MEMO_SIZE = 4096
+
+
+class PasswordBusy(Exception):
+    """Raised when the hashing pool is saturated."""
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def hash_password(password, scheme=None):
+    """Hash a password with a fresh salt.
+
+    Hashes are stored as '$'-separated fields that carry the scheme and
+    cost, so the cost can be raised later without breaking old hashes.
+    """
+    scheme = scheme or PASSWORD_SCHEME
+    salt = secrets.token_bytes(SALT_BYTES)
+    if scheme == 'scrypt':
+        key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}'
+    if scheme == 'pbkdf2_sha256':
+        key = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f'pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(key)}'
+    raise ValueError(f'Unknown password scheme: {scheme}')
+
+
+def _is_legacy(stored):
+    """Unsalted SHA-256 hex digests from before the KDF migration."""
+    return len(stored) == 64 and '$' not in stored
+
+
+def verify_password(password, stored):
+    """Check a password against any supported stored hash in constant time."""
+    if not stored or password is None:
+        return False
+    try:
+        if _is_legacy(stored):
+            expected = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(expected, stored)
+
+        fields = stored.split('$')
+        if fields[0] == 'scrypt' and len(fields) == 6:
+            n, r, p = int(fields[1]), int(fields[2]), int(fields[3])
+            key = _scrypt(password, _unb64(fields[4]), n, r, p)
+            return hmac.compare_digest(key, _unb64(fields[5]))
+        if fields[0] == 'pbkdf2_sha256' and len(fields) == 4:
+            key = _pbkdf2(password, _unb64(fields[2]), int(fields[1]))
+            return hmac.compare_digest(key, _unb64(fields[3]))
+    except (ValueError, TypeError) as e:
+        print(f"Password hash error: {e}")
+    return False
+
+
+_dummy_hash = None
+
+
+def dummy_hash():
+    """A hash with the current settings that no password is expected to match.
+
+    Logins for unknown usernames are checked against it, so they take as
+    long as logins for real ones and do not reveal which usernames exist.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_urlsafe(32))
+    return _dummy_hash
+
+
+def needs_rehash(stored):
+    """True if a stored hash is legacy or weaker than the current settings."""
+    if _is_legacy(stored):
+        return True
+    fields = stored.split('$')
+    if PASSWORD_SCHEME == 'scrypt':
+        return fields[0] != 'scrypt' or fields[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return fields[0] != PASSWORD_SCHEME or fields[1] != str(PBKDF2_ITERATIONS)
+
+
+class VerifyMemo:
+    """Remembers recent successful verifications for a short time.
+
+    Keys are an HMAC of the stored hash and the password under a key
+    generated per process, so the memo never holds a usable password or
+    an offline-crackable digest. Changing a password changes the stored
+    hash, which retires the old entries.
+    """
+
+    def __init__(self, ttl=VERIFY_MEMO_TTL, max_entries=VERIFY_MEMO_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, password, stored):
+        message = stored.encode() + b'\0' + password.encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def check(self, password, stored):
+        digest = self._digest(password, stored)
+        with self._lock:
+            expires = self._entries.get(digest)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._entries[digest]
+                return False
+            return True
+
+    def remember(self, password, stored):
+        digest = self._digest(password, stored)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PasswordHasher:
+    """Runs KDF work on a bounded thread pool.
+
+    At most MAX_PENDING jobs may be queued or running; beyond that
+    submit() raises PasswordBusy straight away so a login storm turns
+    into quick 503s instead of an ever-growing queue.
+    """
+
+    def __init__(self, workers=VERIFY_WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.memo = VerifyMemo()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        with self._lock:
+            # A forked worker does not inherit the parent's threads
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password')
+            return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordBusy('Too many password operations in progress.')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password):
+        """Future resolving to a new hash of password."""
+        return self._submit(hash_password, password)
+
+    def hash_all(self, passwords, jobs=BULK_HASH_JOBS):
+        """Hash many passwords in order, at most jobs of them at a time.
+
+        Raises PasswordBusy if the pool is saturated.
+        """
+        hashes = []
+        pending = deque()
+        for password in passwords:
+            if len(pending) >= jobs:
+                hashes.append(pending.popleft().result())
+            pending.append(self.hash(password))
+        hashes.extend(future.result() for future in pending)
+        return hashes
+
+    def verify(self, password, stored):
+        """Future resolving to (valid, new_hash).
+
+        new_hash is set when the stored hash should be replaced, for
+        example a legacy SHA-256 digest after a successful login. Pass
+        stored=None for an unknown user: the KDF still runs, against
+        dummy_hash(), and the result is always invalid.
+        """
+        return self._submit(self._verify, password, stored)
+
+    def _verify(self, password, stored):
+        if not stored or password is None:
+            verify_password(password or '', dummy_hash())
+            return False, None
+        if _is_legacy(stored):
+            # A bare SHA-256 check would answer much faster than a KDF one
+            verify_password(password, dummy_hash())
+        if not self.memo.check(password, stored):
+            if not verify_password(password, stored):
+                return False, None
+            self.memo.remember(password, stored)
+        if needs_rehash(stored):
+            return True, hash_password(password)
+        return True, None
+
+
+hasher = PasswordHasher()
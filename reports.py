@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+from attendance import SUBJECT_LABEL, build_attendance_where
+from database import pool
+from partitions import iter_attendance_records
+
+# Rows pulled from SQLite per fetchmany() call while streaming
+STREAM_BATCH_SIZE = 500
+
+EXPORT_COLUMNS = ['id', 'name', 'username', 'user_status', 'subject', 'status', 'timestamp']
+EXPORT_SELECT = f'''
+    SELECT ar.id, COALESCE(u.full_name, ar.legacy_name) as name, u.username, u.status as user_status,
+           {SUBJECT_LABEL} as subject, ar.status, ar.timestamp
+    FROM {{records}} ar
+    LEFT JOIN users u ON ar.user_id = u.id
+    LEFT JOIN subjects sub ON ar.subject_id = sub.id
+    LEFT JOIN schedules sc ON ar.schedule_id = sc.id
+'''
+
+
+def _export_key(row):
+    return row[6], row[0]
+
+
+def iter_attendance_rows(filters):
+    """Yield export rows oldest first, from the hot table and any
+    archived months in the date range.
+
+    Runs on its own pooled connection because the response body is
+    produced after the request handler has returned. Only one batch of
+    rows per source is held in memory at a time.
+    """
+    where, params = build_attendance_where(filters)
+    conn = pool.acquire()
+    try:
+        rows = iter_attendance_records(conn, EXPORT_SELECT, where, params, _export_key, filters,
+                                       batch_size=STREAM_BATCH_SIZE)
+        try:
+            yield from rows
+        finally:
+            rows.close()
+    finally:
+        pool.release(conn)
+
+
+def stream_csv(rows):
+    """Encode rows as CSV, one chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows):
+    """Encode rows as newline-delimited JSON objects."""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(chunk) == STREAM_BATCH_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
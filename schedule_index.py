@@ -0,0 +1,25 @@
+"""Process-wide schedule index for matching check-ins to their class.
+
+The schedules table is loaded once into an analytics.ScheduleIndex
+(per user and weekday, sorted by start time) and reloaded when the
+schedules version in table_versions changes (see directory.py), so
+the check-in writer finds a class with a binary search instead of a
+query per batch. Handlers that change schedules call
+schedule_index.invalidate() after they commit.
+"""
+from analytics import ScheduleIndex
+from directory import VersionedCopy
+
+
+class ScheduleCache(VersionedCopy):
+    """The schedules table as a ScheduleIndex."""
+
+    table = 'schedules'
+
+    def load(self, conn):
+        return ScheduleIndex(conn.execute(
+            'SELECT id, user_id, subject_id, day_of_week, start_time, end_time FROM schedules'
+        ).fetchall())
+
+
+schedule_index = ScheduleCache()
@@ -0,0 +1,86 @@
+import json
+import time
+
+from flask import current_app
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lists with at least this many rows are encoded and sent in chunks
+STREAM_MIN_ROWS = 2000
+STREAM_CHUNK_ROWS = 1000
+
+
+def dumps(obj):
+    """Encode obj as compact UTF-8 JSON bytes, with orjson when installed."""
+    started = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+    metrics.add_json_time(time.perf_counter() - started)
+    return body
+
+
+def tuple_cursor(conn):
+    """Return a cursor that yields plain tuples instead of sqlite3.Row objects."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+class RowLayout:
+    """Precompiled mapping from tuple rows to JSON objects.
+
+    keys names each column of the query in order, so the SELECT list is
+    written to produce exactly the response fields. converters maps a
+    key to a function applied to that column (e.g. bool for 0/1 flags).
+    """
+
+    def __init__(self, keys, converters=None):
+        self.keys = tuple(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self._converters = [(self.index[key], fn) for key, fn in (converters or {}).items()]
+
+    def to_dict(self, row):
+        if self._converters:
+            row = list(row)
+            for i, fn in self._converters:
+                row[i] = fn(row[i])
+        return dict(zip(self.keys, row))
+
+    def dicts(self, rows):
+        if not self._converters:
+            keys = self.keys
+            return [dict(zip(keys, row)) for row in rows]
+        return [self.to_dict(row) for row in rows]
+
+
+def json_list_response(key, rows, layout, extra=None, status=200):
+    """Respond with {key: [rows...], **extra} without going through jsonify.
+
+    Short lists are encoded in one go; long ones are streamed
+    STREAM_CHUNK_ROWS rows at a time so the first bytes go out before the
+    whole list is encoded.
+    """
+    if len(rows) < STREAM_MIN_ROWS:
+        body = dumps({key: layout.dicts(rows), **(extra or {})})
+    else:
+        body = _stream_list(key, rows, layout, extra or {})
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _stream_list(key, rows, layout, extra):
+    yield b'{' + dumps(key) + b':['
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        # Each chunk is a JSON array; drop its brackets and join with commas
+        chunk = dumps(layout.dicts(rows[start:start + STREAM_CHUNK_ROWS]))[1:-1]
+        yield chunk if start == 0 else b',' + chunk
+    yield b']'
+    for name, value in extra.items():
+        yield b',' + dumps(name) + b':' + dumps(value)
+    yield b'}'
@@ -0,0 +1,29 @@
+"""Serve EduWatch with waitress, a production WSGI server that also runs on Windows.
+
+Waitress is a single process with a thread pool. Set EDUWATCH_THREADS to
+size it, and EDUWATCH_BIND for the address (default 0.0.0.0:5000).
+
+Usage: python serve.py
+"""
+import os
+
+from absences import start_scheduler
+from database import get_db_connection, init_database
+from server import create_app
+
+
+def main():
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit('waitress is not installed: pip install waitress')
+
+    init_database()
+    start_scheduler(get_db_connection)
+    serve(create_app(),
+          listen=os.environ.get('EDUWATCH_BIND', '0.0.0.0:5000'),
+          threads=int(os.environ.get('EDUWATCH_THREADS', 8)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,166 @@
 # Import necessary libraries
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, g, make_response
 from flask_cors import CORS
 import sqlite3
-from datetime import datetime
-import hashlib
-from database import get_db_connection, init_database
+import codecs
+import concurrent.futures
+import csv
+import functools
+from datetime import date, timedelta
+from database import DATABASE_NAME, check_schema_version, clear_attendance_summary, init_database, pool
+from passwords import PasswordBusy, hasher as password_hasher
+from ingest import (MAX_BULK_SIZE, commits, recent_keys, validate_check_in, write_check_ins,
+                    writer as attendance_writer)
+from analytics import compute_attendance_analytics
+from cache import DAY, MINUTE, response_cache, version_etag
+from directory import user_directory
+from schedule_index import schedule_index
+import metrics
+from reports import iter_attendance_rows, stream_csv, stream_ndjson
+from importer import IMPORTERS, ImportFormatError, ImportTooLarge, import_csv
+from feed import iter_attendance_events, stream_slots
+from partitions import drop_partitions, remove_archive_files
+from attendance import (ATTENDANCE_LAYOUT, FilterError, freeze_subject_labels, parse_attendance_filters,
+                        parse_page_size, fetch_attendance_page, today_counts)
+from serializers import RowLayout, json_list_response, tuple_cursor
 
-# Initialize the Flask application
-app = Flask(__name__)
+# All routes live on this blueprint; create_app() builds the application.
+# The database is initialized once by `python manage.py init-db` (or the
+# gunicorn master, see gunicorn.conf.py), not by every worker on import.
+api = Blueprint('api', __name__)
 
-# Enable CORS for all routes, allowing your frontend to connect
-CORS(app)
+# Seconds a check-in request waits for the group-commit writer
+WRITE_TIMEOUT = 10
+# Seconds a login or registration waits for the password hashing pool
+PASSWORD_TIMEOUT = 10
 
-# Initialize database on startup
-init_database()
+# Column order of the list queries served through json_list_response
+USER_LAYOUT = RowLayout(['id', 'username', 'full_name', 'email', 'contact_number', 'address', 'status',
+                         'is_admin', 'created_at'], converters={'is_admin': bool})
+SCHEDULE_LAYOUT = RowLayout(['id', 'user_id', 'user_name', 'user_status', 'subject_id', 'subject_name',
+                             'day_of_week', 'start_time', 'end_time'])
+ABSENCE_LAYOUT = RowLayout(['day', 'schedule_id', 'user_id', 'user_name', 'subject_id', 'subject_name',
+                            'start_time', 'end_time'])
+
+# Tables every attendance listing, export and analytics response reads
+ATTENDANCE_TABLES = ('attendance_records', 'attendance_partitions', 'users', 'subjects', 'schedules')
+
+# Days listed by /api/admin/absences when no start_date is given
+ABSENCE_DEFAULT_DAYS = 30
+
+# Most users one PUT /api/admin/users/subjects may update
+MAX_BULK_ASSIGNMENTS = 5000
+# Ids per IN (...) list when reading subject assignments
+ASSIGNMENT_LOOKUP_CHUNK = 500
+# Most users one CSV upload may add; each needs a password hash while
+# the request waits, so larger files go through manage.py import
+MAX_IMPORT_USERS = 200
 
 # --- Helper functions ---
 
-def hash_password(password):
-    """Hash password using SHA-256."""
-    return hashlib.sha256(password.encode()).hexdigest()
+def get_db():
+    """Return this request's pooled database connection."""
+    if 'db' not in g:
+        g.db = pool.acquire()
+    return g.db
 
-def verify_password(password, hashed_password):
-    """Verify password against hash."""
-    return hash_password(password) == hashed_password
+@api.teardown_app_request
+def release_db(exception):
+    """Hand the request's connection back to the pool."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool.release(conn)
+
+def conditional(*tables, clock=DAY, cache=False):
+    """Tag a GET handler's responses with an ETag and answer If-None-Match with 304.
+
+    The ETag comes from the version stamps of tables (see
+    cache.version_etag), so it is known before the handler runs: a
+    client whose copy is current gets its 304 without the query being
+    run, and streamed responses are tagged too. With cache=True the
+    JSON body is kept in response_cache under its ETag, so a worker
+    never serves a copy older than the tables.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                etag = version_etag(get_db(), tables, request.path, request.query_string.decode(), clock)
+            except sqlite3.Error as e:
+                print(f"ETag error: {e}")
+                etag = None
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                body = response_cache.get(etag) if cache else None
+                if body is not None:
+                    response = current_app.response_class(body, status=200, mimetype='application/json')
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if cache:
+                        response_cache.set(etag, tables, response.get_data())
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate it on every request
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
 
 def get_user_by_username(username):
-    """Get user by username from database."""
-    conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE username = ?', (username,)
-    ).fetchone()
-    conn.close()
-    return user
+    """Get user by username from the in-memory user directory."""
+    return user_directory.by_username(get_db(), username)
 
 def get_user_by_id(user_id):
-    """Get user by ID from database."""
-    conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
-    conn.close()
-    return user
+    """Get user by ID from the in-memory user directory."""
+    return user_directory.by_id(get_db(), user_id)
+
+def subject_id_set(value):
+    """Return a JSON list of subject ids as a set, or None if it is not a list of integers."""
+    if not isinstance(value, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+        return None
+    return set(value)
+
+def _in_chunks(conn, sql, ids):
+    """Run sql with its {ids} placeholder list filled in chunk by chunk; yield the rows."""
+    ids = list(ids)
+    for start in range(0, len(ids), ASSIGNMENT_LOOKUP_CHUNK):
+        chunk = ids[start:start + ASSIGNMENT_LOOKUP_CHUNK]
+        yield from conn.execute(sql.format(ids=', '.join('?' * len(chunk))), chunk)
+
+def unknown_subject_ids(conn, subject_ids):
+    """Return the ids in subject_ids that name no subject, sorted."""
+    found = {row[0] for row in _in_chunks(conn, 'SELECT id FROM subjects WHERE id IN ({ids})', subject_ids)}
+    return sorted(set(subject_ids) - found)
+
+def set_user_subjects(conn, assignments):
+    """Make each user's assigned subjects exactly the given set.
+
+    assignments maps user_id to a set of subject ids. Only the
+    differences from the current assignments are written, with one
+    executemany for removals and one for additions; the caller commits.
+    Returns (added, removed) counts.
+    """
+    current = {tuple(row) for row in _in_chunks(
+        conn, 'SELECT user_id, subject_id FROM user_subjects WHERE user_id IN ({ids})', assignments
+    )}
+    wanted = {(user_id, subject_id) for user_id, subject_ids in assignments.items() for subject_id in subject_ids}
+
+    removed = current - wanted
+    added = wanted - current
+    if removed:
+        conn.executemany('DELETE FROM user_subjects WHERE user_id = ? AND subject_id = ?', sorted(removed))
+    if added:
+        conn.executemany('INSERT INTO user_subjects (user_id, subject_id) VALUES (?, ?)', sorted(added))
+    return len(added), len(removed)
 
 # --- API Endpoints ---
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
     """Endpoint for user registration."""
     data = request.json
@@ -78,32 +193,31 @@ def register():
         return jsonify({'success': False, 'message': 'Username already exists.'}), 409
 
     try:
-        conn = get_db_connection()
-        hashed_password = hash_password(password)
-        
-        # Check if status column exists, if not add it
-        try:
-            conn.execute('ALTER TABLE users ADD COLUMN status TEXT')
-            conn.commit()
-        except sqlite3.Error:
-            # Column already exists, ignore the error
-            pass
-        
+        hashed_password = password_hasher.hash(password).result(timeout=PASSWORD_TIMEOUT)
+    except (PasswordBusy, concurrent.futures.TimeoutError):
+        return jsonify({'success': False, 'message': 'Server is busy. Please try again.'}), 503
+
+    try:
+        conn = get_db()
         conn.execute('''
             INSERT INTO users (username, password, full_name, email, contact_number, address, status, is_admin)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (username, hashed_password, full_name, email, contact, address, status, is_admin))
         
         conn.commit()
-        conn.close()
+        response_cache.invalidate('users')
+        user_directory.invalidate()
         
         return jsonify({'success': True, 'message': 'Account created successfully!'}), 201
     
+    except sqlite3.IntegrityError:
+        # Registered through another worker since the directory was checked
+        return jsonify({'success': False, 'message': 'Username already exists.'}), 409
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred. Please try again.'}), 500
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
     """Endpoint for user login."""
     data = request.json
@@ -114,9 +228,29 @@ def login():
         return jsonify({'success': False, 'message': 'Username and password are required.'}), 400
 
     user = get_user_by_username(username)
-    if not user or not verify_password(password, user['password']):
+
+    # The KDF runs on the hashing pool; a full pool means shed load now.
+    # Unknown usernames are checked against a dummy hash so they take as long.
+    try:
+        stored = user['password'] if user else None
+        valid, new_hash = password_hasher.verify(password, stored).result(timeout=PASSWORD_TIMEOUT)
+    except (PasswordBusy, concurrent.futures.TimeoutError):
+        return jsonify({'success': False, 'message': 'Server is busy. Please try again.'}), 503
+
+    if not user or not valid:
         return jsonify({'success': False, 'message': 'Invalid username or password.'}), 401
 
+    if new_hash:
+        # Upgrade legacy or outdated hashes now that we know the password
+        try:
+            conn = get_db()
+            conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                         (new_hash, user['id'], user['password']))
+            conn.commit()
+            user_directory.invalidate()
+        except sqlite3.Error as e:
+            print(f"Password rehash error: {e}")
+
     # Successful login, return user data
     return jsonify({
         'success': True,
@@ -129,131 +263,209 @@ def login():
         }
     }), 200
 
-@app.route('/api/attendance', methods=['POST'])
+@api.route('/api/attendance', methods=['POST'])
 def mark_attendance():
-    """Endpoint to mark user attendance."""
+    """Endpoint to mark user attendance.
+
+    The check-in is handed to the group-commit writer (see ingest.py),
+    which writes it together with any other check-ins that arrive in
+    the same few milliseconds. A retry of a check-in already written
+    (the same class on the same day, or the same idempotency_key) gets
+    200 and is not written again.
+    """
+    check_in, error = validate_check_in(request.json)
+    if error:
+        return jsonify({'success': False, 'message': error['message']}), error['code']
+
+    try:
+        outcome = attendance_writer.submit(check_in).result(timeout=WRITE_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        return jsonify({'success': False, 'message': 'Attendance service is busy. Please try again.'}), 503
+
+    return jsonify({'success': outcome['success'], 'message': outcome['message']}), outcome['code']
+
+@api.route('/api/attendance/bulk', methods=['POST'])
+def mark_attendance_bulk():
+    """Endpoint to mark many check-ins at once.
+
+    Accepts a JSON array of check-ins (or {"check_ins": [...]}) in the
+    same format as /api/attendance, writes them in one transaction and
+    returns a result for each. An invalid check-in gets a 400 result and
+    the rest are still written.
+    """
     data = request.json
-    full_name = data.get('full_name')
-    status = data.get('status', 'Present')  # Default to Present
-    department = data.get('department')
-    subject = data.get('subject')  # The formatted schedule string
-    timestamp = data.get('timestamp')
+    check_ins = data.get('check_ins') if isinstance(data, dict) else data
+
+    if not isinstance(check_ins, list) or not check_ins:
+        return jsonify({'success': False, 'message': 'A non-empty array of check-ins is required.'}), 400
+
+    if len(check_ins) > MAX_BULK_SIZE:
+        return jsonify({'success': False, 'message': f'At most {MAX_BULK_SIZE} check-ins per request.'}), 413
 
-    if not all([full_name, timestamp]):
-        return jsonify({'success': False, 'message': 'Missing data for attendance record.'}), 400
+    results = [None] * len(check_ins)
+    valid = []
+    for index, item in enumerate(check_ins):
+        check_in, error = validate_check_in(item)
+        if error:
+            results[index] = error
+        else:
+            valid.append((index, check_in))
 
     try:
-        conn = get_db_connection()
-        
-        # Get user ID from users table
-        user = conn.execute(
-            'SELECT id FROM users WHERE full_name = ?', (full_name,)
-        ).fetchone()
-        
-        if not user:
-            conn.close()
-            return jsonify({'success': False, 'message': 'User not found.'}), 404
-        
-        user_id = user['id']
-        
-        # Use subject if provided, otherwise use department
-        subject_to_save = subject if subject else department
-        
-        # Insert attendance record
-        conn.execute('''
-            INSERT INTO attendance_records (user_id, full_name, subject, status, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, full_name, subject_to_save, status, timestamp))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'success': True, 'message': 'Attendance marked successfully!'}), 201
+        conn = get_db()
+        if valid:
+            inserted, keys = write_check_ins(conn, [check_in for _, check_in in valid])
+            recent_keys.add(keys)
+            if any(outcome['success'] for outcome in inserted):
+                commits.notify()
+            for (index, _), outcome in zip(valid, inserted):
+                results[index] = outcome
+        
+        marked = sum(1 for outcome in results if outcome['success'])
+        return jsonify({
+            'success': True,
+            'message': f'{marked} of {len(results)} check-ins marked.',
+            'results': results
+        }), 200
     
     except sqlite3.Error as e:
-        print(f"Attendance error: {e}")
+        print(f"Bulk attendance error: {e}")
         return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
 
-@app.route('/api/dashboard', methods=['GET'])
+@api.route('/api/attendance/stream', methods=['GET'])
+def stream_attendance():
+    """Server-Sent Events feed of new check-ins and today's counters.
+
+    Resumes after the Last-Event-ID header (sent by EventSource on
+    reconnect) or the since_id argument; user_id limits the feed to one
+    user. Each open stream holds a worker thread, so a worker serves at
+    most feed.MAX_STREAMS of them and answers 503 beyond that; the
+    dashboard then polls instead. async_server.py serves streams without
+    holding threads and has no such limit.
+    """
+    try:
+        since_id = request.headers.get('Last-Event-ID') or request.args.get('since_id')
+        last_id = int(since_id) if since_id else None
+        user_id = int(request.args['user_id']) if request.args.get('user_id') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since_id and user_id must be integers.'}), 400
+
+    if not stream_slots.acquire():
+        return jsonify({'success': False, 'message': 'Too many live feeds open; poll /api/dashboard instead.'}), 503
+
+    response = Response(iter_attendance_events(last_id, user_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the client disconnects, even if the body was never started
+    response.call_on_close(stream_slots.release)
+    return response
+
+@api.route('/api/dashboard', methods=['GET'])
+@conditional(*ATTENDANCE_TABLES)
 def get_dashboard_data():
-    """Endpoint to get all attendance records with proper user status."""
-    try:
-        conn = get_db_connection()
-        records = conn.execute('''
-            SELECT ar.*, u.username, u.status as user_status
-            FROM attendance_records ar
-            LEFT JOIN users u ON ar.user_id = u.id
-            ORDER BY ar.timestamp DESC
-        ''').fetchall()
-        conn.close()
-        
-        # Convert to list of dictionaries
-        attendance_list = []
-        for record in records:
-            # Safely get values with proper key checking
-            record_dict = dict(record)
-            attendance_list.append({
-                'id': record_dict.get('id'),
-                'name': record_dict.get('full_name'),
-                'department': record_dict.get('department', 'N/A'),
-                'subject': record_dict.get('subject', record_dict.get('department', 'N/A')),
-                'status': record_dict.get('status', 'Present'),
-                'user_status': record_dict.get('user_status', 'Unknown'),
-                'timestamp': record_dict.get('timestamp'),
-                'username': record_dict.get('username')
-            })
-        
-        return jsonify({'attendance': attendance_list}), 200
+    """Endpoint to get attendance records with proper user status.
+
+    Accepts start_date, end_date, today, user_id, subject and status
+    filters, and pages results with limit/cursor (see attendance.py).
+    """
+    try:
+        filters = parse_attendance_filters(request.args)
+        limit = parse_page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+
+        conn = get_db()
+        records, next_cursor = fetch_attendance_page(conn, filters, limit, cursor)
+
+        return json_list_response('attendance', records, ATTENDANCE_LAYOUT, {'next_cursor': next_cursor})
     
+    except FilterError as e:
+        return jsonify({'success': False, 'message': str(e), 'attendance': []}), 400
     except sqlite3.Error as e:
         print(f"Dashboard error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.', 'attendance': []}), 500
 
+@api.route('/api/analytics', methods=['GET'])
+@conditional(*ATTENDANCE_TABLES, 'absences', 'absence_days', clock=MINUTE)
+def get_analytics():
+    """Endpoint for on-time/late/absent analytics per employee.
+
+    Accepts the same start_date, end_date, today and user_id filters as
+    /api/dashboard. Pass details=1 to also get the individual present,
+    late and absent entries for report tables.
+    """
+    try:
+        filters = parse_attendance_filters(request.args)
+        details = request.args.get('details') in ('1', 'true', 'yes')
+        
+        conn = get_db()
+        analytics = compute_attendance_analytics(conn, filters, details)
+        
+        return jsonify(analytics), 200
+    
+    except FilterError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        print(f"Analytics error: {e}")
+        return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
+
+# --- Report Export Endpoints ---
+
+@api.route('/api/reports/attendance.csv', methods=['GET'])
+@conditional(*ATTENDANCE_TABLES)
+def export_attendance_csv():
+    """Stream attendance records as CSV.
+
+    Accepts the same filters as /api/dashboard. Rows are encoded as they
+    are read, so memory use does not depend on the size of the export.
+    """
+    try:
+        filters = parse_attendance_filters(request.args)
+    except FilterError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return Response(stream_csv(iter_attendance_rows(filters)), mimetype='text/csv', headers={
+        'Content-Disposition': 'attachment; filename=attendance.csv'
+    })
+
+@api.route('/api/reports/attendance.ndjson', methods=['GET'])
+@conditional(*ATTENDANCE_TABLES)
+def export_attendance_ndjson():
+    """Stream attendance records as newline-delimited JSON."""
+    try:
+        filters = parse_attendance_filters(request.args)
+    except FilterError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return Response(stream_ndjson(iter_attendance_rows(filters)), mimetype='application/x-ndjson')
+
 # --- Admin API Endpoints ---
 
-@app.route('/api/admin/users', methods=['GET'])
+@api.route('/api/admin/users', methods=['GET'])
+@conditional('users', cache=True)
 def get_all_users():
     """Endpoint for admin to get all user data."""
     try:
-        conn = get_db_connection()
-        users = conn.execute('''
+        conn = get_db()
+        users = tuple_cursor(conn).execute('''
             SELECT id, username, full_name, email, contact_number, address, status, is_admin, created_at
             FROM users
             ORDER BY created_at DESC
         ''').fetchall()
-        conn.close()
-        
-        user_list = []
-        for user in users:
-            user_list.append({
-                'id': user['id'],
-                'username': user['username'],
-                'full_name': user['full_name'],
-                'email': user['email'],
-                'contact_number': user['contact_number'],
-                'address': user['address'],
-                'status': user['status'],
-                'is_admin': bool(user['is_admin']),
-                'created_at': user['created_at']
-            })
-        
-        return jsonify({'users': user_list}), 200
+
+        return json_list_response('users', users, USER_LAYOUT)
     
     except sqlite3.Error as e:
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/admin/users/<int:user_id>', methods=['PUT'])
+@api.route('/api/admin/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     """Endpoint for admin to update user information."""
     data = request.json
     
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Check if user exists
-        user = conn.execute('SELECT id FROM users WHERE id = ?', (user_id,)).fetchone()
-        if not user:
-            conn.close()
+        if not get_user_by_id(user_id):
             return jsonify({'success': False, 'message': 'User not found.'}), 404
         
         # Update user information
@@ -265,7 +477,8 @@ def update_user(user_id):
               data.get('address'), data.get('status'), user_id))
         
         conn.commit()
-        conn.close()
+        response_cache.invalidate('users')
+        user_directory.invalidate()
         
         return jsonify({'success': True, 'message': 'User updated successfully!'}), 200
     
@@ -273,14 +486,17 @@ def update_user(user_id):
         print(f"Update user error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/admin/clear_attendance', methods=['DELETE'])
+@api.route('/api/admin/clear_attendance', methods=['DELETE'])
 def clear_all_attendance():
     """Endpoint for admin to clear all attendance records."""
     try:
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute('DELETE FROM attendance_records')
+        clear_attendance_summary(conn)
+        archive_paths = drop_partitions(conn)
         conn.commit()
-        conn.close()
+        recent_keys.clear()
+        remove_archive_files(archive_paths)
         
         return jsonify({'success': True, 'message': 'All attendance records have been cleared.'}), 200
     
@@ -290,36 +506,20 @@ def clear_all_attendance():
 
 # --- Subject Management API Endpoints ---
 
-@app.route('/api/subjects', methods=['GET'])
+@api.route('/api/subjects', methods=['GET'])
+@conditional('subjects', cache=True)
 def get_subjects():
     """Endpoint to get all subjects."""
     try:
-        conn = get_db_connection()
-        
-        # Create subjects table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS subjects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                start_time TEXT,
-                end_time TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        subjects = conn.execute('SELECT * FROM subjects ORDER BY name').fetchall()
-        conn.commit()
-        conn.close()
+        conn = get_db()
+        subjects = conn.execute('SELECT id, name, description FROM subjects ORDER BY name').fetchall()
         
         subject_list = []
         for subject in subjects:
             subject_list.append({
                 'id': subject['id'],
                 'name': subject['name'],
-                'description': subject['description'],
-                'start_time': subject['start_time'] if 'start_time' in subject.keys() else None,
-                'end_time': subject['end_time'] if 'end_time' in subject.keys() else None
+                'description': subject['description']
             })
         
         return jsonify({'subjects': subject_list}), 200
@@ -328,7 +528,7 @@ def get_subjects():
         print(f"Subjects error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/subjects', methods=['POST'])
+@api.route('/api/subjects', methods=['POST'])
 def add_subject():
     """Endpoint for admin to add a new subject."""
     data = request.json
@@ -341,13 +541,13 @@ def add_subject():
         return jsonify({'success': False, 'message': 'Subject name is required.'}), 400
     
     try:
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute(
         'INSERT INTO subjects (name, description) VALUES (?, ?)', 
         (name, description)
         )
         conn.commit()
-        conn.close()
+        response_cache.invalidate('subjects')
         
         return jsonify({'success': True, 'message': 'Subject added successfully!'}), 201
     
@@ -359,7 +559,7 @@ def add_subject():
     
 # --- Profile API Endpoints ---
 
-@app.route('/api/profile/update', methods=['PUT'])
+@api.route('/api/profile/update', methods=['PUT'])
 def update_profile():
     """Endpoint to update user profile information."""
     data = request.json
@@ -375,59 +575,39 @@ def update_profile():
         return jsonify({'success': False, 'message': 'Username and full name are required.'}), 400
 
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Check if current user exists
-        current_user = conn.execute(
-            'SELECT * FROM users WHERE username = ?', (current_username,)
-        ).fetchone()
+        current_user = get_user_by_username(current_username)
         
         if not current_user:
-            conn.close()
             return jsonify({'success': False, 'message': 'User not found.'}), 404
         
         # Check if new username already exists (unless it's the same)
-        if new_username != current_username:
-            existing_user = conn.execute(
-                'SELECT id FROM users WHERE username = ?', (new_username,)
-            ).fetchone()
-            
-            if existing_user:
-                conn.close()
-                return jsonify({'success': False, 'message': 'Username already exists.'}), 409
+        if new_username != current_username and get_user_by_username(new_username):
+            return jsonify({'success': False, 'message': 'Username already exists.'}), 409
         
         # Update user information
-        try:
-            conn.execute('''
-                UPDATE users 
-                SET username = ?, full_name = ?, email = ?, contact_number = ?, address = ?, status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (new_username, full_name, email, contact, address, status, current_user['id']))
-        except sqlite3.Error:
-            conn.execute('''
-                UPDATE users 
-                SET username = ?, full_name = ?, email = ?, contact_number = ?, address = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (new_username, full_name, email, contact, address, current_user['id']))
-        
-        # Update attendance records with new name if full name changed
-        if full_name != current_user['full_name']:
-            conn.execute('''
-                UPDATE attendance_records 
-                SET full_name = ?
-                WHERE user_id = ?
-            ''', (full_name, current_user['id']))
+        conn.execute('''
+            UPDATE users 
+            SET username = ?, full_name = ?, email = ?, contact_number = ?, address = ?, status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (new_username, full_name, email, contact, address, status, current_user['id']))
         
         conn.commit()
-        conn.close()
+        response_cache.invalidate('users')
+        user_directory.invalidate()
         
         return jsonify({'success': True, 'message': 'Profile updated successfully!'}), 200
     
+    except sqlite3.IntegrityError:
+        return jsonify({'success': False, 'message': 'Username already exists.'}), 409
     except sqlite3.Error as e:
         print(f"Profile update error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/profile/<username>', methods=['GET'])
+@api.route('/api/profile/<username>', methods=['GET'])
+@conditional('users')
 def get_profile(username):
     """Endpoint to get user profile information."""
     user = get_user_by_username(username)
@@ -471,39 +651,28 @@ def get_profile(username):
 
 # --- Statistics API Endpoints ---
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
+@conditional('users', 'attendance_records')
 def get_statistics():
-    """Endpoint to get system statistics."""
+    """Endpoint to get system statistics.
+
+    Attendance numbers come from daily_attendance_summary and
+    attendance_counters, which are kept current on every insert, so the
+    cost does not grow with history.
+    """
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Get total users
         total_users = conn.execute('SELECT COUNT(*) as count FROM users').fetchone()['count']
         
         # Get total attendance records
-        total_attendance = conn.execute('SELECT COUNT(*) as count FROM attendance_records').fetchone()['count']
-        
-        # Get today's attendance
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_attendance = conn.execute(
-            'SELECT COUNT(*) as count FROM attendance_records WHERE DATE(timestamp) = ?', (today,)
-        ).fetchone()['count']
-        
-        # Get attendance by user status
-        status_stats = conn.execute('''
-            SELECT u.status, COUNT(*) as count 
-            FROM attendance_records ar
-            JOIN users u ON ar.user_id = u.id
-            WHERE DATE(ar.timestamp) = ? 
-            GROUP BY u.status
-        ''', (today,)).fetchall()
-        
-        conn.close()
-        
-        status_breakdown = {}
-        for stat in status_stats:
-            status_breakdown[stat['status']] = stat['count']
+        total = conn.execute("SELECT value FROM attendance_counters WHERE name = 'total'").fetchone()
+        total_attendance = total['value'] if total else 0
         
+        # Get today's attendance by user status (status at check-in time)
+        today_attendance, status_breakdown = today_counts(conn)
+
         return jsonify({
             'total_users': total_users,
             'total_attendance': total_attendance,
@@ -514,18 +683,20 @@ def get_statistics():
     except sqlite3.Error as e:
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/subjects/<int:subject_id>', methods=['DELETE'])
+@api.route('/api/subjects/<int:subject_id>', methods=['DELETE'])
 def delete_subject(subject_id):
     """Endpoint for admin to delete a subject."""
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Check if subject exists
         subject = conn.execute('SELECT id FROM subjects WHERE id = ?', (subject_id,)).fetchone()
         if not subject:
-            conn.close()
             return jsonify({'success': False, 'message': 'Subject not found.'}), 404
         
+        # Check-ins keep showing the subject by its last label
+        freeze_subject_labels(conn, 'subject_id', subject_id)
+        
         # Delete the subject
         conn.execute('DELETE FROM subjects WHERE id = ?', (subject_id,))
         # Also remove from user_subjects if the table exists
@@ -535,7 +706,7 @@ def delete_subject(subject_id):
             pass  # Table might not exist yet
         
         conn.commit()
-        conn.close()
+        response_cache.invalidate('subjects', 'user_subjects')
         
         return jsonify({'success': True, 'message': 'Subject deleted successfully!'}), 200
     
@@ -543,24 +714,12 @@ def delete_subject(subject_id):
         print(f"Delete subject error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/admin/users/<int:user_id>/subjects', methods=['GET'])
+@api.route('/api/admin/users/<int:user_id>/subjects', methods=['GET'])
+@conditional('subjects', 'user_subjects', cache=True)
 def get_user_subjects(user_id):
     """Get subjects assigned to a specific user."""
     try:
-        conn = get_db_connection()
-        
-        # Create user_subjects table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS user_subjects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                subject_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (subject_id) REFERENCES subjects (id),
-                UNIQUE(user_id, subject_id)
-            )
-        ''')
+        conn = get_db()
         
         # Get user's assigned subjects
         user_subjects = conn.execute('''
@@ -571,7 +730,6 @@ def get_user_subjects(user_id):
             ORDER BY s.name
         ''', (user_id,)).fetchall()
         
-        conn.close()
         
         subject_list = []
         for subject in user_subjects:
@@ -586,94 +744,132 @@ def get_user_subjects(user_id):
         print(f"Get user subjects error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/admin/users/<int:user_id>/subjects', methods=['PUT'])
+@api.route('/api/admin/users/<int:user_id>/subjects', methods=['PUT'])
 def update_user_subjects(user_id):
-    """Update subjects assigned to a specific user."""
-    data = request.json
-    subject_ids = data.get('subject_ids', [])
+    """Update subjects assigned to a specific user.
+
+    subject_ids is the complete new list; only the subjects added or
+    removed are written.
+    """
+    data = request.json or {}
+    subject_ids = subject_id_set(data.get('subject_ids', []))
+    if subject_ids is None:
+        return jsonify({'success': False, 'message': 'subject_ids must be a list of integers.'}), 400
     
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
-        # Create user_subjects table if it doesn't exist
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS user_subjects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                subject_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (subject_id) REFERENCES subjects (id),
-                UNIQUE(user_id, subject_id)
-            )
-        ''')
-        
-        # Remove all existing subject assignments for this user
-        conn.execute('DELETE FROM user_subjects WHERE user_id = ?', (user_id,))
-        
-        # Add new subject assignments
-        for subject_id in subject_ids:
-            try:
-                conn.execute('''
-                    INSERT INTO user_subjects (user_id, subject_id)
-                    VALUES (?, ?)
-                ''', (user_id, subject_id))
-            except sqlite3.IntegrityError:
-                # Subject assignment already exists, skip
-                pass
+        if not get_user_by_id(user_id):
+            return jsonify({'success': False, 'message': 'User not found.'}), 404
         
-        conn.commit()
-        conn.close()
+        unknown = unknown_subject_ids(conn, subject_ids)
+        if unknown:
+            return jsonify({'success': False, 'message': f'Unknown subject ids: {unknown}'}), 400
+        
+        added, removed = set_user_subjects(conn, {user_id: subject_ids})
+        if added or removed:
+            conn.commit()
+            response_cache.invalidate('user_subjects')
         
-        return jsonify({'success': True, 'message': 'User subjects updated successfully!'}), 200
+        return jsonify({
+            'success': True,
+            'message': 'User subjects updated successfully!',
+            'added': added,
+            'removed': removed
+        }), 200
     
     except sqlite3.Error as e:
         print(f"Update user subjects error: {e}")
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
-@app.route('/api/users/<int:user_id>/subjects', methods=['GET'])
+@api.route('/api/admin/users/subjects', methods=['PUT'])
+def update_many_user_subjects():
+    """Update the subjects of many users at once (e.g. at the start of a term).
+
+    Accepts {"assignments": [{"user_id": 1, "subject_ids": [2, 3]}, ...]};
+    each subject_ids is that user's complete new list. Users not listed
+    are left alone. Everything is written in one transaction, or nothing
+    if any entry is invalid.
+    """
+    data = request.json
+    items = data.get('assignments') if isinstance(data, dict) else None
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'A non-empty assignments array is required.'}), 400
+    
+    if len(items) > MAX_BULK_ASSIGNMENTS:
+        return jsonify({'success': False, 'message': f'At most {MAX_BULK_ASSIGNMENTS} users per request.'}), 413
+    
+    assignments = {}
+    for index, item in enumerate(items):
+        user_id = item.get('user_id') if isinstance(item, dict) else None
+        subject_ids = subject_id_set(item.get('subject_ids')) if isinstance(item, dict) else None
+        if not isinstance(user_id, int) or isinstance(user_id, bool) or subject_ids is None:
+            return jsonify({
+                'success': False,
+                'message': f'Entry {index}: user_id must be an integer and subject_ids a list of integers.'
+            }), 400
+        if user_id in assignments:
+            return jsonify({'success': False, 'message': f'Entry {index}: user {user_id} is listed twice.'}), 400
+        assignments[user_id] = subject_ids
+    
+    try:
+        conn = get_db()
+        
+        users = user_directory.snapshot(conn).by_id
+        if not assignments.keys() <= users.keys():
+            users = user_directory.snapshot(conn, recheck=True).by_id
+        unknown_users = sorted(assignments.keys() - users.keys())
+        if unknown_users:
+            return jsonify({'success': False, 'message': f'Unknown user ids: {unknown_users}'}), 400
+        
+        unknown = unknown_subject_ids(conn, set().union(*assignments.values()))
+        if unknown:
+            return jsonify({'success': False, 'message': f'Unknown subject ids: {unknown}'}), 400
+        
+        added, removed = set_user_subjects(conn, assignments)
+        if added or removed:
+            conn.commit()
+            response_cache.invalidate('user_subjects')
+        
+        return jsonify({
+            'success': True,
+            'message': f'Subjects of {len(assignments)} users updated: {added} assigned, {removed} removed.',
+            'added': added,
+            'removed': removed
+        }), 200
+    
+    except sqlite3.Error as e:
+        print(f"Bulk update user subjects error: {e}")
+        return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
+
+@api.route('/api/users/<int:user_id>/subjects', methods=['GET'])
+@conditional('subjects', 'user_subjects', cache=True)
 def get_user_available_subjects(user_id):
     """Get subjects available to a specific user for attendance."""
     try:
-        conn = get_db_connection()
-        
-        # Check if user_subjects table exists
-        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_subjects'").fetchone()
-        
-        if tables:
-            # If user has assigned subjects, return only those
-            user_subjects = conn.execute('''
-                SELECT s.id, s.name, s.description, s.start_time, s.end_time
-                FROM subjects s
-                JOIN user_subjects us ON s.id = us.subject_id
-                WHERE us.user_id = ?
-                ORDER BY s.name
-            ''', (user_id,)).fetchall()
-            
-            if user_subjects:
-                subject_list = []
-                for subject in user_subjects:
-                    subject_list.append({
-                        'id': subject['id'],
-                        'name': subject['name'],
-                        'description': subject['description'],
-                        'start_time': subject['start_time'] if 'start_time' in subject.keys() else None,
-                        'end_time': subject['end_time'] if 'end_time' in subject.keys() else None
-                    })
-                conn.close()
-                return jsonify({'subjects': subject_list}), 200
+        conn = get_db()
+        
+        # If user has assigned subjects, return only those
+        subjects = conn.execute('''
+            SELECT s.id, s.name, s.description
+            FROM subjects s
+            JOIN user_subjects us ON s.id = us.subject_id
+            WHERE us.user_id = ?
+            ORDER BY s.name
+        ''', (user_id,)).fetchall()
         
         # If no specific assignments, return all subjects
-        all_subjects = conn.execute('SELECT * FROM subjects ORDER BY name').fetchall()
-        conn.close()
+        if not subjects:
+            subjects = conn.execute('SELECT id, name, description FROM subjects ORDER BY name').fetchall()
         
         subject_list = []
-        for subject in all_subjects:  # ✅ FIXED
+        for subject in subjects:  # ✅ FIXED
             subject_list.append({
-            'id': subject['id'],
-            'name': subject['name'],
-            'description': subject['description']
-        })
+                'id': subject['id'],
+                'name': subject['name'],
+                'description': subject['description']
+            })
         
         return jsonify({'subjects': subject_list}), 200
     
@@ -682,26 +878,39 @@ def get_user_available_subjects(user_id):
         return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
 
 # Health check endpoint
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
     return jsonify({'status': 'healthy', 'message': 'EduWatch API is running'}), 200
 
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request and SQL metrics in Prometheus text format (EDUWATCH_METRICS=1)."""
+    if not metrics.ENABLED:
+        return jsonify({'success': False, 'message': 'Metrics are disabled. Set EDUWATCH_METRICS=1.'}), 404
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/admin/cache', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters for the response cache."""
+    return jsonify(response_cache.stats()), 200
+
 # Error handlers
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({'success': False, 'message': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'success': False, 'message': 'Internal server error'}), 500
 # --- Schedule Management Endpoints ---
 
-@app.route('/api/admin/users/<int:user_id>/schedules', methods=['GET'])
+@api.route('/api/admin/users/<int:user_id>/schedules', methods=['GET'])
+@conditional('schedules', 'subjects', cache=True)
 def get_user_schedules(user_id):
     """Get all schedules for a specific user."""
     try:
-        conn = get_db_connection()
+        conn = get_db()
         schedules = conn.execute('''
             SELECT 
                 s.id, s.user_id, s.subject_id, s.day_of_week, s.start_time, s.end_time,
@@ -715,7 +924,6 @@ def get_user_schedules(user_id):
                     WHEN 'Thursday' THEN 4 WHEN 'Friday' THEN 5 WHEN 'Saturday' THEN 6
                     ELSE 7 END, s.start_time
         ''', (user_id,)).fetchall()
-        conn.close()
         
         schedule_list = [{
             'id': s['id'], 'user_id': s['user_id'], 'subject_id': s['subject_id'],
@@ -727,7 +935,7 @@ def get_user_schedules(user_id):
     except sqlite3.Error as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/admin/users/<int:user_id>/schedules', methods=['POST'])
+@api.route('/api/admin/users/<int:user_id>/schedules', methods=['POST'])
 def add_user_schedule(user_id):
     """Add a schedule entry for a user."""
     data = request.json
@@ -737,18 +945,16 @@ def add_user_schedule(user_id):
         return jsonify({'success': False, 'message': 'Missing required fields'}), 400
     
     try:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Check if user exists
         user = conn.execute('SELECT id FROM users WHERE id = ?', (user_id,)).fetchone()
         if not user:
-            conn.close()
             return jsonify({'success': False, 'message': 'User not found'}), 404
         
         # Check if subject exists
         subject = conn.execute('SELECT id FROM subjects WHERE id = ?', (data['subject_id'],)).fetchone()
         if not subject:
-            conn.close()
             return jsonify({'success': False, 'message': 'Subject not found'}), 404
         
         # Insert schedule
@@ -758,7 +964,8 @@ def add_user_schedule(user_id):
         ''', (user_id, data['subject_id'], data['day_of_week'], data['start_time'], data['end_time']))
         
         conn.commit()
-        conn.close()
+        response_cache.invalidate('schedules')
+        schedule_index.invalidate()
         
         return jsonify({'success': True, 'message': 'Schedule added successfully!'}), 201
         
@@ -769,25 +976,29 @@ def add_user_schedule(user_id):
         print(f"Database error: {e}")
         return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
 
-@app.route('/api/admin/schedules/<int:schedule_id>', methods=['DELETE'])
+@api.route('/api/admin/schedules/<int:schedule_id>', methods=['DELETE'])
 def delete_schedule(schedule_id):
     """Delete a schedule entry."""
     try:
-        conn = get_db_connection()
+        conn = get_db()
+        freeze_subject_labels(conn, 'schedule_id', schedule_id)
         conn.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,))
         conn.commit()
-        conn.close()
+        response_cache.invalidate('schedules')
+        schedule_index.invalidate()
         return jsonify({'success': True}), 200
     except sqlite3.Error as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/admin/schedules', methods=['GET'])
+@api.route('/api/admin/schedules', methods=['GET'])
+@conditional('schedules', 'users', 'subjects', cache=True)
 def get_all_schedules():
     """Get all schedules with user information."""
     try:
-        conn = get_db_connection()
-        schedules = conn.execute('''
-            SELECT s.*, u.full_name as user_name, u.status as user_status, sub.name as subject_name
+        conn = get_db()
+        schedules = tuple_cursor(conn).execute('''
+            SELECT s.id, s.user_id, u.full_name as user_name, u.status as user_status, s.subject_id,
+                   sub.name as subject_name, s.day_of_week, s.start_time, s.end_time
             FROM schedules s
             JOIN users u ON s.user_id = u.id
             JOIN subjects sub ON s.subject_id = sub.id
@@ -796,23 +1007,120 @@ def get_all_schedules():
                 WHEN 'Thursday' THEN 4 WHEN 'Friday' THEN 5 WHEN 'Saturday' THEN 6
                 ELSE 7 END, s.start_time
         ''').fetchall()
-        conn.close()
-        
-        schedule_list = [{
-            'id': s['id'], 'user_id': s['user_id'], 'user_name': s['user_name'],
-            'user_status': s['user_status'], 'subject_id': s['subject_id'],
-            'subject_name': s['subject_name'], 'day_of_week': s['day_of_week'],
-            'start_time': s['start_time'], 'end_time': s['end_time']
-        } for s in schedules]
-        
-        return jsonify({'schedules': schedule_list}), 200
+
+        return json_list_response('schedules', schedules, SCHEDULE_LAYOUT)
     except sqlite3.Error as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+
+@api.route('/api/admin/absences', methods=['GET'])
+@conditional('absences', 'absence_days', 'users', 'subjects')
+def get_absences():
+    """Classes missed on closed days, as found by the absence job (see absences.py).
+
+    Accepts start_date, end_date and user_id like /api/dashboard; the
+    default is the last ABSENCE_DEFAULT_DAYS days. detected_through is
+    the last day the job has processed.
+    """
+    try:
+        filters = parse_attendance_filters(request.args)
+        end_day = filters.get('end_date', date.today())
+        start_day = filters.get('start_date', end_day - timedelta(days=ABSENCE_DEFAULT_DAYS))
+        if start_day > end_day:
+            raise FilterError('start_date must not be after end_date.')
+
+        where = 'a.day BETWEEN ? AND ?'
+        params = [start_day.isoformat(), end_day.isoformat()]
+        if 'user_id' in filters:
+            where += ' AND a.user_id = ?'
+            params.append(filters['user_id'])
+
+        conn = get_db()
+        absences = tuple_cursor(conn).execute(f'''
+            SELECT a.day, a.schedule_id, a.user_id, u.full_name as user_name, a.subject_id,
+                   sub.name as subject_name, a.start_time, a.end_time
+            FROM absences a
+            LEFT JOIN users u ON a.user_id = u.id
+            LEFT JOIN subjects sub ON a.subject_id = sub.id
+            WHERE {where}
+            ORDER BY a.day, a.start_time, a.schedule_id
+        ''', params).fetchall()
+        detected_through = conn.execute('SELECT MAX(day) FROM absence_days').fetchone()[0]
+
+        return json_list_response('absences', absences, ABSENCE_LAYOUT, {'detected_through': detected_through})
+    except FilterError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except sqlite3.Error as e:
+        print(f"Absences error: {e}")
+        return jsonify({'success': False, 'message': 'Database error occurred.'}), 500
+
+@api.route('/api/admin/import/<kind>', methods=['POST'])
+def import_records(kind):
+    """Bulk import users, subjects or schedules from CSV (see importer.py).
+
+    The CSV is the request body (Content-Type: text/csv) or a multipart
+    upload named "file". With ?dry_run=1 rows are only validated.
+    Passwords are hashed on the shared hashing pool, and at most
+    MAX_IMPORT_USERS users are accepted per upload.
+    """
+    if kind not in IMPORTERS:
+        return jsonify({'success': False, 'message': f'Unknown import kind: {kind}'}), 404
+
+    upload = request.files.get('file')
+    lines = codecs.iterdecode(upload.stream if upload else request.stream, 'utf-8-sig')
+    dry_run = request.args.get('dry_run') in ('1', 'true', 'yes')
+
+    try:
+        conn = get_db()
+        report = import_csv(conn, kind, lines, dry_run, max_users=MAX_IMPORT_USERS)
+        if not dry_run:
+            conn.commit()
+            response_cache.invalidate(kind)  # Each kind fills the table of the same name
+            if kind == 'users':
+                user_directory.invalidate()
+            elif kind == 'schedules':
+                schedule_index.invalidate()
+    except ImportTooLarge as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except PasswordBusy:
+        return jsonify({'success': False, 'message': 'Server is busy. Please try again.'}), 503
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'success': False, 'message': f'Invalid CSV: {e}'}), 400
+    except sqlite3.IntegrityError as e:
+        print(f"Import conflict: {e}")
+        return jsonify({'success': False, 'message': 'Rows conflict with existing data; nothing was imported.'}), 409
+    except sqlite3.Error as e:
+        print(f"Import error: {e}")
+        return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
+
+    verb = 'would be imported' if dry_run else 'imported'
+    return jsonify({
+        'success': True,
+        'message': f"{report['imported']} of {report['total']} {kind} {verb}.",
+        **report
+    }), 200
    
-# Run the Flask app
+def create_app():
+    """Build the Flask application.
+
+    Fails if the database has not been migrated (see
+    database.check_schema_version); it never changes the schema.
+    """
+    check_schema_version()
+    app = Flask(__name__)
+
+    # Enable CORS for all routes, allowing your frontend to connect
+    CORS(app)
+
+    if metrics.TIMED:
+        metrics.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+# Run the Flask development server (see wsgi.py for production)
 if __name__ == '__main__':
+    init_database()
     print("Starting EduWatch Server...")
-    print("Database: eduwatch.db")
+    print(f"Database: {DATABASE_NAME}")
     print("Server: http://127.0.0.1:5000")
     print("Health check: http://127.0.0.1:5000/api/health")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
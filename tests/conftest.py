@@ -0,0 +1,33 @@
+import pytest
+
+import database
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The API on a freshly initialized scratch database, shared by all tests."""
+    database.DATABASE_NAME = str(tmp_path_factory.mktemp('db') / 'eduwatch.db')
+    import server
+    database.init_database()
+    yield server.create_app()
+    database.pool.close_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Register a user with the given full name and return their id."""
+    def register(full_name):
+        username = full_name.lower().replace(' ', '.')
+        response = client.post('/api/register', json={
+            'username': username, 'password': 'secret', 'fullName': full_name,
+            'email': f'{username}@example.com', 'contact': '123', 'address': 'Somewhere', 'status': 'Full Time',
+        })
+        assert response.status_code == 201, response.json
+        users = client.get('/api/admin/users').json['users']
+        return next(user['id'] for user in users if user['username'] == username)
+    return register
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+import database
+from analytics import LATE, ON_TIME, UNSCHEDULED, classify_arrival
+
+MONDAY_CLASS = {'day_of_week': 'Monday', 'start_minutes': 8 * 60, 'end_minutes': 10 * 60}
+
+
+def utc(*local):
+    """The stored timestamp of a check-in at a local date and time."""
+    return datetime(*local).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def test_arrival_boundaries():
+    # 2024-06-03 is a Monday
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 6, 0)) == (ON_TIME, -120)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 5, 59)) == (UNSCHEDULED, None)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 8, 5)) == (ON_TIME, 5)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 8, 6)) == (LATE, 6)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 10, 0)) == (LATE, 120)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 3, 10, 1)) == (UNSCHEDULED, None)
+    assert classify_arrival(MONDAY_CLASS, datetime(2024, 6, 4, 8, 0)) == (UNSCHEDULED, None)
+    assert classify_arrival(None, datetime(2024, 6, 3, 8, 0)) == (UNSCHEDULED, None)
+
+
+def add_monday_class(client, user_id):
+    """Give the user Web Development on Mondays 08:00-10:00; return the schedule id."""
+    subjects = client.get('/api/subjects').json['subjects']
+    subject_id = next(subject['id'] for subject in subjects if subject['name'] == 'Web Development')
+    response = client.post(f'/api/admin/users/{user_id}/schedules', json={
+        'subject_id': subject_id, 'day_of_week': 'Monday', 'start_time': '08:00', 'end_time': '10:00'})
+    assert response.status_code == 201
+    schedules = client.get(f'/api/admin/users/{user_id}/schedules').json['schedules']
+    return schedules[0]['id']
+
+
+def test_analytics_counts_on_time_late_and_unscheduled(client, register):
+    user_id = register('Arrival Tester')
+    add_monday_class(client, user_id)
+
+    # One check-in per Monday: a class is attended once a day
+    check_ins = [utc(2024, 6, 3, 7, 45), utc(2024, 6, 10, 8, 20), utc(2024, 6, 17, 11, 0)]
+    client.post('/api/attendance/bulk', json=[{'full_name': 'Arrival Tester', 'timestamp': timestamp}
+                                              for timestamp in check_ins])
+
+    analytics = client.get('/api/analytics', query_string={
+        'user_id': user_id, 'start_date': '2024-06-01', 'end_date': '2024-06-30', 'details': 1}).json
+    employee, = analytics['employees']
+    assert (employee['total'], employee['on_time'], employee['late'], employee['unscheduled']) == (3, 2, 1, 1)
+    assert employee['avg_minutes_late'] == 20
+    late, = [record for record in analytics['records'] if record['attendance_status'] == 'Late']
+    assert late['date'] == '2024-06-10' and late['minutes_late'] == 20
+    assert late['subject'].startswith('Web Development - Monday')
+
+
+def test_check_ins_are_matched_to_their_class_when_written(client, register):
+    user_id = register('Class Matcher')
+    schedule_id = add_monday_class(client, user_id)
+    client.post('/api/attendance/bulk', json=[
+        # The dashboard names the class it checked in for
+        {'full_name': 'Class Matcher', 'schedule_id': schedule_id, 'timestamp': utc(2024, 6, 3, 8, 10)},
+        # Other clients send its label
+        {'full_name': 'Class Matcher', 'subject': 'Web Development - Monday (8:00 AM - 10:00 AM)',
+         'timestamp': utc(2024, 6, 10, 7, 58)},
+        # With no class named, the one on the schedule at check-in time
+        {'full_name': 'Class Matcher', 'timestamp': utc(2024, 6, 17, 9, 0)},
+        # Not on the schedule that day
+        {'full_name': 'Class Matcher', 'subject': 'Web Development', 'timestamp': utc(2024, 6, 18, 8, 0)},
+    ])
+
+    conn = database.get_db_connection()
+    try:
+        rows = [tuple(row) for row in conn.execute('''
+            SELECT schedule_id, arrival, minutes_late FROM attendance_records WHERE user_id = ? ORDER BY timestamp
+        ''', (user_id,))]
+    finally:
+        conn.close()
+    assert rows == [(schedule_id, LATE, 10), (schedule_id, ON_TIME, -2), (schedule_id, LATE, 60),
+                    (None, UNSCHEDULED, None)]
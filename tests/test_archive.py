@@ -0,0 +1,52 @@
+import csv
+import io
+import os
+
+import archive
+import database
+
+ARCHIVED = ['2023-01-10T10:00:00.000Z', '2023-01-20T10:00:00.000Z']
+HOT = ['2023-02-05T10:00:00.000Z']
+
+
+def hot_timestamps(user_id):
+    conn = database.get_db_connection()
+    try:
+        return [row[0] for row in conn.execute(
+            'SELECT timestamp FROM attendance_records WHERE user_id = ? ORDER BY timestamp', (user_id,))]
+    finally:
+        conn.close()
+
+
+def test_archived_month_is_still_queried(client, register):
+    user_id = register('Archive Reader')
+    client.post('/api/attendance/bulk', json=[{'full_name': 'Archive Reader', 'subject': 'Web Development',
+                                               'timestamp': timestamp} for timestamp in ARCHIVED + HOT])
+    stats = client.get('/api/stats').json
+
+    conn = database.get_db_connection()
+    try:
+        assert archive.archive_month(conn, 2023, 1) == 2
+        assert archive.archive_month(conn, 2023, 1) == 0  # Nothing left to move
+        path, = [row[0] for row in conn.execute("SELECT path FROM attendance_partitions WHERE name = '2023_01'")]
+        assert os.path.exists(os.path.join(archive.database_dir(conn), path))
+    finally:
+        conn.close()
+
+    assert hot_timestamps(user_id) == HOT
+    # Pages walk from the hot table into the archive
+    first = client.get('/api/dashboard', query_string={'user_id': user_id, 'limit': 2}).json
+    rest = client.get('/api/dashboard', query_string={'user_id': user_id, 'limit': 2,
+                                                      'cursor': first['next_cursor']}).json
+    assert [r['timestamp'] for r in first['attendance'] + rest['attendance']] == list(reversed(ARCHIVED + HOT))
+    assert rest['next_cursor'] is None
+
+    january = client.get('/api/dashboard', query_string={
+        'user_id': user_id, 'start_date': '2023-01-01', 'end_date': '2023-01-31'}).json['attendance']
+    assert sorted(r['timestamp'] for r in january) == ARCHIVED
+
+    export = client.get('/api/reports/attendance.csv', query_string={'user_id': user_id}).get_data(as_text=True)
+    header, *rows = csv.reader(io.StringIO(export))
+    assert [row[header.index('timestamp')] for row in rows] == ARCHIVED + HOT
+    # The check-ins still exist, so the counters do not change
+    assert client.get('/api/stats').json['total_attendance'] == stats['total_attendance']
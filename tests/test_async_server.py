@@ -0,0 +1,59 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from async_server import create_async_app
+
+
+def run(app, scenario):
+    """Run scenario(client) against the aiohttp variant of app."""
+    async def main():
+        async with TestClient(TestServer(create_async_app(app))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_concurrent_check_ins_are_all_written(app, client, register):
+    user_id = register('Async Burst')
+    timestamps = [f'2024-08-01T08:{minute:02d}:00.000Z' for minute in range(20)]
+
+    async def scenario(http):
+        responses = await asyncio.gather(*[
+            http.post('/api/attendance', json={'full_name': 'Async Burst', 'timestamp': timestamp})
+            for timestamp in timestamps
+        ], http.post('/api/attendance', json={'full_name': 'Async Burst', 'timestamp': None}))
+        return [response.status for response in responses]
+
+    statuses = run(app, scenario)
+
+    assert statuses == [201] * len(timestamps) + [400]
+    records = client.get('/api/dashboard', query_string={'user_id': user_id, 'limit': 100}).json['attendance']
+    assert sorted(record['timestamp'] for record in records) == timestamps
+
+
+def test_native_routes_answer_like_flask(app, client, register):
+    register('Async Login')
+    flask_etag = client.get('/api/dashboard').headers['ETag']
+
+    async def scenario(http):
+        login = await http.post('/api/login', json={'username': 'async.login', 'password': 'secret'})
+        refused = await http.post('/api/login', json={'username': 'async.login', 'password': 'wrong'})
+        dashboard = await http.get('/api/dashboard')
+        unchanged = await http.get('/api/dashboard', headers={'If-None-Match': dashboard.headers['ETag']})
+        return (login.status, (await login.json())['user']['username'], refused.status,
+                dashboard.headers['ETag'], unchanged.status)
+
+    assert run(app, scenario) == (200, 'async.login', 401, flask_etag, 304)
+
+
+def test_other_routes_go_through_the_flask_app(app, client):
+    async def scenario(http):
+        added = await http.post('/api/subjects', json={'name': 'Async Fallback'})
+        subjects = await http.get('/api/subjects')
+        return added.status, await subjects.json()
+
+    status, subjects = run(app, scenario)
+
+    assert status == 201
+    assert subjects == client.get('/api/subjects').json
+    assert 'Async Fallback' in {subject['name'] for subject in subjects['subjects']}
@@ -0,0 +1,114 @@
+def dashboard(client, **args):
+    response = client.get('/api/dashboard', query_string=args)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def check_in(full_name, timestamp, key=None):
+    return {'full_name': full_name, 'subject': 'Web Development', 'timestamp': timestamp, 'idempotency_key': key}
+
+
+def test_keyset_pages_cover_every_record_once(client, register):
+    user_id = register('Page Walker')
+    # Two check-ins share a timestamp, so the id has to break the tie
+    timestamps = ['2024-03-04T08:00:00.000Z', '2024-03-04T09:00:00.000Z', '2024-03-04T09:00:00.000Z',
+                  '2024-03-05T08:00:00.000Z', '2024-03-06T08:00:00.000Z', '2024-03-07T08:00:00.000Z',
+                  '2024-03-08T08:00:00.000Z']
+    response = client.post('/api/attendance/bulk', json=[check_in('Page Walker', t) for t in timestamps])
+    assert response.status_code == 200
+    everything = dashboard(client, user_id=user_id, limit=100)
+    assert len(everything['attendance']) == len(timestamps)
+    assert everything['next_cursor'] is None
+
+    pages = []
+    cursor = None
+    while True:
+        args = {'user_id': user_id, 'limit': 3}
+        if cursor:
+            args['cursor'] = cursor
+        page = dashboard(client, **args)
+        pages.append(page['attendance'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [record['id'] for page in pages for record in page] == [r['id'] for r in everything['attendance']]
+
+
+def test_page_exactly_full_has_no_next_cursor(client, register):
+    user_id = register('Exact Fit')
+    timestamps = [f'2024-04-0{day}T08:00:00.000Z' for day in (1, 2, 3)]
+    client.post('/api/attendance/bulk', json=[check_in('Exact Fit', t) for t in timestamps])
+
+    first = dashboard(client, user_id=user_id, limit=2)
+    assert len(first['attendance']) == 2 and first['next_cursor']
+    last = dashboard(client, user_id=user_id, limit=2, cursor=first['next_cursor'])
+    assert len(last['attendance']) == 1 and last['next_cursor'] is None
+    assert dashboard(client, user_id=user_id, limit=3)['next_cursor'] is None
+
+
+def test_bad_page_arguments_are_rejected(client):
+    assert client.get('/api/dashboard?limit=0').status_code == 400
+    assert client.get('/api/dashboard?limit=ten').status_code == 400
+    assert client.get('/api/dashboard?cursor=not-a-cursor').status_code == 400
+
+
+def test_retried_check_in_is_stored_once(client, register):
+    user_id = register('Retry Sender')
+    payload = check_in('Retry Sender', '2024-05-06T08:00:00.000Z', key='retry-1')
+
+    first = client.post('/api/attendance', json=payload)
+    retry = client.post('/api/attendance', json=payload)
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.json['success'] is True
+    assert len(dashboard(client, user_id=user_id)['attendance']) == 1
+
+
+def test_bulk_retry_within_one_request_is_stored_once(client, register):
+    user_id = register('Bulk Retry')
+    payload = check_in('Bulk Retry', '2024-05-07T08:00:00.000Z', key='retry-2')
+
+    results = client.post('/api/attendance/bulk', json=[payload, payload]).json['results']
+
+    assert [result['code'] for result in results] == [201, 200]
+    assert len(dashboard(client, user_id=user_id)['attendance']) == 1
+
+
+def test_bulk_bad_check_in_fails_alone(client, register):
+    user_id = register('Bulk Mixed')
+    good = check_in('Bulk Mixed', '2024-05-08T08:00:00.000Z')
+    bad_name = dict(good, full_name=['x'])
+    bad_status = dict(good, status=None)
+    bad_subject = dict(good, subject={'name': 'Web Development'})
+
+    response = client.post('/api/attendance/bulk', json=[good, bad_name, bad_status, bad_subject])
+
+    assert response.status_code == 200
+    assert [result['code'] for result in response.json['results']] == [201, 400, 400, 400]
+    assert len(dashboard(client, user_id=user_id)['attendance']) == 1
+
+
+def test_bad_single_check_in_is_rejected(client):
+    payload = check_in('Nobody', '2024-05-08T08:00:00.000Z')
+    for field, value in [('status', None), ('status', ''), ('timestamp', ['x']), ('full_name', 7),
+                         ('department', 3)]:
+        response = client.post('/api/attendance', json=dict(payload, **{field: value}))
+        assert response.status_code == 400, (field, value)
+
+
+def test_check_in_rejected_by_the_database_fails_only_its_own_future(app, client, register):
+    from ingest import AttendanceWriter
+
+    user_id = register('Batch Neighbour')
+    writer = AttendanceWriter(window=0.5)
+    good = dict(check_in('Batch Neighbour', '2024-05-09T08:00:00.000Z'), status='Present', schedule_id=None)
+    # Skips validate_check_in, as a check-in the database rejects would
+    bad = dict(good, status=None, timestamp='2024-05-09T09:00:00.000Z')
+
+    futures = [writer.submit(good), writer.submit(bad)]
+
+    assert [future.result(timeout=5)['code'] for future in futures] == [201, 500]
+    assert len(dashboard(client, user_id=user_id)['attendance']) == 1
@@ -0,0 +1,58 @@
+import cache
+import database
+from cache import ResponseCache
+
+
+def subject_names(client):
+    response = client.get('/api/subjects')
+    assert response.status_code == 200
+    return {subject['name'] for subject in response.json['subjects']}
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    responses = ResponseCache(max_entries=2, ttl=10)
+
+    responses.set('a', ['users'], b'A')
+    responses.set('b', ['subjects'], b'B')
+    assert responses.get('a') == b'A'
+    responses.set('c', ['subjects'], b'C')  # Evicts b, the least recently used
+    assert responses.get('b') is None
+
+    now[0] += 11
+    assert responses.get('a') is None
+
+
+def test_invalidate_drops_entries_built_from_a_table():
+    responses = ResponseCache()
+    responses.set('users', ['users'], b'U')
+    responses.set('both', ['users', 'subjects'], b'US')
+    responses.set('subjects', ['subjects'], b'S')
+
+    responses.invalidate('subjects')
+
+    assert responses.get('users') == b'U'
+    assert responses.get('both') is None and responses.get('subjects') is None
+
+
+def test_repeat_reads_are_served_from_the_cache(client):
+    subject_names(client)
+    hits = client.get('/api/admin/cache').json['hits']
+    subject_names(client)
+    assert client.get('/api/admin/cache').json['hits'] == hits + 1
+
+
+def test_writes_are_visible_on_the_next_read(client):
+    subject_names(client)
+    assert client.post('/api/subjects', json={'name': 'Cached Algebra'}).status_code == 201
+    assert 'Cached Algebra' in subject_names(client)
+
+    # A write from another worker process skips this one's invalidate()
+    conn = database.get_db_connection()
+    try:
+        conn.execute("INSERT INTO subjects (name, description) VALUES ('Cached Geometry', '')")
+        conn.commit()
+    finally:
+        conn.close()
+    assert 'Cached Geometry' in subject_names(client)
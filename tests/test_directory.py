@@ -0,0 +1,60 @@
+import pytest
+
+import database
+from directory import UserDirectory
+
+
+@pytest.fixture
+def conn(app):
+    conn = database.get_db_connection()
+    yield conn
+    conn.close()
+
+
+def add_user(conn, username, full_name):
+    conn.execute('''
+        INSERT INTO users (username, password, full_name, email, contact_number, address, status)
+        VALUES (?, 'x', ?, ?, '1', 'Here', 'Full Time')
+    ''', (username, full_name, f'{username}@example.com'))
+    conn.commit()
+
+
+def test_lookups_are_served_from_memory(conn):
+    add_user(conn, 'dir.memory', 'Directory Memory')
+    directory = UserDirectory(check_interval=3600)
+
+    user = directory.by_username(conn, 'dir.memory')
+
+    assert directory.by_id(conn, user['id']) is user
+    assert directory.by_full_name(conn, 'Directory Memory') is user
+    assert directory.reloads == 1
+
+
+def test_changes_are_seen_after_invalidate(conn):
+    add_user(conn, 'dir.rename', 'Before Rename')
+    directory = UserDirectory(check_interval=3600)
+    user_id = directory.by_username(conn, 'dir.rename')['id']
+
+    conn.execute("UPDATE users SET full_name = 'After Rename' WHERE id = ?", (user_id,))
+    conn.commit()
+    assert directory.by_id(conn, user_id)['full_name'] == 'Before Rename'  # Not checked yet
+
+    directory.invalidate()
+    assert directory.by_id(conn, user_id)['full_name'] == 'After Rename'
+    assert directory.reloads == 2
+
+
+def test_a_miss_checks_for_users_added_elsewhere(conn):
+    directory = UserDirectory(check_interval=3600)
+    assert directory.by_username(conn, 'dir.late') is None
+
+    add_user(conn, 'dir.late', 'Directory Late')
+
+    assert directory.by_username(conn, 'dir.late')['full_name'] == 'Directory Late'
+
+
+def test_the_oldest_account_wins_a_shared_full_name(conn):
+    add_user(conn, 'dir.first', 'Shared Name')
+    add_user(conn, 'dir.second', 'Shared Name')
+    directory = UserDirectory()
+    assert directory.by_full_name(conn, 'Shared Name')['username'] == 'dir.first'
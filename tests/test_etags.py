@@ -0,0 +1,52 @@
+from serializers import STREAM_MIN_ROWS
+
+
+def test_unchanged_dashboard_answers_304(client, register):
+    user_id = register('Etag Reader')
+    first = client.get(f'/api/dashboard?user_id={user_id}')
+    etag = first.headers['ETag']
+
+    again = client.get(f'/api/dashboard?user_id={user_id}', headers={'If-None-Match': etag})
+
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+
+
+def test_write_changes_the_etag(client, register):
+    user_id = register('Etag Writer')
+    etag = client.get(f'/api/dashboard?user_id={user_id}').headers['ETag']
+    client.post('/api/attendance', json={'full_name': 'Etag Writer', 'timestamp': '2024-06-03T08:00:00.000Z'})
+
+    after = client.get(f'/api/dashboard?user_id={user_id}', headers={'If-None-Match': etag})
+
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+    assert len(after.json['attendance']) == 1
+
+
+def test_query_string_is_part_of_the_etag(client):
+    assert client.get('/api/dashboard?limit=1').headers['ETag'] != client.get('/api/dashboard?limit=2').headers['ETag']
+
+
+def test_streamed_response_is_tagged(client, register):
+    user_id = register('Etag Streamer')
+    check_ins = [{'full_name': 'Etag Streamer', 'timestamp': f'2024-07-01T08:{n // 60:02d}:{n % 60:02d}.000Z'}
+                 for n in range(STREAM_MIN_ROWS)]
+    client.post('/api/attendance/bulk', json=check_ins)
+
+    response = client.get(f'/api/dashboard?user_id={user_id}&limit={STREAM_MIN_ROWS}')
+
+    assert response.is_streamed
+    assert response.headers['ETag']
+    assert client.get(f'/api/dashboard?user_id={user_id}&limit={STREAM_MIN_ROWS}',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_cached_response_follows_writes(client):
+    before = client.get('/api/subjects')
+    client.post('/api/subjects', json={'name': 'Etag Subject', 'description': 'Added by a test'})
+
+    after = client.get('/api/subjects', headers={'If-None-Match': before.headers['ETag']})
+
+    assert after.status_code == 200
+    assert 'Etag Subject' in {subject['name'] for subject in after.json['subjects']}
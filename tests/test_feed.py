@@ -0,0 +1,18 @@
+from feed import stream_slots
+
+
+def test_streams_beyond_the_limit_get_503_until_one_closes(client, monkeypatch):
+    monkeypatch.setattr(stream_slots, 'limit', 1)
+
+    first = client.get('/api/attendance/stream', buffered=False)
+    assert first.status_code == 200
+    assert first.mimetype == 'text/event-stream'
+
+    busy = client.get('/api/attendance/stream')
+    assert busy.status_code == 503
+
+    first.close()
+    again = client.get('/api/attendance/stream', buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert stream_slots.open == 0
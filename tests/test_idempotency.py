@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import ingest
+from ingest import RecentKeys
+
+
+def records(client, user_id):
+    return client.get('/api/dashboard', query_string={'user_id': user_id, 'limit': 100}).json['attendance']
+
+
+def utc(*local):
+    return datetime(*local).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def test_retry_reaching_another_worker_is_stored_once(client, register):
+    user_id = register('Other Worker')
+    payload = {'full_name': 'Other Worker', 'timestamp': '2024-09-02T08:00:00.000Z', 'idempotency_key': 'worker-1'}
+    assert client.post('/api/attendance', json=payload).status_code == 201
+
+    # A worker that has not seen the key finds it in the database
+    ingest.recent_keys.clear()
+    retry = client.post('/api/attendance', json=payload)
+
+    assert (retry.status_code, retry.json['message']) == (200, 'Attendance already marked.')
+    assert len(records(client, user_id)) == 1
+
+
+def test_concurrent_retries_in_one_batch_are_stored_once(client, register):
+    user_id = register('Concurrent Retry')
+    payload = {'full_name': 'Concurrent Retry', 'timestamp': '2024-09-03T08:00:00.000Z',
+               'idempotency_key': 'concurrent-1'}
+
+    with ThreadPoolExecutor(4) as executor:
+        statuses = sorted(executor.map(lambda _: client.application.test_client().post(
+            '/api/attendance', json=payload).status_code, range(4)))
+
+    assert statuses == [200, 200, 200, 201]
+    assert len(records(client, user_id)) == 1
+
+
+def test_a_class_is_attended_once_a_day_whatever_the_key(client, register):
+    user_id = register('Class Once')
+    subjects = client.get('/api/subjects').json['subjects']
+    subject_id = next(subject['id'] for subject in subjects if subject['name'] == 'Web Development')
+    client.post(f'/api/admin/users/{user_id}/schedules', json={
+        'subject_id': subject_id, 'day_of_week': 'Monday', 'start_time': '08:00', 'end_time': '10:00'})
+
+    # 2024-09-09 is a Monday
+    first = client.post('/api/attendance', json={'full_name': 'Class Once', 'timestamp': utc(2024, 9, 9, 8, 0),
+                                                 'idempotency_key': 'phone'})
+    again = client.post('/api/attendance', json={'full_name': 'Class Once', 'timestamp': utc(2024, 9, 9, 8, 30),
+                                                 'idempotency_key': 'laptop'})
+
+    assert (first.status_code, again.status_code) == (201, 200)
+    assert len(records(client, user_id)) == 1
+
+
+def test_recent_keys_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ingest.time, 'monotonic', lambda: now[0])
+    keys = RecentKeys(ttl=10)
+
+    keys.add({'a'})
+    now[0] += 5
+    keys.add({'b'})
+    assert keys.seen({'a', 'b', 'c'}) == {'a', 'b'}
+    now[0] += 6
+    assert keys.seen({'a', 'b'}) == {'b'}
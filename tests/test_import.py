@@ -0,0 +1,54 @@
+import server
+from passwords import hasher
+
+USER_HEADER = 'username,password,full_name,email,contact_number,address,status\n'
+
+
+def post_csv(client, kind, text, **args):
+    return client.post(f'/api/admin/import/{kind}', data=text.encode(), content_type='text/csv',
+                       query_string=args)
+
+
+def user_row(username):
+    return f'{username},pw-{username},{username.title()},{username}@example.com,123,Somewhere,Full Time\n'
+
+
+def test_rejected_rows_are_reported_by_line(client):
+    text = ('name,description\n'
+            'Import Algebra,Numbers\n'
+            ',No name\n'
+            'Import Algebra,Twice in one file\n')
+
+    response = post_csv(client, 'subjects', text)
+
+    assert response.status_code == 200
+    assert response.json['imported'] == 1 and response.json['total'] == 3
+    assert [error['line'] for error in response.json['errors']] == [3, 4]
+
+
+def test_missing_columns_reject_the_whole_file(client):
+    response = post_csv(client, 'schedules', 'username,subject\nadmin,Web Development\n')
+    assert response.status_code == 400
+
+
+def test_user_passwords_are_hashed_on_the_shared_pool(client, monkeypatch):
+    hashed = []
+    submit = hasher.hash
+    monkeypatch.setattr(hasher, 'hash', lambda password: hashed.append(password) or submit(password))
+
+    response = post_csv(client, 'users', USER_HEADER + user_row('importone') + user_row('importtwo'))
+
+    assert response.status_code == 200 and response.json['imported'] == 2
+    assert hashed == ['pw-importone', 'pw-importtwo']
+    login = client.post('/api/login', json={'username': 'importtwo', 'password': 'pw-importtwo'})
+    assert login.status_code == 200
+
+
+def test_user_upload_over_the_limit_is_refused(client, monkeypatch):
+    monkeypatch.setattr(server, 'MAX_IMPORT_USERS', 1)
+
+    response = post_csv(client, 'users', USER_HEADER + user_row('toomanyone') + user_row('toomanytwo'))
+
+    assert response.status_code == 413
+    usernames = {user['username'] for user in client.get('/api/admin/users').json['users']}
+    assert not usernames & {'toomanyone', 'toomanytwo'}
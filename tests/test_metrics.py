@@ -0,0 +1,56 @@
+import pytest
+
+import database
+import metrics
+import server
+
+
+@pytest.fixture
+def timed_client(app, monkeypatch):
+    """Build a client for an app created with the given metrics flags."""
+    def timed_client(enabled=False, server_timing=False):
+        monkeypatch.setattr(metrics, 'ENABLED', enabled)
+        monkeypatch.setattr(metrics, 'SERVER_TIMING', server_timing)
+        monkeypatch.setattr(metrics, 'TIMED', enabled or server_timing)
+        monkeypatch.setattr(metrics, 'registry', metrics.Registry())
+        # Pooled connections were opened untimed
+        database.pool.close_all()
+        return server.create_app().test_client()
+    yield timed_client
+    database.pool.close_all()
+
+
+def test_statement_labels_share_in_lists():
+    assert metrics.statement_label('SELECT *\n  FROM users WHERE id IN (?, ?,?)') == \
+        'SELECT * FROM users WHERE id IN (?...)'
+    assert metrics.statement_label('SELECT ' + 'x' * 1000) == ('SELECT ' + 'x' * 1000)[:metrics.MAX_STATEMENT_LABEL]
+
+
+def test_metrics_record_requests_and_statements(timed_client):
+    client = timed_client(enabled=True)
+    assert client.get('/api/stats').status_code == 200
+
+    response = client.get('/api/metrics')
+
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'eduwatch_request_duration_seconds_count{route="/api/stats",method="GET",status="200"} 1' in text
+    assert 'eduwatch_sql_calls_total{statement="SELECT COUNT(*) as count FROM users"} 1' in text
+    assert 'Server-Timing' not in response.headers
+
+
+def test_server_timing_works_without_metrics(timed_client):
+    client = timed_client(server_timing=True)
+
+    response = client.get('/api/stats')
+
+    phases = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert phases == ['sql', 'json', 'app', 'total']
+    assert client.get('/api/metrics').status_code == 404
+    assert not metrics.registry.statements and not metrics.registry.requests
+
+
+def test_nothing_is_timed_by_default(timed_client):
+    client = timed_client()
+    assert 'Server-Timing' not in client.get('/api/stats').headers
+    assert not metrics.registry.statements
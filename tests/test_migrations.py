@@ -0,0 +1,44 @@
+import os
+import shutil
+import sqlite3
+
+import database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def test_migrate_baseline_database(tmp_path):
+    # The eduwatch.db shipped with the repository predates every migration
+    path = tmp_path / 'baseline.db'
+    shutil.copy(os.path.join(ROOT, 'eduwatch.db'), path)
+    conn = connect(path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 0
+        check_ins = conn.execute('SELECT COUNT(*) FROM attendance_records').fetchone()[0]
+        # The sample data already has a schedule whose subject was deleted
+        dangling = [tuple(row) for row in conn.execute('PRAGMA foreign_key_check')]
+
+        applied = database.migrate(conn)
+
+        assert applied == [number for number, _, _ in database.MIGRATIONS]
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == database.SCHEMA_VERSION
+        assert conn.execute('SELECT COUNT(*) FROM attendance_records').fetchone()[0] == check_ins
+        assert [tuple(row) for row in conn.execute('PRAGMA foreign_key_check')] == dangling
+        assert database.migrate(conn) == []
+    finally:
+        conn.close()
+
+
+def test_migrate_empty_database(tmp_path):
+    conn = connect(tmp_path / 'empty.db')
+    try:
+        database.migrate(conn)
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == database.SCHEMA_VERSION
+    finally:
+        conn.close()
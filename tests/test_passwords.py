@@ -0,0 +1,78 @@
+import hashlib
+import threading
+
+import pytest
+
+import database
+import passwords
+from passwords import PasswordBusy, PasswordHasher, hash_password, needs_rehash, verify_password
+
+
+def stored_password(username):
+    conn = database.get_db_connection()
+    try:
+        return conn.execute('SELECT password FROM users WHERE username = ?', (username,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def set_password(username, stored):
+    conn = database.get_db_connection()
+    try:
+        conn.execute('UPDATE users SET password = ? WHERE username = ?', (stored, username))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def login(client, username, password):
+    return client.post('/api/login', json={'username': username, 'password': password})
+
+
+@pytest.mark.parametrize('scheme', ['scrypt', 'pbkdf2_sha256'])
+def test_hashes_verify_only_their_password(scheme):
+    stored = hash_password('correct horse', scheme)
+    assert stored.startswith(scheme + '$')
+    assert stored != hash_password('correct horse', scheme)  # Salted
+    assert verify_password('correct horse', stored)
+    assert not verify_password('wrong horse', stored)
+
+
+def test_weaker_hashes_need_a_rehash(monkeypatch):
+    stored = hash_password('secret')
+    assert not needs_rehash(stored)
+    assert needs_rehash(hashlib.sha256(b'secret').hexdigest())
+    monkeypatch.setattr(passwords, 'SCRYPT_N', passwords.SCRYPT_N * 2)
+    assert needs_rehash(stored)
+
+
+def test_legacy_hash_is_upgraded_on_login(client, register):
+    register('Legacy Hash')
+    set_password('legacy.hash', hashlib.sha256(b'old-secret').hexdigest())
+
+    assert login(client, 'legacy.hash', 'wrong').status_code == 401
+    assert login(client, 'legacy.hash', 'old-secret').status_code == 200
+
+    upgraded = stored_password('legacy.hash')
+    assert upgraded.startswith('scrypt$') and not needs_rehash(upgraded)
+    assert login(client, 'legacy.hash', 'old-secret').status_code == 200
+
+
+def test_unknown_username_is_refused_like_a_wrong_password(client, register):
+    register('Known User')
+    unknown = login(client, 'no.such.user', 'secret')
+    wrong = login(client, 'known.user', 'not-the-password')
+    assert unknown.status_code == wrong.status_code == 401
+    assert unknown.json == wrong.json
+
+
+def test_full_pool_turns_callers_away(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(passwords, 'hash_password', lambda password: release.wait(5) and 'hash')
+    pool = PasswordHasher(workers=1, max_pending=1)
+
+    first = pool.hash('one')
+    with pytest.raises(PasswordBusy):
+        pool.hash('two')
+    release.set()
+    assert first.result(timeout=5) == 'hash'
@@ -0,0 +1,11 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_no_full_table_scans():
+    # Own process: the check points the database module at its own scratch file
+    result = subprocess.run([sys.executable, 'check_query_plans.py'], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+
+import reports
+
+TIMESTAMPS = ['2024-07-01T08:00:00.000Z', '2024-07-02T08:00:00.000Z', '2024-07-03T08:00:00.000Z']
+
+
+def add_check_ins(client, full_name):
+    client.post('/api/attendance/bulk', json=[{'full_name': full_name, 'subject': 'Web Development',
+                                               'timestamp': timestamp} for timestamp in reversed(TIMESTAMPS)])
+
+
+def test_csv_export_streams_every_row_oldest_first(client, register, monkeypatch):
+    user_id = register('Export, Csv')
+    add_check_ins(client, 'Export, Csv')
+    # Several chunks, with the last one partly filled
+    monkeypatch.setattr(reports, 'STREAM_BATCH_SIZE', 2)
+
+    response = client.get('/api/reports/attendance.csv', query_string={'user_id': user_id})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert header == reports.EXPORT_COLUMNS
+    assert [row[header.index('timestamp')] for row in rows] == TIMESTAMPS
+    assert {row[header.index('name')] for row in rows} == {'Export, Csv'}
+
+
+def test_ndjson_export_has_one_object_per_line(client, register, monkeypatch):
+    user_id = register('Export Ndjson')
+    add_check_ins(client, 'Export Ndjson')
+    monkeypatch.setattr(reports, 'STREAM_BATCH_SIZE', 2)
+
+    response = client.get('/api/reports/attendance.ndjson', query_string={'user_id': user_id})
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['timestamp'] for record in records] == TIMESTAMPS
+    assert all(record['subject'] == 'Web Development' for record in records)
+
+
+def test_export_rejects_bad_filters(client):
+    assert client.get('/api/reports/attendance.csv?start_date=yesterday').status_code == 400
+    assert client.get('/api/reports/attendance.ndjson?user_id=me').status_code == 400
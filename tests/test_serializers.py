@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import serializers
+from serializers import RowLayout, json_list_response
+
+LAYOUT = RowLayout(['id', 'name', 'is_admin'], converters={'is_admin': bool})
+ROWS = [(index, f'User {index}, "quoted" é', index % 2) for index in range(7)]
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Run the test with orjson (when installed) and with the json fallback."""
+    if request.param == 'json':
+        monkeypatch.setattr(serializers, 'orjson', None)
+    elif serializers.orjson is None:
+        pytest.skip('orjson is not installed')
+
+
+def test_layout_applies_converters():
+    assert LAYOUT.dicts(ROWS[:2]) == [{'id': 0, 'name': ROWS[0][1], 'is_admin': False},
+                                      {'id': 1, 'name': ROWS[1][1], 'is_admin': True}]
+    assert RowLayout(['a', 'b']).dicts([(1, 2)]) == [{'a': 1, 'b': 2}]
+
+
+def test_streamed_list_matches_the_short_path(app, encoder, monkeypatch):
+    expected = {'users': LAYOUT.dicts(ROWS), 'next_cursor': None, 'total': 7}
+    with app.app_context():
+        short = json_list_response('users', ROWS, LAYOUT, {'next_cursor': None, 'total': 7})
+        monkeypatch.setattr(serializers, 'STREAM_MIN_ROWS', 1)
+        monkeypatch.setattr(serializers, 'STREAM_CHUNK_ROWS', 3)
+        streamed = json_list_response('users', ROWS, LAYOUT, {'next_cursor': None, 'total': 7})
+
+    assert streamed.is_streamed
+    assert json.loads(short.get_data()) == json.loads(streamed.get_data()) == expected
+
+
+def test_list_endpoints_keep_their_fields(client, register):
+    register('Serialized User')
+    users = client.get('/api/admin/users').json['users']
+    user = next(user for user in users if user['username'] == 'serialized.user')
+    assert user['is_admin'] is False
+    assert set(user) == {'id', 'username', 'full_name', 'email', 'contact_number', 'address', 'status',
+                         'is_admin', 'created_at'}
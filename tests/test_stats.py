@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+import database
+
+
+def stats(client):
+    response = client.get('/api/stats')
+    assert response.status_code == 200
+    return response.json
+
+
+def summary(conn):
+    rows = conn.execute('SELECT * FROM daily_attendance_summary ORDER BY day, user_status, subject, status')
+    total = conn.execute("SELECT value FROM attendance_counters WHERE name = 'total'").fetchone()[0]
+    return [tuple(row) for row in rows], total
+
+
+def test_check_ins_are_counted_as_they_are_written(client, register):
+    register('Stats Counter')
+    now = datetime.now(timezone.utc)
+    timestamps = [(now - timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%S.000Z') for seconds in (0, 1)]
+    before = stats(client)
+
+    client.post('/api/attendance/bulk', json=[{'full_name': 'Stats Counter', 'timestamp': timestamp}
+                                              for timestamp in timestamps])
+
+    after = stats(client)
+    assert after['total_attendance'] == before['total_attendance'] + 2
+    assert after['today_attendance'] == before['today_attendance'] + 2
+    assert after['status_breakdown']['Full Time'] == before['status_breakdown'].get('Full Time', 0) + 2
+
+
+def test_trigger_kept_summary_matches_a_rebuild(client, register):
+    register('Stats Rebuild')
+    client.post('/api/attendance/bulk', json=[
+        {'full_name': 'Stats Rebuild', 'subject': 'Web Development', 'timestamp': '2024-06-03T08:00:00.000Z'},
+        {'full_name': 'Stats Rebuild', 'subject': 'Not A Subject', 'timestamp': '2024-06-03T09:00:00.000Z',
+         'status': 'Late'},
+    ])
+
+    conn = database.get_db_connection()
+    try:
+        kept = summary(conn)
+        database.rebuild_attendance_summary(conn)
+        assert summary(conn) == kept
+    finally:
+        conn.close()
@@ -0,0 +1,53 @@
+def assigned(client, user_id):
+    return {subject['id'] for subject in client.get(f'/api/admin/users/{user_id}/subjects').json['subjects']}
+
+
+def put_bulk(client, assignments):
+    return client.put('/api/admin/users/subjects', json={'assignments': [
+        {'user_id': user_id, 'subject_ids': subject_ids} for user_id, subject_ids in assignments.items()
+    ]})
+
+
+def test_bulk_update_writes_only_the_difference(client, register):
+    first = register('Term One')
+    second = register('Term Two')
+    untouched = register('Term Three')
+    assert put_bulk(client, {first: [1, 2], second: [2, 3], untouched: [4]}).status_code == 200
+
+    response = put_bulk(client, {first: [2, 3], second: [2, 3]})
+
+    assert response.status_code == 200
+    assert (response.json['added'], response.json['removed']) == (1, 1)
+    assert assigned(client, first) == {2, 3}
+    assert assigned(client, second) == {2, 3}
+    assert assigned(client, untouched) == {4}
+
+
+def test_bulk_update_without_changes_writes_nothing(client, register):
+    user_id = register('Steady State')
+    put_bulk(client, {user_id: [1, 2]})
+
+    response = put_bulk(client, {user_id: [2, 1]})
+
+    assert (response.json['added'], response.json['removed']) == (0, 0)
+
+
+def test_bulk_update_with_an_invalid_entry_writes_nothing(client, register):
+    user_id = register('All Or Nothing')
+    put_bulk(client, {user_id: [1]})
+
+    response = put_bulk(client, {user_id: [2], 999999: [1]})
+
+    assert response.status_code == 400
+    assert assigned(client, user_id) == {1}
+
+
+def test_single_update_uses_the_same_difference(client, register):
+    user_id = register('Single Update')
+    client.put(f'/api/admin/users/{user_id}/subjects', json={'subject_ids': [1, 2]})
+
+    response = client.put(f'/api/admin/users/{user_id}/subjects', json={'subject_ids': [2, 3]})
+
+    assert response.status_code == 200
+    assert assigned(client, user_id) == {2, 3}
+    assert client.put('/api/admin/users/999999/subjects', json={'subject_ids': [1]}).status_code == 404
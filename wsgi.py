@@ -0,0 +1,9 @@
+"""WSGI entry point for production servers.
+
+    python manage.py init-db                   # once, before starting workers
+    gunicorn -c gunicorn.conf.py wsgi:app      # Linux/macOS
+    python serve.py                            # waitress, any platform
+"""
+from server import create_app
+
+app = create_app()